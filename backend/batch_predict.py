@@ -0,0 +1,249 @@
+import argparse
+import csv
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, Set
+
+import numpy as np
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".m4v", ".mkv", ".webm", ".avi")
+FIELDS = [
+    "path",
+    "video_hash",
+    "prediction",
+    "prob_ptsd",
+    "error",
+    "versions",
+    "seconds",
+]
+
+
+def list_videos(source: str) -> List[str]:
+    """
+    Videos under a directory (recursive), or listed in a manifest: a CSV
+    with a ``path`` column, or a text file with one path per line (blank
+    lines and ``#`` comments ignored). Relative manifest paths are resolved
+    against the manifest's directory.
+    """
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(root, name)
+            for root, _, files in os.walk(source)
+            for name in files
+            if name.lower().endswith(VIDEO_EXTENSIONS)
+        )
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, newline="", encoding="utf-8") as f:
+        if source.lower().endswith(".csv"):
+            paths = [row["path"] for row in csv.DictReader(f) if row.get("path")]
+        else:
+            paths = [
+                line.strip()
+                for line in f
+                if line.strip() and not line.lstrip().startswith("#")
+            ]
+    return [p if os.path.isabs(p) else os.path.join(base, p) for p in paths]
+
+
+def file_sha256(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+class ResultWriter:
+    """
+    Append-only CSV or JSONL results file (by extension) that doubles as the
+    resume checkpoint: every row is flushed to disk as soon as it is written.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.format = "csv" if path.lower().endswith(".csv") else "jsonl"
+
+    def finished(self, versions: str, retry_failed: bool = False) -> Set[str]:
+        """Paths already scored with these checkpoint and settings versions."""
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, newline="", encoding="utf-8") as f:
+            if self.format == "csv":
+                rows = list(csv.DictReader(f))
+            else:
+                rows = [json.loads(line) for line in f if line.strip()]
+        return {
+            row["path"]
+            for row in rows
+            if row.get("versions") == versions
+            and not (retry_failed and row.get("error"))
+        }
+
+    def write(self, row: Dict):
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            if self.format == "csv":
+                writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+                if new_file:
+                    writer.writeheader()
+                writer.writerow(row)
+            else:
+                f.write(json.dumps({k: row.get(k) for k in FIELDS}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+# ─── Worker process (models are loaded once, by the initializer) ───
+def _init_worker(threads: int):
+    import torch
+
+    from ml.pipeline import warmup_pipeline
+
+    if threads:
+        torch.set_num_threads(threads)
+    try:
+        warmup_pipeline()
+    except Exception as e:  # models still load lazily on first use
+        print(f"Worker {os.getpid()} warm-up failed: {e}")
+
+
+def score_chunk(paths: List[str], versions: str) -> List[Dict]:
+    """
+    Preprocess each video, then fuse all of them in one batched forward.
+    Failures are reported per video in the ``error`` field.
+    """
+    from feature_store import get_feature_store
+    from ml.pipeline import extract_model_inputs
+    from models.predictor import predict_fusion_batch
+
+    rows, ready = [], []
+    for path in paths:
+        start = time.perf_counter()
+        row = {"path": path, "versions": versions}
+        try:
+            row["video_hash"] = file_sha256(path)
+            inputs = extract_model_inputs(path)
+        except Exception as e:
+            row.update(error=str(e), seconds=round(time.perf_counter() - start, 3))
+            rows.append(row)
+            continue
+        row["seconds"] = time.perf_counter() - start
+        ready.append((row, inputs))
+
+    if ready:
+        start = time.perf_counter()
+        try:
+            results = predict_fusion_batch(*zip(*(inputs for _, inputs in ready)))
+        except Exception as e:
+            results = [e] * len(ready)
+        fusion_share = (time.perf_counter() - start) / len(ready)
+
+        store = get_feature_store()
+        for (row, _), result in zip(ready, results):
+            row["seconds"] = round(row["seconds"] + fusion_share, 3)
+            if isinstance(result, Exception):
+                row["error"] = f"Fusion failed: {result}"
+            else:
+                prediction, modalities = result
+                probs = np.exp(modalities["logits"] - modalities["logits"].max())
+                prob = float(probs[1] / probs.sum())  # CLASS_NAMES[1] == "PTSD"
+                row.update(prediction=prediction, prob_ptsd=round(prob, 6))
+                if store is not None:
+                    store.put(row["video_hash"], versions, prediction, modalities)
+            rows.append(row)
+    return rows
+
+
+def run(videos, writer, versions, workers=2, batch_size=4, threads=0):
+    """
+    Score ``videos`` on a pool of ``workers`` processes, ``batch_size``
+    videos per task (and per fusion forward), writing rows as tasks finish.
+    """
+    chunks = [videos[i : i + batch_size] for i in range(0, len(videos), batch_size)]
+    done, failed, start = 0, 0, time.perf_counter()
+
+    # spawn: fresh interpreters, no CUDA/TensorFlow state inherited via fork
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(threads,),
+    ) as pool:
+        pending = set()
+        while chunks or pending:
+            # Keep two chunks per worker in flight so no worker idles
+            while chunks and len(pending) < 2 * workers:
+                pending.add(pool.submit(score_chunk, chunks.pop(0), versions))
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                for row in future.result():
+                    writer.write(row)
+                    done += 1
+                    failed += bool(row.get("error"))
+            elapsed = time.perf_counter() - start
+            print(
+                f"{done}/{len(videos)} videos, {failed} failed, "
+                f"{done / elapsed * 3600:.0f} videos/hour"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Score a directory or manifest of videos offline"
+    )
+    parser.add_argument("source", help="video directory, or .csv/.txt manifest")
+    parser.add_argument("--output", required=True, help="results .csv or .jsonl")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument(
+        "--threads", type=int, default=0, help="torch threads per worker (0: default)"
+    )
+    parser.add_argument(
+        "--retry-failed", action="store_true", help="rerun videos that errored"
+    )
+    args = parser.parse_args()
+
+    from ml.pipeline import SEGMENT_SCORING, result_versions
+    from models.cascade import FUSION_CASCADE
+
+    # Batches are fused in one full forward over each video's first window;
+    # rows labelled with cascade or segment settings would misstate that
+    if FUSION_CASCADE or SEGMENT_SCORING:
+        parser.error(
+            "FUSION_CASCADE and SEGMENT_SCORING are not supported by batch "
+            "scoring; unset them"
+        )
+
+    versions = result_versions()
+    writer = ResultWriter(args.output)
+    videos = list_videos(args.source)
+    finished = writer.finished(versions, retry_failed=args.retry_failed)
+    todo = [v for v in videos if v not in finished]
+    print(
+        f"{len(videos)} videos, {len(videos) - len(todo)} already scored with "
+        f"the current checkpoints and settings, {len(todo)} to go"
+    )
+    if todo:
+        run(todo, writer, versions, args.workers, args.batch_size, args.threads)
+
+
+if __name__ == "__main__":
+    main()
+
+
+"""
+
+== Example Usage ==
+
+# Re-score an archive overnight after a checkpoint change; rerunning the
+# same command after a crash skips the videos already in results.jsonl
+python -m batch_predict /data/sessions --output results.jsonl --workers 4 --batch-size 4
+
+"""
@@ -0,0 +1,100 @@
+"""
+Peak memory and latency of the audio branch against AUDIO_MICRO_BATCH.
+
+Every micro-batch size runs in a fresh spawned interpreter, so peak RSS is
+not inherited from an earlier, larger setting. The worker loads the fp32
+audio branch, runs one warm-up forward, resets the kernel's peak-RSS mark
+(``/proc/self/clear_refs``, Linux only) and then times ``--runs`` forwards
+of ``LateFusion.audio`` on ``--batch`` requests of SEQ_LEN distinct random
+patches (the worst case: dedup_index removes nothing). The report gives the
+resident size after loading, the peak during the forwards, the increase
+over the loaded size (memory the forward needs beyond what loading left
+allocated), the mean latency and the largest difference from the
+single-call (size 0) output.
+
+Run from the backend directory (needs the audio checkpoint):
+
+    python -m benchmarks.bench_audio_memory [--sizes 0 1 4 8 16 25] [--batch 1]
+"""
+import argparse
+import multiprocessing as mp
+import time
+
+import torch
+
+from ml.utils.memory import process_memory
+
+
+def peak_rss_mb():
+    """Peak RSS (VmHWM) of this process in MiB."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmHWM not available")
+
+
+def worker(micro_batch, batch, runs, results):
+    from models.fusion_model import LateFusion
+    from models.predictor import NUM_CLASSES, SEQ_LEN, load_audio_model
+
+    torch.manual_seed(0)
+    auds = torch.randn(batch, 3, SEQ_LEN, 224, 224)
+    model = LateFusion(
+        None, None, load_audio_model(), NUM_CLASSES, audio_micro_batch=micro_batch
+    )
+    with torch.no_grad():
+        model.audio(auds[:1, :, :2])  # warm-up: kernels, allocator pools
+        loaded = process_memory()["rss_mb"]
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")  # reset VmHWM to the current RSS
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            out = model.audio(auds)
+            times.append(time.perf_counter() - start)
+    results.put((loaded, peak_rss_mb(), sum(times) / runs, out.numpy()))
+
+
+def run(micro_batch, batch, runs):
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    proc = ctx.Process(target=worker, args=(micro_batch, batch, runs, results))
+    proc.start()
+    result = results.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[0, 1, 4, 8, 16, 25],
+        help="micro-batch sizes; 0 (one call) is the reference",
+    )
+    parser.add_argument("--batch", type=int, default=1, help="requests per forward")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    sizes = [0] + [s for s in args.sizes if s != 0]
+
+    print(
+        f"{'micro-batch':>12}{'loaded MiB':>12}{'peak MiB':>10}{'delta MiB':>11}"
+        f"{'mean s':>9}{'max |diff|':>12}"
+    )
+    reference = None
+    for size in sizes:
+        loaded, peak, seconds, out = run(size, args.batch, args.runs)
+        if reference is None:
+            reference = out
+        diff = float(abs(out - reference).max())
+        print(
+            f"{size or 'all':>12}{loaded:>12.0f}{peak:>10.0f}{peak - loaded:>11.0f}"
+            f"{seconds:>9.2f}{diff:>12.1e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Parity and latency of the optimized video and audio branches against fp32.
+
+For every configuration of ``models.optimize.optimize_branch`` (channels-last,
+dynamic / static int8, TorchScript, torch.compile) and both branches, the
+script reports the build time (including the first, compiling forward), the
+median forward latency and, against the eager fp32 branch on held-out inputs,
+the max absolute logit difference, the mean absolute difference of the PTSD
+probability and the argmax agreement.
+
+Inputs come from the calibration set built with
+
+    python -m models.optimize videos/*.mp4
+
+whose clips and patches are split alternately into calibration and
+evaluation halves. Without it, random tensors are used and only the latency
+numbers are meaningful.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_branch_inference [--random-weights] [--runs 5]
+"""
+import argparse
+import statistics
+import time
+
+import torch
+import torch.nn as nn
+from torchvision import models
+
+from models.fusion_model import PTSDVideoTransformer
+from models.optimize import INFERENCE_CALIBRATION, load_calibration, optimize_branch
+from models.predictor import NUM_CLASSES, SEQ_LEN
+
+# name: (channels_last, quantize, compiler)
+CONFIGS = {
+    "fp32": (False, "", ""),
+    "channels_last": (True, "", ""),
+    "dynamic": (False, "dynamic", ""),
+    "static": (False, "static", ""),
+    "static+channels_last": (True, "static", ""),
+    "static+torchscript": (False, "static", "torchscript"),
+    "channels_last+torchscript": (True, "", "torchscript"),
+    "channels_last+compile": (True, "", "compile"),
+}
+
+
+def build_branches(random_weights):
+    if not random_weights:
+        from models.predictor import load_audio_model, load_video_model
+
+        return {"video": load_video_model(), "audio": load_audio_model()}
+    audio = models.efficientnet_v2_l(weights=None)
+    audio.classifier[-1] = nn.Linear(audio.classifier[-1].in_features, NUM_CLASSES)
+    return {
+        "video": PTSDVideoTransformer(num_classes=NUM_CLASSES).eval(),
+        "audio": audio.eval(),
+    }
+
+
+def branch_inputs(path, audio_batch):
+    calibration = load_calibration(path)
+    if calibration is None:
+        print(f"No calibration set at {path}; using random inputs")
+        gen = torch.Generator().manual_seed(0)
+        calibration = {
+            "video": torch.randn(4, 3, SEQ_LEN, 224, 224, generator=gen),
+            "audio": torch.randn(4 * audio_batch, 3, 224, 224, generator=gen),
+        }
+    inputs = {}
+    for branch, x in calibration.items():
+        batch = 1 if branch == "video" else audio_batch
+        evaluation = x[1::2] if len(x) > 1 else x
+        inputs[branch] = {
+            "calibration": x[0::2],
+            "eval": list(evaluation.split(batch)),
+        }
+    return inputs
+
+
+def forward_all(model, batches):
+    with torch.no_grad():
+        return torch.cat([model(b) for b in batches])
+
+
+def median_latency(model, batch, runs):
+    times = []
+    with torch.no_grad():
+        for _ in range(runs):
+            start = time.perf_counter()
+            model(batch)
+            times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calibration", default=INFERENCE_CALIBRATION)
+    parser.add_argument(
+        "--random-weights", action="store_true", help="skip loading checkpoints"
+    )
+    parser.add_argument("--audio-batch", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS))
+    args = parser.parse_args()
+
+    branches = build_branches(args.random_weights)
+    inputs = branch_inputs(args.calibration, args.audio_batch)
+
+    for branch, fp32 in branches.items():
+        data = inputs[branch]
+        example = data["eval"][0][:1]
+        reference = forward_all(fp32, data["eval"])
+        ref_prob = reference.softmax(dim=1)[:, 1]
+        print(
+            f"\n{branch} branch, batch {len(data['eval'][0])}, "
+            f"{len(reference)} eval inputs"
+        )
+        print(
+            f"{'config':<27} {'build s':>8} {'latency ms':>11} "
+            f"{'max |dlogit|':>13} {'mean |dprob|':>13} {'agree':>7}"
+        )
+        for name in args.configs:
+            channels_last, quantize, compiler = CONFIGS[name]
+            start = time.perf_counter()
+            try:
+                model = optimize_branch(
+                    fp32,
+                    example,
+                    calibration=data["calibration"],
+                    channels_last=channels_last,
+                    quantize=quantize,
+                    compiler=compiler,
+                )
+                with torch.no_grad():
+                    model(data["eval"][0])  # warm-up (and compilation)
+                build = time.perf_counter() - start
+                latency = median_latency(model, data["eval"][0], args.runs)
+                out = forward_all(model, data["eval"])
+            except Exception as e:
+                print(f"{name:<27} failed: {e}")
+                continue
+            prob = out.softmax(dim=1)[:, 1]
+            agree = (out.argmax(1) == reference.argmax(1)).float().mean().item()
+            print(
+                f"{name:<27} {build:>8.2f} {latency * 1000:>11.1f} "
+                f"{(out - reference).abs().max().item():>13.2e} "
+                f"{(prob - ref_prob).abs().mean().item():>13.2e} {agree:>7.1%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Skip rate and speedup of the confidence-gated cascade (FUSION_CASCADE).
+
+Each sample video is preprocessed once (faces, spectrograms, transcript);
+only the fusion forward is timed, full (every branch) and cascaded (audio
+only where ``AudioGate`` cannot rule out a flip). The report gives the share
+of samples whose audio branch was skipped, mean latency of both paths, the
+speedup, and the number of samples whose cascaded prediction differs from
+the full one (non-zero only for audio logits outside the measured box).
+
+The gate box comes from CASCADE_BOUNDS (see ``python -m models.cascade``);
+``--measure`` instead derives it from the samples' own audio logits, which
+is optimistic. ``--synthetic N`` replaces the videos with random tensors
+(a smoke test of the code path, not a meaningful skip rate).
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_cascade sessions/*.mp4 [--runs 3] [--measure]
+"""
+import argparse
+import statistics
+import time
+
+import torch
+
+from ml.pipeline import extract_model_inputs
+from models.cascade import AudioGate, cascade_forward
+from models.predictor import (
+    NUM_CLASSES,
+    SEQ_LEN,
+    checkpoint_versions,
+    load_fusion_model,
+    load_text_model,
+    prepare_inputs,
+)
+
+
+def load_samples(videos, synthetic):
+    if synthetic:
+        gen = torch.Generator().manual_seed(0)
+        return [
+            (
+                torch.randn(1, 3, SEQ_LEN, 224, 224, generator=gen),
+                torch.randn(1, 3, SEQ_LEN, 224, 224, generator=gen),
+                torch.randn(1, NUM_CLASSES, generator=gen),
+            )
+            for _ in range(synthetic)
+        ]
+    samples = []
+    for path in videos:
+        transcript, spectrograms, frames = extract_model_inputs(path)
+        samples.append(
+            prepare_inputs(
+                transcript_text=transcript, spectrograms=spectrograms, frames=frames
+            )
+        )
+    return samples
+
+
+def mean_seconds(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.mean(times), out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("videos", nargs="*")
+    parser.add_argument("--synthetic", type=int, default=0, help="random samples")
+    parser.add_argument("--measure", action="store_true", help="box from samples")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    if not args.videos and not args.synthetic:
+        parser.error("pass sample videos or --synthetic N")
+
+    model = load_fusion_model()
+    load_text_model()
+    samples = load_samples(args.videos, args.synthetic)
+
+    with torch.no_grad():
+        full = [model(*inputs, return_modalities=True) for inputs in samples]
+        if args.measure:
+            audio = torch.cat([out["audio"] for out in full])
+            gate = AudioGate(model.head, audio.min(0).values, audio.max(0).values)
+        else:
+            gate = AudioGate.load(model.head, versions=checkpoint_versions())
+
+        full_times, cascade_times, skipped, flipped = [], [], 0, 0
+        for inputs, reference in zip(samples, full):
+            seconds, _ = mean_seconds(lambda: model(*inputs), args.runs)
+            full_times.append(seconds)
+            seconds, out = mean_seconds(
+                lambda: cascade_forward(model, gate, *inputs), args.runs
+            )
+            cascade_times.append(seconds)
+            skipped += int(out["audio_skipped"].sum())
+            flipped += int(
+                (out["logits"].argmax(1) != reference["logits"].argmax(1)).sum()
+            )
+
+    n = len(samples)
+    full_ms = statistics.mean(full_times) * 1000
+    cascade_ms = statistics.mean(cascade_times) * 1000
+    lo, hi = gate.points[0].tolist(), gate.points[-1].tolist()
+    print(f"{n} samples, audio logit box {lo} .. {hi}")
+    print(
+        f"audio skipped: {skipped}/{n} ({skipped / n:.0%}), "
+        f"prediction changed: {flipped}"
+    )
+    print(f"{'path':<10}{'mean ms':>10}")
+    print(f"{'full':<10}{full_ms:>10.1f}")
+    print(f"{'cascade':<10}{cascade_ms:>10.1f}")
+    print(f"speedup {full_ms / cascade_ms:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Face detector throughput (frames per second on CPU) per backend and batch size.
+
+Frames are sampled from the given video every 0.5 s (as in extraction) and
+held in memory, so only detection is timed. Backends that cannot be built
+(e.g. YuNet without its ONNX file, see YUNET_MODEL) are reported and skipped.
+With ``--callers N`` N threads detect all frames at once through the shared
+detector, as concurrent requests do, and fps is their aggregate: MTCNN calls
+take turns on one lock, YuNet runs one detector per thread.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_face_detector interview.mp4 \\
+        [--backends mtcnn yunet] [--batch-sizes 1 8 16] [--frames 100] \\
+        [--callers 1 4]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from ml.utils.extract_frames import iter_sampled_frames
+from ml.utils.face_detector import FACE_DETECTOR_BACKENDS, get_face_detector
+
+
+def load_frames(video_path, count):
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video: {video_path}")
+    frames = []
+    for frame in iter_sampled_frames(cap, 0.5):
+        frames.append(frame)
+        if len(frames) >= count:
+            break
+    cap.release()
+    return frames
+
+
+def detect_all(detector, frames, batch_size):
+    faces = 0
+    for i in range(0, len(frames), batch_size):
+        for boxes in detector.detect_batch(frames[i : i + batch_size]):
+            faces += len(boxes)
+    return faces
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("video")
+    parser.add_argument(
+        "--backends", nargs="+", default=sorted(FACE_DETECTOR_BACKENDS)
+    )
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 16])
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument(
+        "--callers", nargs="+", type=int, default=[1], help="concurrent threads"
+    )
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    height, width = frames[0].shape[:2]
+    print(f"{len(frames)} frames at {width}x{height}")
+    print(
+        f"{'backend':<10}{'batch':>6}{'callers':>8}{'faces':>8}{'fps':>10}"
+        f"{'init s':>9}"
+    )
+
+    for backend in args.backends:
+        start = time.perf_counter()
+        try:
+            detector = get_face_detector(backend)
+            detector.warmup((width, height))
+        except Exception as e:
+            print(f"{backend:<10} skipped: {e}")
+            continue
+        init = time.perf_counter() - start
+
+        for callers in args.callers:
+            with ThreadPoolExecutor(max_workers=callers) as pool:
+                for batch_size in args.batch_sizes:
+                    start = time.perf_counter()
+                    counts = list(
+                        pool.map(
+                            lambda _: detect_all(detector, frames, batch_size),
+                            range(callers),
+                        )
+                    )
+                    elapsed = time.perf_counter() - start
+                    fps = callers * len(frames) / elapsed
+                    print(
+                        f"{backend:<10}{batch_size:>6}{callers:>8}{counts[0]:>8}"
+                        f"{fps:>10.1f}{init:>9.2f}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Wall-clock comparison of face-frame sampling strategies.
+
+    seek   : legacy loop, cap.set(CAP_PROP_POS_FRAMES) + read() per sample
+    stream : iter_sampled_frames, sequential grab() + retrieve() on samples
+
+With ``--detect`` the full extraction is timed as well: the legacy
+``max_frames=120`` seek loop versus ``extract_faces_to_tensor`` stopping at
+SEQ_LEN crops. Without a video argument a synthetic clip is generated
+(``--minutes``, default 10); it has no faces, so use a real interview for
+``--detect``.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_face_extraction [video.mp4] [--detect]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from ml.utils.extract_frames import iter_sampled_frames
+
+FRAME_INTERVAL = 0.5
+SEQ_LEN = 50
+LEGACY_MAX_FRAMES = 120
+
+
+def make_synthetic_video(path, minutes, fps=25, size=(640, 360)):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    width, height = size
+    ramp = np.tile(np.arange(width, dtype=np.uint8), (height, 1))
+    for i in range(int(minutes * 60 * fps)):
+        shift = np.uint8(i % 256)
+        writer.write(np.stack([ramp + shift, ramp - shift, ramp], axis=-1))
+    writer.release()
+
+
+def sample_seek(video_path, limit):
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    n = 0
+    while n < limit:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(n * fps * FRAME_INTERVAL))
+        ret, _ = cap.read()
+        if not ret:
+            break
+        n += 1
+    cap.release()
+    return n
+
+
+def sample_stream(video_path, limit):
+    cap = cv2.VideoCapture(video_path)
+    n = 0
+    for _ in iter_sampled_frames(cap, FRAME_INTERVAL):
+        n += 1
+        if n >= limit:
+            break
+    cap.release()
+    return n
+
+
+def extract_legacy(video_path):
+    from mtcnn.mtcnn import MTCNN
+
+    detector = MTCNN()
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = captured = 0
+    while captured < LEGACY_MAX_FRAMES:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(frame_count * fps * FRAME_INTERVAL))
+        ret, frame = cap.read()
+        if not ret:
+            break
+        for result in detector.detect_faces(frame):
+            x, y, w, h = result["box"]
+            cv2.resize(frame[max(y, 0) : y + h, max(x, 0) : x + w], (224, 224))
+            captured += 1
+        frame_count += 1
+    cap.release()
+    return captured
+
+
+def extract_new(video_path):
+    from ml.utils.extract_frames import extract_faces_to_tensor
+
+    return extract_faces_to_tensor(video_path, seq_len=SEQ_LEN).shape[1]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - start, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("video", nargs="?", help="video to benchmark")
+    parser.add_argument("--minutes", type=float, default=10.0)
+    parser.add_argument("--detect", action="store_true", help="include MTCNN")
+    args = parser.parse_args()
+
+    video_path = args.video
+    if video_path is None:
+        video_path = os.path.join(tempfile.mkdtemp(), "synthetic.mp4")
+        print(f"Writing {args.minutes:g}-minute synthetic video to {video_path}")
+        make_synthetic_video(video_path, args.minutes)
+
+    print(f"{'mode':<28}{'samples':>8}{'seconds':>10}")
+    for limit in (SEQ_LEN, LEGACY_MAX_FRAMES, 10**9):
+        label = "all" if limit == 10**9 else limit
+        for name, fn in (("seek", sample_seek), ("stream", sample_stream)):
+            secs, n = timed(fn, video_path, limit)
+            print(f"{name + ' (limit ' + str(label) + ')':<28}{n:>8}{secs:>10.2f}")
+
+    if args.detect:
+        for name, fn in (
+            (f"legacy MTCNN x{LEGACY_MAX_FRAMES}", extract_legacy),
+            (f"tensor MTCNN x{SEQ_LEN}", extract_new),
+        ):
+            secs, n = timed(fn, video_path)
+            print(f"{name:<28}{n:>8}{secs:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Speed of the fusion model on eager PyTorch vs ONNX Runtime.
+
+Random video clips, audio sequences padded by repetition (as the pipeline
+pads them) and text features go through ``LateFusion`` and
+``OnnxFusionModel``. The report gives the median latency of one request
+(batch 1) and the throughput in requests per second for a batch of
+``--batch`` requests, as the inference scheduler would run them, plus the
+max logit difference on the real checkpoints. ORT thread and optimization
+settings come from the ORT_* variables in models/onnx_backend.py; output
+parity is asserted by tests/test_onnx_backend.py.
+
+Run from the backend directory after exporting the graphs:
+
+    python -m models.onnx_backend
+    python -m benchmarks.bench_fusion_backends [--batch 4] [--runs 5]
+"""
+
+import argparse
+import statistics
+import time
+
+import torch
+
+from models.onnx_backend import (
+    ORT_GRAPH_OPTIMIZATION,
+    ORT_INTER_OP_THREADS,
+    ORT_INTRA_OP_THREADS,
+    OnnxFusionModel,
+)
+from models.predictor import (
+    NUM_CLASSES,
+    SEQ_LEN,
+    checkpoint_versions,
+    load_fusion_model,
+)
+
+
+def make_inputs(batch, patches, gen):
+    vids = torch.randn(batch, 3, SEQ_LEN, 224, 224, generator=gen)
+    auds = torch.randn(batch, 3, SEQ_LEN, 224, 224, generator=gen)
+    auds[:, :, patches:] = auds[:, :, patches - 1 : patches]  # padded tail
+    text_feat = torch.randn(batch, NUM_CLASSES, generator=gen)
+    return vids, auds, text_feat
+
+
+def median_seconds(model, inputs, runs):
+    times = []
+    with torch.no_grad():
+        model(*inputs)  # warm-up
+        for _ in range(runs):
+            start = time.perf_counter()
+            model(*inputs)
+            times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--patches", type=int, default=8, help="distinct patches")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    backends = {
+        "torch": load_fusion_model(),
+        "onnxruntime": OnnxFusionModel(versions=checkpoint_versions()),
+    }
+    gen = torch.Generator().manual_seed(0)
+
+    inputs = make_inputs(args.batch, args.patches, gen)
+    with torch.no_grad():
+        eager = backends["torch"](*inputs)
+        ort = backends["onnxruntime"](*inputs)
+    print(f"max |dlogit| {(eager - ort).abs().max().item():.2e}")
+
+    print(
+        f"\nORT threads intra={ORT_INTRA_OP_THREADS or 'auto'} "
+        f"inter={ORT_INTER_OP_THREADS or 'auto'}, "
+        f"optimization={ORT_GRAPH_OPTIMIZATION}, "
+        f"torch threads={torch.get_num_threads()}"
+    )
+    print(f"{'backend':<12} {'latency ms':>11} {f'req/s @{args.batch}':>11}")
+    single = make_inputs(1, args.patches, gen)
+    for name, model in backends.items():
+        latency = median_seconds(model, single, args.runs)
+        batched = median_seconds(model, inputs, args.runs)
+        print(f"{name:<12} {latency * 1000:>11.1f} {args.batch / batched:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
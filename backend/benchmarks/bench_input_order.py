@@ -0,0 +1,109 @@
+"""
+Effect of the face-crop and spectrogram-patch order on predictions.
+
+The file-based pipeline fed the video branch the first SEQ_LEN of up to 120
+``frame_{i}.jpg`` crops and the audio branch its ``{name}_patch_{i}.png``
+patches, both in name order (10 before 2); the in-memory pipeline uses
+temporal order (LEGACY_FRAME_ORDER / LEGACY_PATCH_ORDER restore the old
+one). Each sample video is preprocessed once and fused in all four
+combinations. The report gives per combination the predictions that differ
+from the temporal one, the mean absolute change of P(PTSD) and, with
+``--labels``, the accuracy.
+
+Run from the backend directory (needs the checkpoints):
+
+    python -m benchmarks.bench_input_order sessions/*.mp4 [--labels labels.csv]
+
+``labels.csv`` has "path" and "label" columns (label "PTSD" / "NO PTSD" or
+1 / 0).
+"""
+import argparse
+import csv
+import os
+
+import torch
+
+from ml.pipeline import LEGACY_MAX_FRAMES
+from ml.utils.extract_audio import decode_audio
+from ml.utils.extract_frames import extract_faces_to_tensor
+from ml.utils.spectrogram import process_audio_file
+from ml.utils.transcribe import transcribe
+from ml.utils.transforms import legacy_file_order
+from models.predictor import (
+    CLASS_NAMES,
+    SEQ_LEN,
+    load_fusion_model,
+    load_text_model,
+    prepare_inputs,
+)
+
+ORDERS = ("temporal", "legacy")
+
+
+def read_labels(path):
+    labels = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            label = row["label"].strip().upper()
+            labels[os.path.abspath(row["path"])] = (
+                CLASS_NAMES.index(label) if label in CLASS_NAMES else int(label)
+            )
+    return labels
+
+
+def ordered(clip, order, limit=None):
+    if order == "legacy":
+        clip = clip[:, legacy_file_order(clip.shape[1])]
+    return clip[:, :limit] if limit else clip
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--labels", help="CSV with path,label columns")
+    args = parser.parse_args()
+    labels = read_labels(args.labels) if args.labels else {}
+
+    model = load_fusion_model()
+    load_text_model()
+    probs = {(f, a): [] for f in ORDERS for a in ORDERS}
+    truth = []
+    with torch.no_grad():
+        for path in args.videos:
+            audio = decode_audio(path)
+            frames = extract_faces_to_tensor(path, seq_len=LEGACY_MAX_FRAMES)
+            if frames.shape[1] == 0:
+                print(f"skipped {path}: no faces")
+                continue
+            spectrograms = process_audio_file(audio)
+            transcript = transcribe(audio)
+            for frame_order, patch_order in probs:
+                inputs = prepare_inputs(
+                    transcript_text=transcript,
+                    spectrograms=ordered(spectrograms, patch_order),
+                    frames=ordered(frames, frame_order, SEQ_LEN),
+                )
+                logits = model(*inputs)
+                probs[frame_order, patch_order].append(float(logits.softmax(1)[0, 1]))
+            truth.append(labels.get(os.path.abspath(path)))
+
+    reference = probs["temporal", "temporal"]
+    n = len(reference)
+    labelled = [i for i, t in enumerate(truth) if t is not None]
+    print(f"{n} samples, {len(labelled)} labelled")
+    print(
+        f"{'frames':<10}{'patches':<10}{'changed':>9}{'mean |dP|':>11}"
+        + (f"{'accuracy':>10}" if labelled else "")
+    )
+    for (frame_order, patch_order), values in probs.items():
+        changed = sum((p > 0.5) != (r > 0.5) for p, r in zip(values, reference))
+        delta = sum(abs(p - r) for p, r in zip(values, reference)) / max(n, 1)
+        line = f"{frame_order:<10}{patch_order:<10}{changed:>9}{delta:>11.4f}"
+        if labelled:
+            correct = sum(int(values[i] > 0.5) == truth[i] for i in labelled)
+            line += f"{correct / len(labelled):>10.1%}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Parity and cost of the NumPy log-mel frontend against the former TensorFlow one.
+
+Parity: random and tonal waveforms of several lengths (including shorter
+than one patch) go through both implementations of ``pad_waveform`` and
+``waveform_to_log_mel_spectrogram_patches``; the script asserts equal shapes
+and a max absolute log-mel difference below ``--atol`` (documented
+tolerance: 1e-3, i.e. float32 FFT rounding after the log).
+
+Cost: import time and resident memory of a fresh interpreter importing the
+frontend with and without TensorFlow, plus per-call latency.
+
+Run from the backend directory (TensorFlow is only needed here):
+
+    python -m benchmarks.bench_spectrogram_frontend [--atol 1e-3]
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from ml.utils import spectrogram as np_frontend
+
+
+# ─── Reference: the TensorFlow implementation this module used to ship ───
+def tf_pad_waveform(tf, waveform, params):
+    min_waveform_seconds = (
+        params.patch_window_seconds
+        + params.stft_window_seconds
+        - params.stft_hop_seconds
+    )
+    min_num_samples = tf.cast(min_waveform_seconds * params.sample_rate, tf.int32)
+    num_samples = tf.shape(waveform)[0]
+    num_padding_samples = tf.maximum(0, min_num_samples - num_samples)
+
+    num_samples = tf.maximum(num_samples, min_num_samples)
+    num_samples_after_first_patch = num_samples - min_num_samples
+    hop_samples = tf.cast(params.patch_hop_seconds * params.sample_rate, tf.int32)
+    num_hops_after_first_patch = tf.cast(
+        tf.math.ceil(
+            tf.cast(num_samples_after_first_patch, tf.float32)
+            / tf.cast(hop_samples, tf.float32)
+        ),
+        tf.int32,
+    )
+    num_padding_samples += (
+        hop_samples * num_hops_after_first_patch - num_samples_after_first_patch
+    )
+    return tf.pad(
+        waveform, [[0, num_padding_samples]], mode="CONSTANT", constant_values=0.0
+    )
+
+
+def tf_log_mel_patches(tf, waveform, params):
+    window_length_samples = int(round(params.sample_rate * params.stft_window_seconds))
+    hop_length_samples = int(round(params.sample_rate * params.stft_hop_seconds))
+    fft_length = 2 ** int(np.ceil(np.log2(window_length_samples)))
+    magnitude_spectrogram = tf.abs(
+        tf.signal.stft(
+            signals=waveform,
+            frame_length=window_length_samples,
+            frame_step=hop_length_samples,
+            fft_length=fft_length,
+        )
+    )
+    mel_weight_matrix = tf.signal.linear_to_mel_weight_matrix(
+        num_mel_bins=params.mel_bands,
+        num_spectrogram_bins=fft_length // 2 + 1,
+        sample_rate=params.sample_rate,
+        lower_edge_hertz=params.mel_min_hz,
+        upper_edge_hertz=params.mel_max_hz,
+    )
+    log_mel = tf.math.log(
+        tf.matmul(magnitude_spectrogram, mel_weight_matrix) + params.log_offset
+    )
+    spec_sr = params.sample_rate / hop_length_samples
+    return log_mel, tf.signal.frame(
+        signal=log_mel,
+        frame_length=int(round(spec_sr * params.patch_window_seconds)),
+        frame_step=int(round(spec_sr * params.patch_hop_seconds)),
+        axis=0,
+    )
+
+
+def test_waveforms(sample_rate):
+    rng = np.random.default_rng(0)
+    for seconds in (3.0, 27.975, 31.0, 60.0, 125.3):
+        n = int(seconds * sample_rate)
+        t = np.arange(n) / sample_rate
+        tone = 0.3 * np.sin(2 * np.pi * 440 * t) + 0.05 * rng.standard_normal(n)
+        yield f"tone {seconds:g}s", tone.astype(np.float32)
+        yield f"noise {seconds:g}s", (0.1 * rng.standard_normal(n)).astype(np.float32)
+
+
+def check_parity(atol):
+    import tensorflow as tf
+
+    params = np_frontend.Params()
+    worst = 0.0
+    for name, waveform in test_waveforms(params.sample_rate):
+        padded_np = np_frontend.pad_waveform(waveform, params)
+        padded_tf = tf_pad_waveform(tf, tf.constant(waveform), params).numpy()
+        assert padded_np.shape == padded_tf.shape, (name, padded_np.shape)
+        assert np.array_equal(padded_np, padded_tf), name
+
+        spec_np, patches_np = np_frontend.waveform_to_log_mel_spectrogram_patches(
+            padded_np, params
+        )
+        spec_tf, patches_tf = tf_log_mel_patches(tf, tf.constant(padded_tf), params)
+        assert patches_np.shape == tuple(patches_tf.shape), (name, patches_np.shape)
+        diff = float(np.max(np.abs(spec_np - spec_tf.numpy())))
+        worst = max(worst, diff)
+        print(f"{name:<16}{str(patches_np.shape):>20}  max |diff| {diff:.2e}")
+        assert diff < atol, f"{name}: {diff} >= {atol}"
+    print(f"parity OK, worst max |diff| {worst:.2e} < atol {atol:g}")
+
+
+def import_cost(modules):
+    """Import time and resident memory of a fresh interpreter (Linux)."""
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"import {modules}; "
+        "t = time.perf_counter() - t; "
+        "rss = [l for l in open('/proc/self/status') if l.startswith('VmRSS')]; "
+        "print(t, rss[0].split()[1])"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout.split()
+    return float(out[-2]), int(out[-1]) / 1024.0  # seconds, MiB
+
+
+def latency(seconds=120.0):
+    import tensorflow as tf
+
+    params = np_frontend.Params()
+    waveform = np.random.default_rng(1).standard_normal(
+        int(seconds * params.sample_rate)
+    ).astype(np.float32) * 0.1
+
+    start = time.perf_counter()
+    np_frontend.extract_spectrogram_patches(waveform, params)
+    t_np = time.perf_counter() - start
+
+    tf_log_mel_patches(tf, tf_pad_waveform(tf, tf.constant(waveform), params), params)
+    start = time.perf_counter()
+    tf_log_mel_patches(tf, tf_pad_waveform(tf, tf.constant(waveform), params), params)
+    t_tf = time.perf_counter() - start
+    print(
+        f"{seconds:g}s audio: numpy {t_np * 1e3:.1f} ms, "
+        f"tensorflow {t_tf * 1e3:.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--atol", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    # Before: the module pulled in TensorFlow next to torch; after: it doesn't
+    for label, modules in (
+        ("before (tensorflow + frontend)", "tensorflow, ml.utils.spectrogram"),
+        ("after (numpy frontend)", "ml.utils.spectrogram"),
+    ):
+        secs, rss = import_cost(modules)
+        print(f"{label:<32} import {secs:6.2f} s  RSS {rss:7.1f} MiB")
+
+    check_parity(args.atol)
+    latency()
+
+
+if __name__ == "__main__":
+    main()
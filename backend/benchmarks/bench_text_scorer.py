@@ -0,0 +1,112 @@
+"""
+Parity and speed of the text branch: stored ensemble vs ``SparseTextScorer``.
+
+The stored path is ``vectorizer.transform -> lr_model.predict_proba ->
+xgb_meta.predict_proba``; the fast path is one sparse product of the term
+counts plus the meta model table (models/text_fast.py). Transcripts come
+from a text file (one per line) or, by default, are sampled from the
+vectorizer vocabulary. The script asserts a max absolute difference of the
+meta probabilities within ``--atol`` (default TEXT_TABLE_TOLERANCE) and
+reports the table size and per-call latency for each batch size.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_text_scorer [--transcripts transcripts.txt] \\
+        [--batch-sizes 1 32 256] [--runs 20]
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import joblib
+import numpy as np
+
+from models.predictor import CKPT_TEXT
+from models.text_fast import TEXT_TABLE_TOLERANCE, SparseTextScorer
+
+
+def stored_meta_probs(ensemble, texts):
+    lr_probs = ensemble["lr_model"].predict_proba(
+        ensemble["vectorizer"].transform(texts)
+    )[:, 1]
+    return ensemble["xgb_meta"].predict_proba(np.stack([lr_probs, lr_probs], 1))[:, 1]
+
+
+def sample_transcripts(vectorizer, count, words, seed=0):
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(sorted(vectorizer.vocabulary_))
+    return [
+        " ".join(rng.choice(vocabulary, rng.integers(1, 2 * words)))
+        for _ in range(count)
+    ]
+
+
+def median_ms(fn, texts, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(texts)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--ensemble", default=CKPT_TEXT)
+    parser.add_argument("--transcripts", help="text file, one transcript per line")
+    parser.add_argument("--count", type=int, default=1000, help="sampled transcripts")
+    parser.add_argument("--words", type=int, default=150, help="mean sampled length")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 32, 256])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--atol", type=float, default=TEXT_TABLE_TOLERANCE)
+    args = parser.parse_args()
+
+    ensemble = joblib.load(args.ensemble)
+    start = time.perf_counter()
+    scorer = SparseTextScorer(
+        ensemble["vectorizer"], ensemble["lr_model"], ensemble["xgb_meta"]
+    )
+    build = time.perf_counter() - start
+    print(
+        f"vocabulary {len(scorer.weights)}, meta table {len(scorer.table)} points "
+        f"(probe error {scorer.table.max_error:.1e}), built in {build:.2f} s"
+    )
+
+    if args.transcripts:
+        with open(args.transcripts, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = sample_transcripts(ensemble["vectorizer"], args.count, args.words)
+
+    # === Parity ===
+    stored = stored_meta_probs(ensemble, texts)
+    fast = scorer(texts)
+    diff = float(np.abs(stored - fast).max())
+    lr_diff = float(
+        np.abs(
+            ensemble["lr_model"].predict_proba(
+                ensemble["vectorizer"].transform(texts)
+            )[:, 1]
+            - scorer.lr_probs(texts)
+        ).max()
+    )
+    print(
+        f"parity on {len(texts)} transcripts: max |dLR| {lr_diff:.1e}, "
+        f"max |dmeta| {diff:.1e} (atol {args.atol:.0e})"
+    )
+
+    # === Speed ===
+    print(f"\n{'batch':>6}{'stored ms':>11}{'fast ms':>10}{'speedup':>9}")
+    for batch in args.batch_sizes:
+        chunk = (texts * (batch // len(texts) + 1))[:batch]
+        slow = median_ms(lambda t: stored_meta_probs(ensemble, t), chunk, args.runs)
+        quick = median_ms(scorer, chunk, args.runs)
+        print(f"{batch:>6}{slow:>11.2f}{quick:>10.2f}{slow / quick:>8.1f}x")
+
+    if diff > args.atol:
+        sys.exit("Fast text scorer differs from the stored ensemble")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Word error rate and latency of Whisper backends and transcription profiles.
+
+Every audio or video file in the sample directory is decoded once (16 kHz
+mono, as in the pipeline) and transcribed by each ``backend:profile``
+configuration; only transcription is timed. Transcripts are cleaned with
+``preprocess_text`` before scoring. A ``<name>.txt`` next to a sample is its
+reference transcript; samples without one are scored against the first
+configuration's output (by default the current production setting), so the
+WER column then measures drift from it rather than absolute accuracy.
+
+Configurations that cannot be built (e.g. faster-whisper not installed) are
+reported and skipped. WHISPER_COMPUTE_TYPE and WHISPER_CHUNK_PARALLEL apply.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_transcription samples/ \\
+        [--configs whisper:default whisper:fast faster-whisper:fast]
+"""
+import argparse
+import os
+import statistics
+import time
+
+from ml.utils.extract_audio import SAMPLE_RATE, decode_audio
+from ml.utils.transcribe import build_transcriber, preprocess_text
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".m4a", ".mp4", ".mov", ".webm")
+
+
+def word_errors(reference, hypothesis):
+    """Word-level edit distance (substitutions + deletions + insertions)."""
+    ref, hyp = reference.split(), hypothesis.split()
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        prev, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (r != h))
+    return row[-1]
+
+
+def load_samples(sample_dir):
+    samples = []
+    for name in sorted(os.listdir(sample_dir)):
+        if not name.lower().endswith(AUDIO_EXTENSIONS):
+            continue
+        path = os.path.join(sample_dir, name)
+        reference_path = os.path.splitext(path)[0] + ".txt"
+        reference = None
+        if os.path.exists(reference_path):
+            with open(reference_path, encoding="utf-8") as f:
+                reference = preprocess_text(f.read())
+        samples.append((name, decode_audio(path), reference))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("samples", help="directory of audio/video samples")
+    parser.add_argument(
+        "--configs",
+        nargs="+",
+        default=[
+            "whisper:default",
+            "whisper:fast",
+            "whisper:fastest",
+            "faster-whisper:fast",
+            "faster-whisper:fastest",
+        ],
+        help="backend:profile pairs; the first is the fallback reference",
+    )
+    args = parser.parse_args()
+
+    samples = load_samples(args.samples)
+    if not samples:
+        raise SystemExit(f"No audio/video samples in {args.samples}")
+    audio_seconds = sum(len(audio) for _, audio, _ in samples) / SAMPLE_RATE
+    print(
+        f"{len(samples)} samples, {audio_seconds:.0f} s of audio, "
+        f"{sum(r is not None for _, _, r in samples)} with reference transcripts"
+    )
+    print(
+        f"{'config':<26}{'load s':>8}{'median s':>10}{'x realtime':>12}{'WER':>8}"
+    )
+
+    fallback = {}
+    for config in args.configs:
+        backend, _, profile = config.partition(":")
+        start = time.perf_counter()
+        try:
+            transcriber = build_transcriber(backend, profile or None)
+            transcriber.warmup()
+        except Exception as e:
+            print(f"{config:<26} skipped: {e}")
+            continue
+        load = time.perf_counter() - start
+
+        latencies, errors, words = [], 0, 0
+        for name, audio, reference in samples:
+            start = time.perf_counter()
+            text = preprocess_text(transcriber.transcribe(audio))
+            latencies.append(time.perf_counter() - start)
+            reference = reference if reference is not None else fallback.get(name)
+            if reference is None:
+                fallback[name] = text  # first configuration: reference itself
+                reference = text
+            errors += word_errors(reference, text)
+            words += len(reference.split())
+
+        print(
+            f"{config:<26}{load:>8.1f}{statistics.median(latencies):>10.2f}"
+            f"{audio_seconds / sum(latencies):>12.1f}"
+            f"{errors / max(words, 1):>8.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Per-worker memory of N model-serving processes, with and without WEIGHTS_MMAP.
+
+Each worker is a fresh spawned interpreter (as with ``uvicorn --workers N``)
+that loads and warms up the fusion model (video, audio and text branches,
+one dummy forward so every weight page is touched) and, with ``--whisper``,
+Whisper. Once every worker has loaded, each reports its RSS and PSS.
+RSS counts the memory-mapped checkpoint pages in every worker, so
+it barely changes between modes. The PSS sum is what the workers cost
+together; with WEIGHTS_MMAP it should drop by about (N - 1) checkpoint
+sizes.
+
+Run from the backend directory (needs the checkpoints):
+
+    python -m benchmarks.bench_worker_memory [--workers 4] [--whisper]
+"""
+import argparse
+import multiprocessing as mp
+import os
+
+from ml.utils.memory import process_memory
+
+
+def worker(mmap, load_whisper, loaded, results, release):
+    os.environ["WEIGHTS_MMAP"] = "1" if mmap else "0"
+    from models.predictor import warmup_models
+
+    warmup_models()
+    if load_whisper:
+        from ml.utils.transcribe import get_whisper_model
+
+        get_whisper_model()
+    loaded.wait()  # measure only once every worker holds its models
+    results.put(process_memory())
+    release.wait()
+
+
+def run(workers, mmap, load_whisper):
+    ctx = mp.get_context("spawn")
+    loaded = ctx.Barrier(workers)
+    release = ctx.Event()
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=worker, args=(mmap, load_whisper, loaded, results, release))
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    stats = [results.get() for _ in procs]
+    release.set()
+    for p in procs:
+        p.join()
+    return sorted(stats, key=lambda s: s["pid"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--whisper", action="store_true", help="also load Whisper")
+    args = parser.parse_args()
+
+    for mmap in (False, True):
+        print(f"\nWEIGHTS_MMAP={int(mmap)}, {args.workers} workers")
+        print(f"{'pid':>8} {'rss MiB':>10} {'pss MiB':>10} {'shared MiB':>11}")
+        stats = run(args.workers, mmap, args.whisper)
+        for s in stats:
+            shared = s["shared_clean_mb"] + s["shared_dirty_mb"]
+            print(f"{s['pid']:>8} {s['rss_mb']:>10.1f} {s['pss_mb']:>10.1f} {shared:>11.1f}")
+        print(
+            f"{'total':>8} {sum(s['rss_mb'] for s in stats):>10.1f} "
+            f"{sum(s['pss_mb'] for s in stats):>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-from db_models import Doctor
+from db_models import Doctor, Job
 from schema import DoctorCreate
 from fastapi import HTTPException
 
@@ -84,3 +84,38 @@ def delete_doc(db: Session, doc_id: int):
 
 def get_all_doctors(db: Session):
     return db.query(Doctor).all()
+
+
+# === Prediction jobs ===
+def create_job(db: Session, job_id: str, video_hash: str, owner: str, **fields):
+    db_job = Job(
+        job_id=job_id,
+        status=fields.pop("status", "queued"),
+        stages={},
+        video_hash=video_hash,
+        owner=owner,
+        **fields,
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+
+def read_job(db: Session, job_id: str):
+    return db.query(Job).filter(Job.job_id == job_id).first()
+
+
+def update_job(db: Session, job_id: str, **fields):
+    db_job = db.query(Job).filter(Job.job_id == job_id).first()
+    if not db_job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    for name, value in fields.items():
+        setattr(db_job, name, value)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+
+def get_unfinished_jobs(db: Session):
+    return db.query(Job).filter(Job.status.in_(["queued", "running"])).all()
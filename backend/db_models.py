@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String
+from datetime import datetime
+
+from sqlalchemy import JSON, Column, DateTime, Integer, String, Text
 from database import Base
 
 
@@ -11,3 +13,20 @@ class Doctor(Base):
     doc_username = Column(String, unique=True, index=True)
     doc_phone = Column(String, index=True)
     doc_password = Column(String, index=True)
+
+
+class Job(Base):
+    """Asynchronous prediction job submitted through POST /jobs."""
+
+    __tablename__ = "jobs"
+    job_id = Column(String, primary_key=True, index=True)
+    status = Column(String, index=True)  # queued, running, done, failed
+    stage = Column(String, nullable=True)  # last completed pipeline stage
+    stages = Column(JSON, default=dict)  # stage -> seconds
+    video_hash = Column(String, index=True)
+    owner = Column(String)  # "<host>:<boot id>:<pid>" of the worker (jobs.OWNER)
+    prediction = Column(String, nullable=True)
+    result = Column(JSON, nullable=True)  # modalities and timings
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
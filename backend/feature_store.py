@@ -0,0 +1,187 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from result_cache import pack_arrays, unpack_arrays
+
+# ─── Configuration (FEATURE_STORE=0 disables the store) ───
+FEATURE_STORE_ENABLED = os.getenv("FEATURE_STORE", "1") == "1"
+FEATURE_STORE_PATH = os.getenv("FEATURE_STORE_PATH", "cache/features.sqlite3")
+
+
+class FeatureStore:
+    """
+    Persistent per-video modality vectors backed by a local SQLite file.
+
+    One row per video hash and ``result_versions()`` holds the prediction
+    and an NPZ blob with the fusion logits, the video / audio / text vectors
+    fed to ``FusionHead`` and the 256-d tubelet features. Unlike the result
+    cache nothing is evicted: the rows are the history that ``rescore``
+    re-fuses with a new head without rerunning the branches.
+    """
+
+    def __init__(self, path: str = FEATURE_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS features (
+                    video_hash TEXT NOT NULL,
+                    versions TEXT NOT NULL,
+                    prediction TEXT NOT NULL,
+                    arrays BLOB NOT NULL,
+                    created REAL NOT NULL,
+                    PRIMARY KEY (video_hash, versions)
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def put(
+        self,
+        video_hash: str,
+        versions: str,
+        prediction: str,
+        arrays: Dict[str, np.ndarray],
+    ):
+        """
+        Args:
+            video_hash (str): SHA-256 of the uploaded video
+            versions (str): ``result_versions()`` the vectors came from
+            prediction (str): class name predicted at the time
+            arrays (dict): modality vectors from ``predict_fusion_model``
+        """
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO features VALUES (?, ?, ?, ?, ?)",
+                (video_hash, versions, prediction, pack_arrays(arrays), time.time()),
+            )
+
+    def get(self, video_hash: str, versions: Optional[str] = None) -> Optional[dict]:
+        """
+        Returns:
+            dict: the most recent record for ``video_hash`` (restricted to
+                ``versions`` if given), or None
+        """
+        query = "SELECT * FROM features WHERE video_hash = ?"
+        params = [video_hash]
+        if versions is not None:
+            query += " AND versions = ?"
+            params.append(versions)
+        with self._lock, self._connect() as conn:
+            row = conn.execute(query + " ORDER BY created DESC", params).fetchone()
+        return None if row is None else _record(row)
+
+    def records(self, versions: Optional[str] = None) -> Iterator[dict]:
+        """Yield every record, oldest first (only ``versions`` if given)."""
+        query = "SELECT * FROM features"
+        params = []
+        if versions is not None:
+            query += " WHERE versions = ?"
+            params.append(versions)
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(query + " ORDER BY created", params).fetchall()
+        for row in rows:
+            yield _record(row)
+
+
+def _record(row) -> dict:
+    video_hash, versions, prediction, blob, created = row
+    return {
+        "video_hash": video_hash,
+        "versions": versions,
+        "prediction": prediction,
+        "arrays": unpack_arrays(blob),
+        "created": created,
+    }
+
+
+def rescore(records: List[dict], head) -> List[dict]:
+    """
+    Re-score stored records with a ``FusionHead`` (e.g. from
+    ``load_fusion_head``); only the head runs.
+
+    Returns:
+        list: one dict per record with "video_hash", "versions", the stored
+            "prediction", the "new_prediction" and its "logits"
+    """
+    import torch
+
+    from models.predictor import CLASS_NAMES
+
+    if not records:
+        return []
+    stacked = {
+        name: torch.from_numpy(np.stack([r["arrays"][name] for r in records]))
+        for name in ("video", "text", "audio")
+    }
+    with torch.no_grad():
+        logits = head(stacked["video"], stacked["text"], stacked["audio"])
+    return [
+        {
+            "video_hash": r["video_hash"],
+            "versions": r["versions"],
+            "prediction": r["prediction"],
+            "new_prediction": CLASS_NAMES[int(row.argmax())],
+            "logits": row.tolist(),
+        }
+        for r, row in zip(records, logits)
+    ]
+
+
+_FEATURE_STORE = None
+
+
+def get_feature_store() -> Optional[FeatureStore]:
+    """Shared store instance, or None when FEATURE_STORE=0."""
+    global _FEATURE_STORE
+    if not FEATURE_STORE_ENABLED:
+        return None
+    if _FEATURE_STORE is None:
+        _FEATURE_STORE = FeatureStore()
+    return _FEATURE_STORE
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import sys
+
+    from models.predictor import load_fusion_head
+
+    parser = argparse.ArgumentParser(
+        description="Re-score stored cases with a new FusionHead checkpoint"
+    )
+    parser.add_argument("head", help="FusionHead or LateFusion checkpoint")
+    parser.add_argument("--store", default=FEATURE_STORE_PATH)
+    parser.add_argument("--versions", help="only records with these result_versions()")
+    args = parser.parse_args()
+
+    results = rescore(
+        list(FeatureStore(args.store).records(args.versions)),
+        load_fusion_head(args.head),
+    )
+    for result in results:
+        print(json.dumps(result))
+    changed = sum(r["prediction"] != r["new_prediction"] for r in results)
+    print(
+        f"{len(results)} cases re-scored, {changed} predictions changed",
+        file=sys.stderr,
+    )
@@ -0,0 +1,265 @@
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import numpy as np
+from fastapi import HTTPException
+
+from crud import get_unfinished_jobs, read_job, update_job
+from database import SessionLocal
+from ml.pipeline import PIPELINE_STAGES, process_video
+from models.metrics import PREDICTIONS, REQUESTS_IN_FLIGHT
+from models.predictor import CLASS_NAMES
+
+# ─── Configuration ───
+# Jobs running the pipeline at once, and jobs allowed to wait for a worker;
+# submissions beyond both are rejected with 503
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", "8"))
+# Uploaded videos are kept here until their job finishes
+JOB_DIR = os.getenv("JOB_DIR", os.path.join("temp", "jobs"))
+# Seconds between job state polls of the server-sent event stream
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "0.5"))
+
+# Identifies this worker process in Job.owner as host:boot:pid. The boot id
+# is new at every server start, so a restarted container that gets the same
+# PID (often 1) does not take over the jobs of its previous run
+BOOT_ID = uuid.uuid4().hex[:12]
+OWNER = f"{socket.gethostname()}:{BOOT_ID}:{os.getpid()}"
+
+
+def modalities_json(arrays: Optional[Dict[str, np.ndarray]]) -> dict:
+    """Per-modality vectors as JSON lists ({} for entries cached without them)."""
+    return {name: value.tolist() for name, value in (arrays or {}).items()}
+
+
+def segments_json(arrays: Optional[Dict[str, np.ndarray]]) -> list:
+    """Per-segment scores of a segment-mode result ([] for other results)."""
+    if not arrays or "segment_logits" not in arrays:
+        return []
+    logits = arrays["segment_logits"]
+    probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+    probs /= probs.sum(axis=1, keepdims=True)
+    return [
+        {
+            "start": float(start),
+            "end": float(end),
+            "prediction": CLASS_NAMES[int(p.argmax())],
+            "prob_ptsd": round(float(p[1]), 4),
+        }
+        for (start, end), p in zip(arrays["segment_spans"], probs)
+    ]
+
+
+def inference_path(arrays: Optional[Dict[str, np.ndarray]]) -> Optional[str]:
+    """
+    Branches the prediction came from: "segments" (segment scoring),
+    "text+video" (cascade skipped audio) or "text+video+audio"; None for
+    results cached without vectors.
+    """
+    if not arrays:
+        return None
+    if "segment_logits" in arrays:
+        return "segments"
+    if bool(arrays.get("audio_skipped", False)):
+        return "text+video"
+    return "text+video+audio"
+
+
+def job_snapshot(job_id: str) -> Optional[dict]:
+    """JSON view of a job, or None if unknown (reads the database)."""
+    db = SessionLocal()
+    try:
+        job = read_job(db, job_id)
+        if job is None:
+            return None
+        stages = job.stages or {}
+        result = job.result or {}
+        return {
+            "job_id": job.job_id,
+            "status": job.status,
+            "stage": job.stage,
+            "progress": (
+                1.0
+                if job.status == "done"
+                else round(len(stages) / len(PIPELINE_STAGES), 2)
+            ),
+            "stages": stages,
+            "prediction": job.prediction,
+            "modalities": result.get("modalities", {}),
+            "segments": result.get("segments", []),
+            "path": result.get("path"),
+            "timings": result.get("timings", {}),
+            "cache_hit": result.get("cache_hit", False),
+            "error": job.error,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+        }
+    finally:
+        db.close()
+
+
+def _update(job_id: str, **fields):
+    db = SessionLocal()
+    try:
+        update_job(db, job_id, **fields)
+    finally:
+        db.close()
+
+
+class JobRunner:
+    """
+    Bounded pool running ``process_video`` for submitted jobs.
+
+    ``reserve`` admits a job only while fewer than ``workers + max_queue``
+    are outstanding in this process (503 otherwise), so the upload of a job
+    that cannot be queued is refused before it is received. Job state and
+    per-stage progress are written to the database as the pipeline advances.
+    """
+
+    def __init__(
+        self,
+        on_result: Callable[[str, str, Dict[str, np.ndarray]], None],
+        workers: int = JOB_WORKERS,
+        max_queue: int = JOB_MAX_QUEUE,
+    ):
+        self.on_result = on_result
+        self.capacity = max(1, workers) + max(0, max_queue)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="job"
+        )
+        self._outstanding = 0
+        self._lock = threading.Lock()
+
+    @property
+    def outstanding(self) -> int:
+        return self._outstanding
+
+    def reserve(self):
+        """Take a slot for a new job or raise HTTPException(503)."""
+        with self._lock:
+            if self._outstanding >= self.capacity:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Job queue is full, retry later",
+                    headers={"Retry-After": "30"},
+                )
+            self._outstanding += 1
+
+    def release(self):
+        with self._lock:
+            self._outstanding -= 1
+
+    def start(
+        self,
+        job_id: str,
+        video_path: str,
+        video_hash: str,
+        audio: Optional[np.ndarray] = None,
+    ):
+        """
+        Queue a job holding a reserved slot. The runner takes ownership of
+        ``video_path`` and deletes it when the job ends.
+        """
+        self._executor.submit(self._run, job_id, video_path, video_hash, audio)
+
+    def _run(self, job_id, video_path, video_hash, audio):
+        stages = {}
+
+        def progress(stage, seconds):
+            stages[stage] = round(seconds, 3)
+            try:
+                _update(job_id, stage=stage, stages=dict(stages))
+            except Exception as e:  # progress is best effort
+                print(f"Could not record progress of job {job_id}: {e}")
+
+        REQUESTS_IN_FLIGHT.inc(endpoint="jobs")
+        outcome = "error"
+        try:
+            _update(job_id, status="running", owner=OWNER)
+            timings, modalities = {}, {}
+            result = process_video(video_path, timings, audio, modalities, progress)
+            _update(
+                job_id,
+                status="done",
+                prediction=result,
+                result={
+                    "modalities": modalities_json(modalities),
+                    "segments": segments_json(modalities),
+                    "path": inference_path(modalities),
+                    "timings": timings,
+                },
+            )
+            outcome = "ok"
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            try:
+                _update(job_id, status="failed", error=str(e))
+            except Exception as db_error:
+                print(f"Could not record failure of job {job_id}: {db_error}")
+        else:
+            # The job is done whatever happens to the cache / feature store
+            try:
+                self.on_result(video_hash, result, modalities)
+            except Exception as e:
+                print(f"Could not store the result of job {job_id}: {e}")
+        finally:
+            if os.path.exists(video_path):
+                os.remove(video_path)
+            PREDICTIONS.inc(endpoint="jobs", outcome=outcome)
+            REQUESTS_IN_FLIGHT.dec(endpoint="jobs")
+            self.release()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _owner_running(owner: str, host: str) -> bool:
+    """
+    Whether the worker that wrote ``owner`` may still be running: another
+    live process of a server on this host, not this process's PID left over
+    from a previous start (other hosts are never judged).
+    """
+    owner_host, _, rest = owner.partition(":")
+    boot, _, pid = rest.rpartition(":")  # no boot id in host:pid owners
+    if owner_host != host or boot == BOOT_ID or not pid.isdigit():
+        return True
+    return int(pid) != os.getpid() and _pid_alive(int(pid))
+
+
+def fail_interrupted_jobs() -> int:
+    """
+    Mark queued/running jobs whose worker process on this host no longer
+    exists as failed (their upload may be gone); call once at startup.
+    Finished results are already in the database and need nothing.
+
+    Returns:
+        int: number of jobs marked as failed
+    """
+    host = socket.gethostname()
+    db = SessionLocal()
+    try:
+        interrupted = 0
+        for job in get_unfinished_jobs(db):
+            if _owner_running(job.owner or "", host):
+                continue
+            update_job(
+                db,
+                job.job_id,
+                status="failed",
+                error="Interrupted by a server restart; please resubmit the video",
+            )
+            interrupted += 1
+        return interrupted
+    finally:
+        db.close()
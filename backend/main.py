@@ -1,17 +1,99 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
 import os
 import shutil
 import asyncio
+import hashlib
+import hmac
+import json
+import time
 import uuid
+from contextlib import asynccontextmanager
+from functools import partial
 
 from database import *
 from crud import *
 from schema import DoctorLogin
-from ml.pipeline import process_video
+from ml.pipeline import process_video, result_versions, warmup_pipeline
+from ml.utils.memory import process_memory
+from models.metrics import (
+    PREDICTIONS,
+    PROCESSED_BYTES,
+    REQUESTS_IN_FLIGHT,
+    STAGE_SECONDS,
+    metrics,
+)
+from models.profiling import PROFILE_TOKEN, ProfileSession, ProfilerBusy
+from models.registry import registry
+from feature_store import get_feature_store
+from jobs import (
+    JOB_DIR,
+    JOB_POLL_SECONDS,
+    OWNER,
+    JobRunner,
+    fail_interrupted_jobs,
+    inference_path,
+    job_snapshot,
+    modalities_json,
+    segments_json,
+)
+from result_cache import get_result_cache
+from streaming_upload import StreamingUpload
+
+# /predict parses its multipart body itself; document the expected form
+PREDICT_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["video"],
+                    "properties": {"video": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+# Load and warm up all models in the background at startup (MODEL_WARMUP=0
+# leaves them to load lazily on the first /predict)
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") == "1"
+WARMUP_STATUS = {
+    "state": "pending" if MODEL_WARMUP else "disabled",
+    "seconds": None,
+    "error": None,
+}
+
+
+async def run_warmup():
+    WARMUP_STATUS["state"] = "running"
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(warmup_pipeline)
+    except Exception as e:
+        WARMUP_STATUS.update(state="failed", error=str(e))
+        print(f"Model warm-up failed: {e}")
+    else:
+        WARMUP_STATUS["state"] = "done"
+    WARMUP_STATUS["seconds"] = round(time.perf_counter() - start, 3)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    interrupted = await asyncio.to_thread(fail_interrupted_jobs)
+    if interrupted:
+        print(f"Marked {interrupted} interrupted job(s) as failed")
+    # Warm-up runs beside the server so doctor endpoints answer immediately
+    if MODEL_WARMUP:
+        app.state.warmup_task = asyncio.create_task(run_warmup())
+    yield
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # === CORS SETUP: Allow frontend-backend communication ===
 app.add_middleware(
@@ -39,6 +121,54 @@ def root():
     return {"message": "Welcome to the PTSD Multimodal API! 🧠"}
 
 
+@app.get("/ready")
+def readiness():
+    """
+    Readiness probe: 503 until the startup warm-up has finished. Also reports
+    the answering worker's memory (RSS/PSS) for sizing multi-worker deploys.
+    """
+    ready = WARMUP_STATUS["state"] in ("done", "disabled")
+    body = {
+        "ready": ready,
+        "warmup": WARMUP_STATUS,
+        "models": registry.status(),
+        "memory": process_memory(),
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
+# === Prometheus metrics (see models/metrics.py) ===
+PROCESS_MEMORY = metrics.gauge(
+    "ptsd_process_memory_bytes", "Memory of this worker process", ["kind"]
+)
+JOBS_OUTSTANDING = metrics.gauge(
+    "ptsd_jobs_outstanding", "Jobs queued or running in this worker"
+)
+
+
+def collect_worker_state():
+    stats = process_memory()
+    for kind in ("rss", "pss"):
+        if stats[f"{kind}_mb"] is not None:
+            PROCESS_MEMORY.set(int(stats[f"{kind}_mb"] * 2**20), kind=kind)
+    JOBS_OUTSTANDING.set(job_runner.outstanding)
+
+
+metrics.collect(collect_worker_state)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """
+    Prometheus scrape target for this worker: stage durations, bytes and
+    items processed, batching queue wait, in-flight requests, model load
+    times and memory.
+    """
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 # === Doctor Management Endpoints ===
 @app.post("/doctor/create")
 async def create_doc_api(doc: DoctorCreate, db: Session = Depends(get_db)):
@@ -91,48 +221,232 @@ async def login_doctor(doc: DoctorLogin, db: Session = Depends(get_db)):
     }
 
 
+# === Prediction result cache and feature store ===
+def prediction_cache_key(video_hash):
+    # Same bytes + same checkpoints + same inference settings (detector,
+    # Whisper profile, backend, quantization, cascade, segments, ...) -> same
+    # prediction
+    versions = hashlib.sha256(result_versions().encode()).hexdigest()
+    return f"{video_hash}:{versions[:16]}"
+
+
+def cached_prediction(video_hash):
+    """Response body for a cached upload, or None on a miss."""
+    cache = get_result_cache()
+    if cache is None:
+        return None
+    cached = cache.get(prediction_cache_key(video_hash))
+    if cached is None:
+        return None
+    return {
+        "prediction": cached["prediction"],
+        "modalities": modalities_json(cached["embeddings"]),
+        "segments": segments_json(cached["embeddings"]),
+        "path": inference_path(cached["embeddings"]),
+        "timings": {},
+        "cache_hit": True,
+        "trace_id": None,
+    }
+
+
+def store_prediction(video_hash, result, modalities):
+    cache = get_result_cache()
+    if cache is not None:
+        cache.put(prediction_cache_key(video_hash), result, modalities)
+    # Keep the modality vectors so cases can be re-fused with a new head
+    # (segment-mode results hold per-segment scores instead, and cascade
+    # results that skipped audio have no real audio vector)
+    store = get_feature_store()
+    if inference_path(modalities) == "text+video+audio" and store is not None:
+        store.put(video_hash, result_versions(), result, modalities)
+
+
+job_runner = JobRunner(on_result=store_prediction)
+
+
+# === On-demand profiling (see models/profiling.py) ===
+def profile_requested(request: Request) -> bool:
+    """
+    True if the request carries the admin PROFILE_TOKEN in the X-Profile
+    header; 403 for any other value. The header is ignored while profiling
+    is disabled (PROFILE_TOKEN unset). Header only, so the token does not
+    end up in access logs.
+    """
+    token = request.headers.get("x-profile")
+    if not PROFILE_TOKEN or not token:
+        return False
+    if not hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+    return True
+
+
 # === PTSD Multimodal Prediction Endpoint ===
-@app.post("/predict")
-async def predict_ptsd(video: UploadFile = File(...)):
+@app.post("/predict", openapi_extra=PREDICT_REQUEST_BODY)
+async def predict_ptsd(request: Request):
     temp_dir = "temp"
     os.makedirs(temp_dir, exist_ok=True)
 
     # Generate a unique id so concurrent or repeated filenames do not reuse
     # intermediate directories
     uid = uuid.uuid4().hex
-    video_ext = os.path.splitext(video.filename)[1]
-    video_path = os.path.join(temp_dir, f"{uid}{video_ext}")
-
     base_dir = os.path.join(temp_dir, uid)
 
+    # The video is written to temp/<uid><ext> and, when the container allows
+    # it, audio is decoded through an ffmpeg pipe while the upload arrives
+    upload = StreamingUpload(base_path=os.path.join(temp_dir, uid))
+
     # Folder created during processing
     subdirs = [base_dir]
 
+    REQUESTS_IN_FLIGHT.inc(endpoint="predict")
+    outcome = "error"
+    session = None
     try:
-        # Save uploaded video file. Reset pointer to ensure fresh bytes
-        await video.seek(0)
-        with open(video_path, "wb") as f:
-            shutil.copyfileobj(video.file, f)
+        profile = profile_requested(request)
+        start = time.perf_counter()
+        await upload.receive(request)
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage="upload")
+        PROCESSED_BYTES.inc(upload.size, kind="upload")
+        video_path = upload.video_path
+
+        # A profiled request always runs the pipeline
+        cached = None
+        if not profile:
+            cached = await asyncio.to_thread(cached_prediction, upload.sha256)
+        if cached is not None:
+            outcome = "cache_hit"
+            return cached
+
+        # None if the container could not be decoded from the pipe; the
+        # pipeline then decodes audio from the saved file
+        audio = await asyncio.to_thread(upload.finish_audio)
 
         # Run the multimodal inference pipeline in a worker thread
+        timings, modalities = {}, {}
+        run = process_video
+        if profile:
+            session = ProfileSession(f"/predict {upload.sha256[:16]}", timings)
+            run = partial(session.run, process_video)
         result = await asyncio.to_thread(
-            process_video, video_path
+            run, video_path, timings, audio, modalities
         )  # "PTSD" or "NO PTSD"
-
-        return {"prediction": result}
+        await asyncio.to_thread(store_prediction, upload.sha256, result, modalities)
+
+        outcome = "ok"
+        return {
+            "prediction": result,
+            "modalities": modalities_json(modalities),
+            "segments": segments_json(modalities),
+            "path": inference_path(modalities),
+            "timings": timings,
+            "cache_hit": False,
+            "trace_id": session.trace_id if session else None,
+        }
+    except HTTPException:
+        raise
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        detail = str(e) if session is None else f"{e} (trace_id {session.trace_id})"
+        raise HTTPException(status_code=500, detail=detail)
     finally:
-        video.file.close()
+        start = time.perf_counter()
+        upload.close()
         # Clean up all temp data
-        if os.path.exists(video_path):
-            os.remove(video_path)
+        if upload.video_path and os.path.exists(upload.video_path):
+            os.remove(upload.video_path)
         for d in subdirs:
             shutil.rmtree(d, ignore_errors=True)
         # Retain the top-level temp directory so that uvicorn's reload
         # mechanism does not fail when the folder disappears between
         # reload checks.
         # shutil.rmtree(temp_dir, ignore_errors=True)
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage="cleanup")
+        PREDICTIONS.inc(endpoint="predict", outcome=outcome)
+        REQUESTS_IN_FLIGHT.dec(endpoint="predict")
+
+
+# === Asynchronous Prediction Jobs ===
+@app.post("/jobs", status_code=202, openapi_extra=PREDICT_REQUEST_BODY)
+async def submit_job(request: Request, db: Session = Depends(get_db)):
+    """
+    Accept a video and return a job id at once; the pipeline runs on the
+    bounded job pool. Poll GET /jobs/{job_id} or follow /jobs/{job_id}/events.
+    """
+    job_runner.reserve()  # 503 before reading the body if the queue is full
+    os.makedirs(JOB_DIR, exist_ok=True)
+    job_id = uuid.uuid4().hex
+    upload = StreamingUpload(base_path=os.path.join(JOB_DIR, job_id))
+    started = False
+
+    try:
+        await upload.receive(request)
+        PROCESSED_BYTES.inc(upload.size, kind="upload")
+
+        cached = await asyncio.to_thread(cached_prediction, upload.sha256)
+        if cached is not None:
+            PREDICTIONS.inc(endpoint="jobs", outcome="cache_hit")
+            create_job(
+                db,
+                job_id,
+                upload.sha256,
+                OWNER,
+                status="done",
+                prediction=cached["prediction"],
+                result=cached,
+            )
+        else:
+            audio = await asyncio.to_thread(upload.finish_audio)
+            create_job(db, job_id, upload.sha256, OWNER)
+            try:
+                job_runner.start(job_id, upload.video_path, upload.sha256, audio)
+            except Exception as e:
+                # Never leave a job queued that no worker will pick up
+                update_job(db, job_id, status="failed", error=str(e))
+                raise
+            started = True
+
+        return {"job_id": job_id, "status_url": f"/jobs/{job_id}"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        upload.close()
+        if not started:
+            job_runner.release()
+            if upload.video_path and os.path.exists(upload.video_path):
+                os.remove(upload.video_path)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await asyncio.to_thread(job_snapshot, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events: the job state each time it changes, until it ends."""
+    if await asyncio.to_thread(job_snapshot, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        last = None
+        while True:
+            job = await asyncio.to_thread(job_snapshot, job_id)
+            if job is None:
+                return
+            if job != last:
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+                last = job
+            if job["status"] in ("done", "failed"):
+                return
+            await asyncio.sleep(JOB_POLL_SECONDS)
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
 
 
 """
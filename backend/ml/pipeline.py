@@ -1,80 +1,441 @@
+import hashlib
+import json
+import multiprocessing as mp
 import os
 import shutil
-from ml.utils.extract_audio import extract_audio_from_video
-from ml.utils.extract_frames import extract_faces_from_video
-from ml.utils.spectrogram import process_audio_file
-from ml.utils.transcribe import transcribe_and_save
-from models.predictor import predict_fusion_model
+import time
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Callable, Dict, Optional
 
+import numpy as np
 
-def process_video(video_path: str) -> str:
+from ml.utils.extract_audio import decode_audio
+from ml.utils.extract_frames import extract_face_windows, extract_faces_to_tensor
+from ml.utils.face_detector import (
+    FACE_DETECTOR_BACKEND,
+    YUNET_MODEL,
+    YUNET_SCORE_THRESHOLD,
+    warmup_face_detector,
+)
+from ml.utils.spectrogram import patch_indices, process_audio_file
+from ml.utils.timing import timed_call
+from ml.utils.transforms import legacy_file_order
+from ml.utils.transcribe import (
+    VAD_PAD_SECONDS,
+    VAD_THRESHOLD_DB,
+    WHISPER_BACKEND,
+    WHISPER_COMPUTE_TYPE,
+    profile_settings,
+    transcribe,
+    warmup_transcriber,
+)
+from models.cascade import CASCADE_BOUNDS, CASCADE_MARGIN, FUSION_CASCADE
+from models.fusion_model import AUDIO_MICRO_BATCH
+from models.metrics import PROCESSED_BYTES, STAGE_SECONDS, metrics
+from models.optimize import (
+    INFERENCE_CALIBRATION,
+    INFERENCE_CHANNELS_LAST,
+    INFERENCE_COMPILE,
+    INFERENCE_QUANTIZE,
+)
+from models.profiling import is_profiling
+from models.predictor import (
+    FUSION_BACKEND,
+    checkpoint_versions,
+    predict_fusion_model,
+    predict_fusion_segments,
+    warmup_models,
+    SEQ_LEN,
+)
+from models.text_fast import TEXT_FAST_PATH, TEXT_TABLE_TOLERANCE
+
+# Set PTSD_DEBUG_SPECTROGRAMS=1 to also write spectrogram patches as PNGs
+DEBUG_SPECTROGRAMS = os.getenv("PTSD_DEBUG_SPECTROGRAMS", "0") == "1"
+
+# Stage executor shared by all requests: "thread" (default) or "process"
+# (spawned workers that load the face detector and Whisper once each)
+PIPELINE_EXECUTOR = os.getenv("PIPELINE_EXECUTOR", "thread").lower()
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+
+# LEGACY_PATCH_ORDER=1 feeds spectrogram patches in the lexicographic order
+# of the former {name}_patch_{i}.png files (patch 10 before patch 2) instead
+# of temporal order; only differs for recordings of 11+ patches (~2.7 min).
+# For comparing against results of the file-based pipeline
+LEGACY_PATCH_ORDER = os.getenv("LEGACY_PATCH_ORDER", "0") == "1"
+# LEGACY_FRAME_ORDER=1 likewise extracts up to LEGACY_MAX_FRAMES face crops,
+# as the file-based pipeline did, and feeds the first SEQ_LEN in the order
+# of the former frame_{i}.jpg files; differs from 11 crops on and runs the
+# detector until 120 crops instead of SEQ_LEN
+LEGACY_FRAME_ORDER = os.getenv("LEGACY_FRAME_ORDER", "0") == "1"
+LEGACY_MAX_FRAMES = 120
+
+# SEGMENT_SCORING=1 scores the whole recording in SEQ_LEN windows (at most
+# SEGMENT_MAX_WINDOWS, spread evenly over long sessions) instead of its start
+SEGMENT_SCORING = os.getenv("SEGMENT_SCORING", "0") == "1"
+SEGMENT_MAX_WINDOWS = int(os.getenv("SEGMENT_MAX_WINDOWS", "8"))
+
+# Stages reported through ``process_video(progress=...)``, in completion order
+PIPELINE_STAGES = ("audio", "faces", "spectrogram", "transcription", "fusion")
+
+# Work done per request, served at /metrics with the stage durations
+FACE_CROPS = metrics.counter(
+    "ptsd_face_crops_total", "Face crops extracted for the video branch"
+)
+SPECTROGRAM_PATCHES = metrics.counter(
+    "ptsd_spectrogram_patches_total",
+    "Spectrogram patches rendered for the audio branch",
+)
+
+_EXECUTOR: Optional[Executor] = None
+
+
+def _file_version(path: str) -> str:
+    try:
+        st = os.stat(path)
+        return f"{st.st_size}:{st.st_mtime_ns}"
+    except OSError:
+        return "missing"
+
+
+def inference_settings() -> Dict:
+    """
+    Configuration besides the checkpoints that changes what ``process_video``
+    returns for the same upload: detector, transcription profile, inference
+    backend and numerics, cascade and segment mode.
+    """
+    settings = {
+        "face_detector": FACE_DETECTOR_BACKEND,
+        "whisper": dict(
+            profile_settings(),
+            backend=WHISPER_BACKEND,
+            compute_type=WHISPER_COMPUTE_TYPE,
+            vad_threshold_db=VAD_THRESHOLD_DB,
+            vad_pad_seconds=VAD_PAD_SECONDS,
+        ),
+        "fusion_backend": FUSION_BACKEND,
+        "quantize": INFERENCE_QUANTIZE,
+        "channels_last": INFERENCE_CHANNELS_LAST,
+        "compile": INFERENCE_COMPILE,
+        "audio_micro_batch": AUDIO_MICRO_BATCH,
+        "text_fast_path": TEXT_FAST_PATH and TEXT_TABLE_TOLERANCE,
+        "cascade": FUSION_CASCADE,
+        "segments": SEGMENT_SCORING and SEGMENT_MAX_WINDOWS,
+        "legacy_patch_order": LEGACY_PATCH_ORDER,
+        "legacy_frame_order": LEGACY_FRAME_ORDER,
+    }
+    if FACE_DETECTOR_BACKEND == "yunet":
+        settings["yunet"] = [_file_version(YUNET_MODEL), YUNET_SCORE_THRESHOLD]
+    if INFERENCE_QUANTIZE == "static":
+        settings["calibration"] = _file_version(INFERENCE_CALIBRATION)
+    if FUSION_CASCADE:
+        settings["cascade"] = [_file_version(CASCADE_BOUNDS), CASCADE_MARGIN]
+    return settings
+
+
+def result_versions() -> str:
+    """
+    ``checkpoint_versions()`` plus a hash of ``inference_settings()``: equal
+    for two runs only if they would return the same result for an upload.
+    """
+    settings = json.dumps(inference_settings(), sort_keys=True)
+    digest = hashlib.sha256(settings.encode()).hexdigest()[:16]
+    return f"{checkpoint_versions()}|settings:{digest}"
+
+
+def get_executor() -> Executor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        if PIPELINE_EXECUTOR == "process":
+            # spawn: fresh interpreters, no CUDA/TensorFlow state or server
+            # threads inherited via fork
+            _EXECUTOR = ProcessPoolExecutor(
+                max_workers=PIPELINE_WORKERS,
+                mp_context=mp.get_context("spawn"),
+                initializer=_init_stage_worker,
+            )
+        elif PIPELINE_EXECUTOR == "thread":
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline"
+            )
+        else:
+            raise ValueError(
+                f"PIPELINE_EXECUTOR must be 'thread' or 'process', "
+                f"got '{PIPELINE_EXECUTOR}'"
+            )
+    return _EXECUTOR
+
+
+def _init_stage_worker():
+    """Process-pool initializer: load the models the stages use, once."""
+    for step in (warmup_face_detector, warmup_transcriber):
+        try:
+            step()
+        except Exception as e:  # models still load lazily on first use
+            print(f"Pipeline worker {os.getpid()} warm-up failed: {e}")
+
+
+def _start_stage_workers():
+    """Spawn every process-pool worker and wait for their warm-up."""
+    executor = get_executor()
+    wait([executor.submit(os.getpid) for _ in range(PIPELINE_WORKERS)])
+
+
+class InlineExecutor(Executor):
+    """
+    Runs every submitted call at once on the submitting thread. Used for
+    profiled requests: torch.profiler only records the thread it runs on.
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def warmup_pipeline():
+    """
+    Load and exercise every model the pipeline uses: face detector, fusion
+    model branches (with a dummy forward) and Whisper (one second of silence,
+    bypassing VAD). With PIPELINE_EXECUTOR=process the stage workers are
+    started instead and load the face detector and Whisper themselves.
+    Every step is attempted; failures are reported together at the end.
+    """
+    if PIPELINE_EXECUTOR == "process":
+        steps = {"fusion model": warmup_models, "stage workers": _start_stage_workers}
+    else:
+        steps = {
+            "face detector": warmup_face_detector,
+            "fusion model": warmup_models,
+            "whisper": warmup_transcriber,
+        }
+    errors = []
+    for name, step in steps.items():
+        try:
+            step()
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+    if errors:
+        raise RuntimeError("; ".join(errors))
+
+
+def _stage_result(future: Future, name: str, record, pending):
+    """
+    Wait for a stage and ``record`` its duration. On failure, let the other
+    in-flight stages finish first so the caller can clean up temp files.
+    """
+    try:
+        result, seconds = future.result()
+    except Exception:
+        wait([f for f in pending if f is not future])
+        raise
+    record(name, seconds)
+    return result
+
+
+def _recorder(timings: Dict[str, float], progress=None):
+    def record(stage, seconds):
+        timings[stage] = seconds
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        if progress is not None:
+            progress(stage, seconds)
+
+    return record
+
+
+def process_video(
+    video_path: str,
+    timings: Optional[Dict[str, float]] = None,
+    audio: Optional[np.ndarray] = None,
+    modalities: Optional[Dict[str, np.ndarray]] = None,
+    progress: Optional[Callable[[str, float], None]] = None,
+    segments: Optional[bool] = None,
+) -> str:
     """
     Full pipeline: video → audio → frames + spectrogram + transcript → model → prediction
 
+    Stages run as a dependency graph on the shared executor: face extraction
+    runs alongside audio decoding, then spectrogram generation alongside
+    transcription once the waveform exists. The audio is decoded once into
+    memory and shared by both consumers.
+
     Args:
         video_path (str): Path to uploaded .mp4 video file
+        timings (dict, optional): Filled with per-stage durations in seconds
+            ("audio", "faces", "spectrogram", "transcription", "fusion",
+            "total")
+        audio (np.ndarray, optional): float32 16 kHz mono waveform already
+            decoded while the upload streamed in; skips the audio stage
+        modalities (dict, optional): Filled with the fusion logits and the
+            per-modality vectors (see ``predict_fusion_model``)
+        progress (callable, optional): Called as ``progress(stage, seconds)``
+            as each of PIPELINE_STAGES completes
+        segments (bool, optional): Score the whole recording in windows and
+            return the session-level prediction; ``modalities`` then holds
+            the session and per-segment scores (see
+            ``predict_fusion_segments``). Defaults to SEGMENT_SCORING.
 
     Returns:
         str: Prediction result ("PTSD" or "No PTSD")
     """
+    start = time.perf_counter()
+    timings = {} if timings is None else timings
+    segments = SEGMENT_SCORING if segments is None else segments
+
+    transcript, spectrograms, frames = extract_model_inputs(
+        video_path,
+        timings,
+        audio,
+        progress,
+        max_windows=SEGMENT_MAX_WINDOWS if segments else None,
+    )
+
+    # === STEP 5: Run Multimodal Prediction ===
+    if segments:
+        # Pair each face window with the spectrogram patches overlapping it
+        windows = [
+            (
+                begin,
+                end,
+                clip,
+                spectrograms[:, patch_indices(begin, end, spectrograms.shape[1])],
+            )
+            for begin, end, clip in frames
+        ]
+        result, seconds = timed_call(
+            predict_fusion_segments, transcript, windows, modalities
+        )
+    else:
+        result, seconds = timed_call(
+            predict_fusion_model,
+            transcript_text=transcript,
+            spectrograms=spectrograms,
+            frames=frames,
+            modalities=modalities,
+        )
+    _recorder(timings, progress)("fusion", seconds)
+
+    timings["total"] = time.perf_counter() - start
+    STAGE_SECONDS.observe(timings["total"], stage="total")
+    base_name = os.path.splitext(os.path.basename(video_path))[0]
+    print(
+        f"process_video {base_name}: "
+        + ", ".join(f"{k}={v:.2f}s" for k, v in timings.items())
+    )
+    return result
+
+
+def extract_model_inputs(
+    video_path: str,
+    timings: Optional[Dict[str, float]] = None,
+    audio: Optional[np.ndarray] = None,
+    progress: Optional[Callable[[str, float], None]] = None,
+    max_windows: Optional[int] = None,
+):
+    """
+    Steps 1-4 of ``process_video``: everything up to the fusion forward.
+    Used directly by the batch runner, which fuses several videos at once.
+
+    With ``max_windows``, faces are extracted by ``extract_face_windows``
+    over the whole video and ``frames`` is its list of (start s, end s,
+    clip) windows.
+
+    Returns:
+        tuple: (transcript str, spectrograms [3, N, 224, 224],
+            frames [3, T, 224, 224] or list of windows)
+    """
+    timings = {} if timings is None else timings
+    # Profiled requests run their stages one after another on this thread
+    executor = InlineExecutor() if is_profiling() else get_executor()
+    record = _recorder(timings, progress)
+
     # === FOLDER SETUP ===
     base_name = os.path.splitext(os.path.basename(video_path))[0]
 
-    # create a unique subdirectory for this video
+    # create a unique subdirectory for this video; only debug spectrogram
+    # images are written to disk
     base_dir = os.path.join("temp", base_name)
-    audio_dir = os.path.join(base_dir, "audio")
-    frame_dir = os.path.join(base_dir, "frames")
     spec_dir = os.path.join(base_dir, "spectrogram_patches")
-    text_dir = os.path.join(base_dir, "transcripts")
 
-    # ensure base directory exists; the utility functions will create
-    # their respective subfolders as needed
-    os.makedirs(base_dir, exist_ok=True)
+    if DEBUG_SPECTROGRAMS:
+        shutil.rmtree(spec_dir, ignore_errors=True)
+        os.makedirs(spec_dir, exist_ok=True)
 
-    # Recreate temp folders before processing
-    for d in [audio_dir, frame_dir, spec_dir, text_dir]:
-        shutil.rmtree(d, ignore_errors=True)
-        os.makedirs(d, exist_ok=True)
+    # === STEP 1 & 2: Decode Audio || Extract Face Frames (in memory) ===
+    if audio is None:
+        audio_future = executor.submit(timed_call, decode_audio, video_path)
+    else:
+        audio_future = Future()
+        audio_future.set_result((audio, 0.0))
+    if max_windows:
+        faces_future = executor.submit(
+            timed_call,
+            extract_face_windows,
+            video_path=video_path,
+            seq_len=SEQ_LEN,
+            max_windows=max_windows,
+        )
+    else:
+        faces_future = executor.submit(
+            timed_call,
+            extract_faces_to_tensor,
+            video_path=video_path,
+            seq_len=LEGACY_MAX_FRAMES if LEGACY_FRAME_ORDER else SEQ_LEN,
+        )
+    pending = [audio_future, faces_future]
 
-    # === STEP 1: Extract Audio ===
     try:
-        audio_path = extract_audio_from_video(video_path, audio_dir)
+        audio = _stage_result(audio_future, "audio", record, pending)
     except Exception as e:
         raise RuntimeError(f"Audio extraction failed for {video_path}: {e}") from e
-    if not audio_path:
+    if audio is None or audio.size == 0:
+        wait(pending)
         raise RuntimeError(f"Audio extraction failed for {video_path}")
+    PROCESSED_BYTES.inc(audio.nbytes, kind="audio")
+
+    # === STEP 3 & 4: Spectrogram Patches (in memory) || Transcription ===
+    spec_future = executor.submit(
+        timed_call,
+        process_audio_file,
+        audio,
+        spec_dir if DEBUG_SPECTROGRAMS else None,
+        base_name,
+    )
+    text_future = executor.submit(timed_call, transcribe, audio)
+    pending += [spec_future, text_future]
 
-    # === STEP 2: Extract Face Frames ===
     try:
-        frame_paths = extract_faces_from_video(
-            video_path=video_path, output_folder=frame_dir
-        )
+        frames = _stage_result(faces_future, "faces", record, pending)
     except Exception as e:
         raise RuntimeError(f"Face extraction failed for {video_path}: {e}")
-    if not frame_paths:
+    if (len(frames) if max_windows else frames.shape[1]) == 0:
+        wait(pending)
         raise RuntimeError(f"No faces extracted from {video_path}")
+    FACE_CROPS.inc(
+        sum(clip.shape[1] for _, _, clip in frames) if max_windows else frames.shape[1]
+    )
+    if LEGACY_FRAME_ORDER and not max_windows:
+        frames = frames[:, legacy_file_order(frames.shape[1])[:SEQ_LEN]]
 
-    # === STEP 3: Generate Spectrogram Patches ===
     try:
-        process_audio_file(audio_path, spec_dir)
+        spectrograms = _stage_result(spec_future, "spectrogram", record, pending)
     except Exception as e:
         raise RuntimeError(f"Spectrogram generation failed for {video_path}: {e}")
+    SPECTROGRAM_PATCHES.inc(spectrograms.shape[1])
+    if LEGACY_PATCH_ORDER and not max_windows:
+        spectrograms = spectrograms[:, legacy_file_order(spectrograms.shape[1])]
 
-    # === STEP 4: Transcribe & Save Text ===
-    transcript_path = transcribe_and_save(audio_path, text_dir)
-    if not transcript_path or not os.path.exists(transcript_path):
-        raise RuntimeError(f"Transcription failed for {video_path}")
-
-    # === STEP 5: Read Transcription Text ===
-    with open(transcript_path, "r", encoding="utf-8") as f:
-        transcript = f.read()
-
-    # === STEP 6: Run Multimodal Prediction ===
-    result = predict_fusion_model(
-        spectrogram_folder=spec_dir,
-        frame_folder=frame_dir,
-        transcript_text=transcript,
-        base_name=base_name,
-    )
+    try:
+        transcript = _stage_result(text_future, "transcription", record, pending)
+    except Exception as e:
+        raise RuntimeError(f"Transcription failed for {video_path}: {e}") from e
 
-    return result
+    return transcript, spectrograms, frames
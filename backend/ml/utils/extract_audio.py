@@ -2,6 +2,10 @@ import os
 import shutil
 import subprocess
 
+import numpy as np
+
+SAMPLE_RATE = 16000
+
 
 def extract_audio_from_video(video_path: str, output_folder: str) -> str:
     """
@@ -52,6 +56,59 @@ def extract_audio_from_video(video_path: str, output_folder: str) -> str:
         raise
 
 
+def pcm16_to_float(pcm: bytes) -> np.ndarray:
+    """Convert raw little-endian int16 PCM to float32 in [-1, 1)."""
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def decode_audio(video_path: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode the audio track of a video straight into memory with one ffmpeg
+    process (raw PCM over a pipe, nothing written to disk).
+
+    The samples are scaled exactly like ``tf.audio.decode_wav`` and Whisper's
+    ``load_audio`` scale a 16-bit WAV, so the same array can feed both the
+    spectrogram and the transcription stages.
+
+    Args:
+        video_path (str): Full path to the input video
+        sample_rate (int): Output sample rate in Hz (mono)
+
+    Returns:
+        np.ndarray: float32 waveform of shape [num_samples]
+    """
+    if not shutil.which("ffmpeg"):
+        raise RuntimeError("FFmpeg must be installed and on the system PATH.")
+
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-loglevel",
+        "error",
+        "-i",
+        video_path,
+        "-vn",
+        "-f",
+        "s16le",
+        "-acodec",
+        "pcm_s16le",
+        "-ac",
+        "1",
+        "-ar",
+        str(sample_rate),
+        "pipe:1",
+    ]
+    try:
+        result = subprocess.run(
+            cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+    except subprocess.CalledProcessError as e:
+        print(e.stderr.decode(errors="ignore"))
+        raise RuntimeError(f"Failed to decode audio using FFmpeg: {e}") from e
+
+    return pcm16_to_float(result.stdout)
+
+
 """
 
 == Example usage ==
@@ -63,4 +120,9 @@ audio_path = extract_audio_from_video(
     output_folder="temp/audio"
 )
 
+# In memory: float32 waveform at 16 kHz, no .wav written
+from ml.utils.extract_audio import decode_audio
+
+waveform = decode_audio("uploaded_video.mp4")
+
 """
@@ -1,7 +1,64 @@
+import bisect
 import cv2
 import os
-from mtcnn.mtcnn import MTCNN
-from typing import List  # Use typing.List for return type annotation
+import numpy as np
+import torch
+from typing import Iterator, List, Optional, Tuple
+
+from ml.utils.face_detector import FACE_DETECTOR_BATCH_SIZE, get_face_detector
+from ml.utils.transforms import frames_to_clip
+
+
+def iter_sampled_frames(
+    cap: cv2.VideoCapture, frame_interval: float
+) -> Iterator[np.ndarray]:
+    """
+    Yield one BGR frame every ``frame_interval`` seconds by walking the stream.
+
+    Frames are advanced with ``grab()`` and only the sampled ones are
+    converted with ``retrieve()``. Unlike ``cap.set(CAP_PROP_POS_FRAMES, ...)``
+    per sample, this never seeks back to a keyframe and re-decodes the GOP,
+    and the caller can stop consuming as soon as it has enough frames.
+
+    Args:
+        cap (cv2.VideoCapture): Opened capture positioned at the first frame
+        frame_interval (float): Seconds between consecutive samples
+
+    Yields:
+        np.ndarray: Sampled frames, at the same indices as the seek-based loop
+            (``int(k * fps * frame_interval)``)
+    """
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    step = fps * frame_interval if fps > 0 else 1.0
+    sample = 0
+    frame_index = 0
+
+    while cap.grab():
+        target = int(sample * step)
+        if target == frame_index:
+            ret, frame = cap.retrieve()
+            if not ret:
+                return
+            # Very low fps can map several samples onto the same frame
+            while target == frame_index:
+                yield frame
+                sample += 1
+                target = int(sample * step)
+        frame_index += 1
+
+
+def iter_frame_batches(
+    cap: cv2.VideoCapture, frame_interval: float, batch_size: int
+) -> Iterator[List[np.ndarray]]:
+    """Group ``iter_sampled_frames`` into lists of up to ``batch_size`` frames."""
+    batch = []
+    for frame in iter_sampled_frames(cap, frame_interval):
+        batch.append(frame)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
 
 def extract_faces_from_video(
@@ -10,9 +67,12 @@ def extract_faces_from_video(
     frame_interval: float = 0.5,
     max_frames: int = 120,
     resize_to: tuple = (224, 224),
+    seq_len: Optional[int] = None,
+    detector_backend: Optional[str] = None,
+    batch_size: Optional[int] = None,
 ) -> List[str]:  # FIXED RETURN TYPE
     """
-    Extract face frames from a video using MTCNN and save them resized to 224x224.
+    Extract face frames from a video and save them resized to 224x224.
 
     Args:
         video_path (str): Path to the input video file (.mp4 or .mkv)
@@ -20,33 +80,32 @@ def extract_faces_from_video(
         frame_interval (float): Seconds between consecutive frames to capture
         max_frames (int): Maximum number of frames to extract
         resize_to (tuple): Size (width, height) to resize cropped face to
+        seq_len (int, optional): Sequence length of the consumer; when set,
+            extraction stops after ``min(max_frames, seq_len)`` crops
+        detector_backend (str, optional): Face detector backend, defaults to
+            FACE_DETECTOR_BACKEND ("mtcnn")
+        batch_size (int, optional): Sampled frames per detector call,
+            defaults to FACE_DETECTOR_BATCH_SIZE
 
     Returns:
         List[str]: List of saved face frame image paths
     """
     os.makedirs(output_folder, exist_ok=True)
-    detector = MTCNN()
+    detector = get_face_detector(detector_backend)
     cap = cv2.VideoCapture(video_path)
     saved_paths = []
 
     if not cap.isOpened():
         raise IOError(f"Cannot open video: {video_path}")
 
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    frame_count = 0
+    if seq_len is not None:
+        max_frames = min(max_frames, seq_len)
+    batch_size = batch_size or FACE_DETECTOR_BATCH_SIZE
     captured = 0
 
-    while captured < max_frames:
-        frame_index = int(frame_count * fps * frame_interval)
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        results = detector.detect_faces(frame)
-        if results:
-            for idx, result in enumerate(results):
-                x, y, w, h = result["box"]
+    for frames in iter_frame_batches(cap, frame_interval, batch_size):
+        for frame, boxes in zip(frames, detector.detect_batch(frames)):
+            for x, y, w, h in boxes:
                 cropped = frame[y : y + h, x : x + w]
                 resized = cv2.resize(cropped, resize_to)
 
@@ -58,12 +117,171 @@ def extract_faces_from_video(
                 saved_paths.append(save_path)
                 captured += 1
 
-        frame_count += 1
+            if captured >= max_frames:
+                break
+
+        if captured >= max_frames:
+            break
 
     cap.release()
     return saved_paths
 
 
+def extract_faces_to_tensor(
+    video_path: str,
+    seq_len: int = 50,
+    frame_interval: float = 0.5,
+    resize_to: tuple = (224, 224),
+    detector_backend: Optional[str] = None,
+    batch_size: Optional[int] = None,
+) -> torch.Tensor:
+    """
+    In-memory variant of ``extract_faces_from_video`` for the video branch.
+
+    Face crops are resized straight into one preallocated uint8 buffer of
+    shape [seq_len, H, W, 3] and normalized in a single step, so nothing is
+    JPEG-encoded or written to disk. The stream is decoded sequentially and
+    extraction stops as soon as the buffer is full.
+
+    Args:
+        video_path (str): Path to the input video file (.mp4 or .mkv)
+        seq_len (int): Number of face crops the model consumes
+        frame_interval (float): Seconds between consecutive frames to capture
+        resize_to (tuple): Size (width, height) to resize cropped face to
+        detector_backend (str, optional): Face detector backend, defaults to
+            FACE_DETECTOR_BACKEND ("mtcnn")
+        batch_size (int, optional): Sampled frames per detector call,
+            defaults to FACE_DETECTOR_BATCH_SIZE
+
+    Returns:
+        torch.Tensor: normalized clip of shape [3, N, H, W] with N <= seq_len
+            (N == 0 if no face was found), crops in temporal order (the
+            former frame_{i}.jpg files were loaded in name order, see
+            LEGACY_FRAME_ORDER in ml/pipeline.py)
+    """
+    detector = get_face_detector(detector_backend)
+    cap = cv2.VideoCapture(video_path)
+
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video: {video_path}")
+
+    width, height = resize_to
+    buffer = np.empty((seq_len, height, width, 3), dtype=np.uint8)
+    batch_size = batch_size or FACE_DETECTOR_BATCH_SIZE
+    captured = 0
+
+    for frames in iter_frame_batches(cap, frame_interval, batch_size):
+        for frame, boxes in zip(frames, detector.detect_batch(frames)):
+            captured = _crop_faces(frame, boxes, buffer, captured, resize_to)
+
+        if captured >= seq_len:
+            break
+
+    cap.release()
+    # BGR -> RGB and normalize all crops at once
+    return frames_to_clip(buffer[:captured, :, :, ::-1])
+
+
+def _crop_faces(frame, boxes, buffer, captured, resize_to) -> int:
+    """Resize face crops into ``buffer`` from slot ``captured`` until full."""
+    for x, y, w, h in boxes:
+        if captured >= len(buffer):
+            break
+        # Detector boxes may start slightly outside the frame
+        x, y = max(x, 0), max(y, 0)
+        cropped = frame[y : y + h, x : x + w]
+        if cropped.size == 0:
+            continue
+        cv2.resize(cropped, resize_to, dst=buffer[captured])
+        captured += 1
+    return captured
+
+
+def window_starts(samples: Optional[int], seq_len: int, max_windows: int) -> List[int]:
+    """
+    First sample index of each ``seq_len``-sample window: back to back over
+    the whole recording, or ``max_windows`` windows spread evenly over it
+    when more would be needed (``samples`` None: length unknown, back to back
+    from the start).
+    """
+    if samples is None or samples <= seq_len * max_windows:
+        count = max_windows if samples is None else max(1, -(-samples // seq_len))
+        return [k * seq_len for k in range(count)]
+    return [int(s) for s in np.linspace(0, samples - seq_len, max_windows).round()]
+
+
+def extract_face_windows(
+    video_path: str,
+    seq_len: int = 50,
+    max_windows: int = 16,
+    frame_interval: float = 0.5,
+    resize_to: tuple = (224, 224),
+    detector_backend: Optional[str] = None,
+    batch_size: Optional[int] = None,
+) -> List[Tuple[float, float, torch.Tensor]]:
+    """
+    Segment variant of ``extract_faces_to_tensor`` covering the whole video.
+
+    Sampled frames are split into windows of ``seq_len`` samples (see
+    ``window_starts``); each window keeps up to ``seq_len`` face crops from
+    its own frames. Frames outside every window are never sent to the
+    detector, so the cost grows with the number of windows, which is at most
+    ``max_windows`` whatever the video length.
+
+    Returns:
+        list: (start seconds, end seconds, clip [3, N, H, W]) per window with
+            at least one face, in time order
+    """
+    detector = get_face_detector(detector_backend)
+    cap = cv2.VideoCapture(video_path)
+
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video: {video_path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    samples = None
+    if fps > 0 and frame_count > 0:
+        samples = int(np.ceil(frame_count / (fps * frame_interval)))
+    starts = window_starts(samples, seq_len, max_windows)
+
+    width, height = resize_to
+    buffers = np.empty((len(starts), seq_len, height, width, 3), dtype=np.uint8)
+    captured = [0] * len(starts)
+    batch_size = batch_size or FACE_DETECTOR_BATCH_SIZE
+    batch, owners = [], []
+
+    def detect():
+        for frame, k, boxes in zip(batch, owners, detector.detect_batch(batch)):
+            captured[k] = _crop_faces(frame, boxes, buffers[k], captured[k], resize_to)
+        batch.clear()
+        owners.clear()
+
+    for index, frame in enumerate(iter_sampled_frames(cap, frame_interval)):
+        k = bisect.bisect_right(starts, index) - 1
+        if index >= starts[-1] + seq_len:
+            break
+        if index >= starts[k] + seq_len or captured[k] >= seq_len:
+            continue  # between windows, or this window is already full
+        batch.append(frame)
+        owners.append(k)
+        if len(batch) >= batch_size:
+            detect()
+    if batch:
+        detect()
+
+    cap.release()
+    return [
+        (
+            start * frame_interval,
+            (start + seq_len) * frame_interval,
+            frames_to_clip(buffers[k, : captured[k], :, :, ::-1]),
+        )
+        for k, start in enumerate(starts)
+        if captured[k]
+    ]
+
+
 """
 
 == Example Usage ==
@@ -75,4 +293,11 @@ frame_paths = extract_faces_from_video(
     output_folder="temp/frames"
 )
 
+# In-memory variant: normalized [3, N, 224, 224] tensor, N <= 50
+frames = extract_faces_to_tensor(video_path="uploaded_video.mp4", seq_len=50)
+
+# Whole session in up to 16 windows of 50 samples (25 s each)
+for start, end, clip in extract_face_windows("uploaded_video.mp4", max_windows=16):
+    print(f"{start:.0f}-{end:.0f} s: {clip.shape[1]} crops")
+
 """
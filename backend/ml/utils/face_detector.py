@@ -0,0 +1,165 @@
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from models.profiling import region
+from models.registry import registry
+
+# ─── Configuration ───
+# FACE_DETECTOR_BACKEND: "mtcnn" (default) or "yunet" (OpenCV DNN, CPU-cheap)
+FACE_DETECTOR_BACKEND = os.getenv("FACE_DETECTOR_BACKEND", "mtcnn").lower()
+# Number of sampled frames handed to the detector per call
+FACE_DETECTOR_BATCH_SIZE = int(os.getenv("FACE_DETECTOR_BATCH_SIZE", "8"))
+# YuNet ONNX weights (face_detection_yunet_2023mar.onnx from the OpenCV zoo)
+YUNET_MODEL = os.getenv(
+    "YUNET_MODEL", "checkpoints/face_detection_yunet_2023mar.onnx"
+)
+YUNET_SCORE_THRESHOLD = float(os.getenv("YUNET_SCORE_THRESHOLD", "0.9"))
+
+Box = Tuple[int, int, int, int]  # x, y, w, h
+
+
+class FaceDetector:
+    """
+    Backend interface: detect faces in a batch of BGR frames.
+
+    Subclasses implement ``_detect_batch``. One instance is shared by all
+    requests in the process, so it is called from several threads at once;
+    backends that are not thread-safe must guard their state themselves.
+    """
+
+    name = "base"
+
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[Box]]:
+        """
+        Args:
+            frames (List[np.ndarray]): BGR frames as read by OpenCV
+
+        Returns:
+            List[List[Box]]: (x, y, w, h) boxes per frame, in detector order
+        """
+        if not frames:
+            return []
+        with region("face_detection"):
+            return self._detect_batch(frames)
+
+    def _detect_batch(self, frames: List[np.ndarray]) -> List[List[Box]]:
+        raise NotImplementedError
+
+    def warmup(self, size: Tuple[int, int] = (640, 360)):
+        """Run one dummy detection to build graphs and allocate buffers."""
+        width, height = size
+        self.detect_batch([np.zeros((height, width, 3), dtype=np.uint8)])
+
+
+class MTCNNDetector(FaceDetector):
+    """
+    MTCNN (TensorFlow); the mtcnn package detects one image per call. Calls
+    are serialized with a lock (the TF model is not safe to call from
+    several threads), so concurrent requests take turns here.
+    """
+
+    name = "mtcnn"
+
+    def __init__(self):
+        super().__init__()
+        from mtcnn.mtcnn import MTCNN
+
+        self.detector = MTCNN()
+        self._lock = threading.Lock()
+
+    def _detect_batch(self, frames):
+        with self._lock:
+            return [
+                [tuple(result["box"]) for result in self.detector.detect_faces(frame)]
+                for frame in frames
+            ]
+
+
+class YuNetDetector(FaceDetector):
+    """
+    OpenCV DNN YuNet face detector (cv2.FaceDetectorYN). A FaceDetectorYN
+    is not safe to share between threads (``setInputSize`` mutates it), so
+    every thread gets its own, built on first use in a few milliseconds,
+    and threads detect concurrently.
+    """
+
+    name = "yunet"
+
+    def __init__(self, model_path: str = YUNET_MODEL):
+        super().__init__()
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"YuNet model not found: {model_path}")
+        self.model_path = model_path
+        self._local = threading.local()
+        self._thread_detector()  # fail at construction on an unreadable model
+
+    def _thread_detector(self):
+        local = self._local
+        if getattr(local, "detector", None) is None:
+            local.detector = cv2.FaceDetectorYN.create(
+                self.model_path, "", (320, 320), YUNET_SCORE_THRESHOLD
+            )
+            local.input_size = (320, 320)
+        return local
+
+    def _detect_batch(self, frames):
+        local = self._thread_detector()
+        boxes = []
+        for frame in frames:
+            size = (frame.shape[1], frame.shape[0])
+            if size != local.input_size:
+                local.detector.setInputSize(size)
+                local.input_size = size
+            _, faces = local.detector.detect(frame)
+            if faces is None:
+                boxes.append([])
+                continue
+            boxes.append([tuple(int(v) for v in face[:4]) for face in faces])
+        return boxes
+
+
+FACE_DETECTOR_BACKENDS = {
+    MTCNNDetector.name: MTCNNDetector,
+    YuNetDetector.name: YuNetDetector,
+}
+
+# ─── Process-wide detectors (one instance per backend, via the registry) ───
+for _name, _cls in FACE_DETECTOR_BACKENDS.items():
+    registry.register(f"face_detector:{_name}", _cls)
+
+
+def get_face_detector(backend: Optional[str] = None) -> FaceDetector:
+    """
+    Return the shared detector for ``backend`` (default FACE_DETECTOR_BACKEND),
+    constructing it on first use.
+    """
+    backend = (backend or FACE_DETECTOR_BACKEND).lower()
+    if backend not in FACE_DETECTOR_BACKENDS:
+        raise ValueError(
+            f"Unknown face detector backend '{backend}', "
+            f"expected one of {sorted(FACE_DETECTOR_BACKENDS)}"
+        )
+    return registry.get(f"face_detector:{backend}")
+
+
+def warmup_face_detector(backend: Optional[str] = None) -> FaceDetector:
+    """Construct and warm up the configured detector (call once at startup)."""
+    detector = get_face_detector(backend)
+    detector.warmup()
+    return detector
+
+
+"""
+
+== Example Usage ==
+
+from ml.utils.face_detector import get_face_detector
+
+detector = get_face_detector("yunet")
+boxes_per_frame = detector.detect_batch([frame_a, frame_b])
+
+"""
@@ -0,0 +1,39 @@
+import os
+from typing import Dict, Optional
+
+# smaps_rollup fields reported by process_memory (values in kB)
+_FIELDS = {
+    "Rss": "rss_mb",
+    "Pss": "pss_mb",
+    "Shared_Clean": "shared_clean_mb",
+    "Shared_Dirty": "shared_dirty_mb",
+    "Private_Clean": "private_clean_mb",
+    "Private_Dirty": "private_dirty_mb",
+}
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, Optional[float]]:
+    """
+    Memory of one process in MiB (Linux only; values are None elsewhere).
+
+    ``rss_mb`` counts pages shared with other workers in full, ``pss_mb``
+    divides each shared page by the number of processes mapping it, so the
+    sum of PSS over all workers is their real footprint.
+
+    Args:
+        pid (int, optional): Process id, default the current process
+
+    Returns:
+        dict: pid, rss_mb, pss_mb, shared_*_mb and private_*_mb
+    """
+    pid = pid or os.getpid()
+    stats = {"pid": pid, **{key: None for key in _FIELDS.values()}}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in _FIELDS:
+                    stats[_FIELDS[name]] = round(int(rest.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return stats
@@ -1,7 +1,16 @@
 import os
-import tensorflow as tf
+import wave
 import numpy as np
-import matplotlib.pyplot as plt
+import torch
+import torch.nn.functional as F
+from matplotlib import colormaps
+
+from ml.utils.transforms import frames_to_clip
+from models.profiling import region
+
+# 256-entry viridis lookup table (RGB, uint8), matching what ``plt.imshow``
+# writes into the PNG with its default colormap
+VIRIDIS_LUT = colormaps["viridis"](np.arange(256), bytes=True)[:, :3]
 
 
 class Params:
@@ -27,50 +36,97 @@ class Params:
 
 
 def pad_waveform(waveform, params):
+    """
+    Zero-pad so the waveform holds at least one full patch and ends on a
+    patch hop boundary (NumPy port of the former TensorFlow version).
+    """
+    waveform = np.asarray(waveform, dtype=np.float32)
     min_waveform_seconds = (
         params.patch_window_seconds
         + params.stft_window_seconds
         - params.stft_hop_seconds
     )
-    min_num_samples = tf.cast(min_waveform_seconds * params.sample_rate, tf.int32)
-    num_samples = tf.shape(waveform)[0]
-    num_padding_samples = tf.maximum(0, min_num_samples - num_samples)
+    # TF converted these products to float32 before the int32 cast
+    min_num_samples = int(np.float32(min_waveform_seconds * params.sample_rate))
+    num_samples = waveform.shape[0]
+    num_padding_samples = max(0, min_num_samples - num_samples)
 
-    num_samples = tf.maximum(num_samples, min_num_samples)
+    num_samples = max(num_samples, min_num_samples)
     num_samples_after_first_patch = num_samples - min_num_samples
-    hop_samples = tf.cast(params.patch_hop_seconds * params.sample_rate, tf.int32)
-    num_hops_after_first_patch = tf.cast(
-        tf.math.ceil(
-            tf.cast(num_samples_after_first_patch, tf.float32)
-            / tf.cast(hop_samples, tf.float32)
-        ),
-        tf.int32,
+    hop_samples = int(np.float32(params.patch_hop_seconds * params.sample_rate))
+    num_hops_after_first_patch = int(
+        np.ceil(np.float32(num_samples_after_first_patch) / np.float32(hop_samples))
     )
     num_padding_samples += (
         hop_samples * num_hops_after_first_patch - num_samples_after_first_patch
     )
 
-    padded_waveform = tf.pad(
-        waveform, [[0, num_padding_samples]], mode="CONSTANT", constant_values=0.0
+    return np.pad(waveform, (0, num_padding_samples), mode="constant")
+
+
+def _frame(x, frame_length, frame_step):
+    """Strided view of ``x`` as [num_frames, frame_length, ...] (no padding)."""
+    if x.shape[0] < frame_length:
+        return np.empty((0, frame_length) + x.shape[1:], dtype=x.dtype)
+    windows = np.lib.stride_tricks.sliding_window_view(x, frame_length, axis=0)
+    # sliding_window_view appends the window axis last; move it to axis 1
+    return np.moveaxis(windows[::frame_step], -1, 1)
+
+
+def _hertz_to_mel(frequencies_hertz):
+    return 1127.0 * np.log1p(frequencies_hertz / 700.0)
+
+
+def linear_to_mel_weight_matrix(
+    num_mel_bins,
+    num_spectrogram_bins,
+    sample_rate,
+    lower_edge_hertz,
+    upper_edge_hertz,
+):
+    """Triangular HTK-mel filterbank, as tf.signal.linear_to_mel_weight_matrix."""
+    # The DC bin is excluded from every band and padded back as a zero row
+    linear_frequencies = np.linspace(
+        0.0, sample_rate / 2.0, num_spectrogram_bins, dtype=np.float32
+    )[1:]
+    spectrogram_bins_mel = _hertz_to_mel(linear_frequencies)[:, np.newaxis]
+
+    band_edges_mel = np.linspace(
+        _hertz_to_mel(np.float32(lower_edge_hertz)),
+        _hertz_to_mel(np.float32(upper_edge_hertz)),
+        num_mel_bins + 2,
+        dtype=np.float32,
+    )
+    lower_edge_mel = band_edges_mel[:-2][np.newaxis, :]
+    center_mel = band_edges_mel[1:-1][np.newaxis, :]
+    upper_edge_mel = band_edges_mel[2:][np.newaxis, :]
+
+    lower_slopes = (spectrogram_bins_mel - lower_edge_mel) / (
+        center_mel - lower_edge_mel
+    )
+    upper_slopes = (upper_edge_mel - spectrogram_bins_mel) / (
+        upper_edge_mel - center_mel
     )
-    return padded_waveform
+    mel_weights = np.maximum(0.0, np.minimum(lower_slopes, upper_slopes))
+    return np.pad(mel_weights, [[1, 0], [0, 0]]).astype(np.float32)
 
 
 def waveform_to_log_mel_spectrogram_patches(waveform, params):
     window_length_samples = int(round(params.sample_rate * params.stft_window_seconds))
     hop_length_samples = int(round(params.sample_rate * params.stft_hop_seconds))
     fft_length = 2 ** int(np.ceil(np.log2(window_length_samples)))
-    magnitude_spectrogram = tf.abs(
-        tf.signal.stft(
-            signals=waveform,
-            frame_length=window_length_samples,
-            frame_step=hop_length_samples,
-            fft_length=fft_length,
-        )
-    )
+
+    # STFT as tf.signal.stft: periodic Hann window, frames zero-padded at the
+    # end to fft_length, no padding of the signal itself
+    n = np.arange(window_length_samples) / window_length_samples
+    window = (0.5 - 0.5 * np.cos(2.0 * np.pi * n)).astype(np.float32)
+    waveform = np.asarray(waveform, dtype=np.float32)
+    frames = _frame(waveform, window_length_samples, hop_length_samples)
+    spectrum = np.fft.rfft(frames * window, n=fft_length, axis=1)
+    magnitude_spectrogram = np.abs(spectrum).astype(np.float32)
 
     num_spectrogram_bins = fft_length // 2 + 1
-    mel_weight_matrix = tf.signal.linear_to_mel_weight_matrix(
+    mel_weight_matrix = linear_to_mel_weight_matrix(
         num_mel_bins=params.mel_bands,
         num_spectrogram_bins=num_spectrogram_bins,
         sample_rate=params.sample_rate,
@@ -78,43 +134,60 @@ def waveform_to_log_mel_spectrogram_patches(waveform, params):
         upper_edge_hertz=params.mel_max_hz,
     )
 
-    mel_spectrogram = tf.matmul(magnitude_spectrogram, mel_weight_matrix)
-    log_mel_spectrogram = tf.math.log(mel_spectrogram + params.log_offset)
+    mel_spectrogram = magnitude_spectrogram @ mel_weight_matrix
+    log_mel_spectrogram = np.log(mel_spectrogram + np.float32(params.log_offset))
 
     spec_sr = params.sample_rate / hop_length_samples
     patch_win_len = int(round(spec_sr * params.patch_window_seconds))
     patch_hop_len = int(round(spec_sr * params.patch_hop_seconds))
 
-    features = tf.signal.frame(
-        signal=log_mel_spectrogram,
-        frame_length=patch_win_len,
-        frame_step=patch_hop_len,
-        axis=0,
-    )
+    features = _frame(log_mel_spectrogram, patch_win_len, patch_hop_len)
 
     return log_mel_spectrogram, features
 
 
+def read_wav(audio_path):
+    """
+    Read a 16-bit PCM .wav as float32 in [-1, 1), averaging channels to mono
+    (what tf.audio.decode_wav + the stereo mean used to produce).
+    """
+    with wave.open(audio_path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"Expected 16-bit PCM wav: {audio_path}")
+        channels = f.getnchannels()
+        pcm = f.readframes(f.getnframes())
+    waveform = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+    if channels > 1:
+        waveform = waveform.reshape(-1, channels).mean(axis=1)
+    return waveform
+
+
 def load_and_extract_spectrogram_patches(audio_path, params):
-    audio_binary = tf.io.read_file(audio_path)
-    waveform, _ = tf.audio.decode_wav(audio_binary)
+    return extract_spectrogram_patches(read_wav(audio_path), params)
 
-    if waveform.shape[-1] == 2:
-        waveform = tf.reduce_mean(waveform, axis=-1)  # Convert stereo to mono
-    if len(waveform.shape) == 2 and waveform.shape[-1] == 1:
-        waveform = tf.squeeze(waveform, axis=-1)
 
+def extract_spectrogram_patches(waveform, params):
+    """
+    Log-mel patches from an in-memory mono waveform (float32 in [-1, 1] at
+    ``params.sample_rate``).
+
+    Returns:
+        np.ndarray: [num_patches, patch_frames, mel_bands] float32
+    """
     waveform = pad_waveform(waveform, params)
     log_spec, patches = waveform_to_log_mel_spectrogram_patches(waveform, params)
     return patches
 
 
 def save_patches_as_images(patches, output_dir, base_filename):
+    # Debug-only path; keep pyplot out of the request-time imports
+    import matplotlib.pyplot as plt
+
     os.makedirs(output_dir, exist_ok=True)
     num_patches = patches.shape[0]
 
     for i in range(num_patches):
-        patch = patches[i].numpy()
+        patch = np.asarray(patches[i])
         plt.figure(figsize=(4, 4))
         plt.imshow(patch.T, aspect="auto", origin="lower")
         plt.axis("off")
@@ -126,18 +199,78 @@ def save_patches_as_images(patches, output_dir, base_filename):
         plt.close()
 
 
-def process_audio_file(audio_path, output_dir):
+def patches_to_tensor(patches, size=(224, 224)):
+    """
+    Colormap log-mel patches in memory, without the matplotlib/PNG round-trip.
+
+    Mirrors ``save_patches_as_images`` followed by ``img_tf``: each patch is
+    min/max scaled like ``imshow``'s autoscaling, flipped so low frequencies
+    sit at the bottom (``origin="lower"``), resampled to ``size`` and mapped
+    through the viridis lookup table before ImageNet normalization.
+
+    Args:
+        patches (np.ndarray): [N, patch_frames, mel_bands] patches
+        size (tuple): output (height, width)
+
+    Returns:
+        torch.Tensor: normalized tensor of shape [3, N, height, width]
+    """
+    data = torch.from_numpy(np.asarray(patches, dtype=np.float32))
+    # [N, frames, bands] -> [N, 1, bands, frames] with band 0 at the bottom
+    data = data.transpose(1, 2).flip(1).unsqueeze(1)
+
+    vmin = data.amin(dim=(1, 2, 3), keepdim=True)
+    vmax = data.amax(dim=(1, 2, 3), keepdim=True)
+    scale = torch.where(vmax > vmin, vmax - vmin, torch.ones_like(vmax))
+    data = (data - vmin) / scale
+
+    data = F.interpolate(
+        data, size=size, mode="bilinear", align_corners=False, antialias=True
+    )
+    idx = (data.squeeze(1) * 256).long().clamp_(0, 255).numpy()
+    return frames_to_clip(VIRIDIS_LUT[idx])  # [3, N, H, W]
+
+
+def patch_indices(start, end, num_patches, params=None):
+    """
+    Indices of the patches overlapping [start, end) seconds of the waveform
+    (the last patch if none does, e.g. past the end of a short recording).
     """
-    Main function to convert .wav audio into multiple spectrogram patch images.
+    params = params or Params()
+    hop, window = params.patch_hop_seconds, params.patch_window_seconds
+    hits = [
+        i for i in range(num_patches) if i * hop < end and i * hop + window > start
+    ]
+    return hits or [num_patches - 1]
+
+
+def process_audio_file(audio, output_dir=None, name=None):
+    """
+    Main function to convert audio into spectrogram patches.
 
     Args:
-        audio_path (str): path to .wav file
-        output_dir (str): output directory to save patches
+        audio (str or np.ndarray): path to .wav file, or a float32 16 kHz
+            mono waveform as returned by ``decode_audio``
+        output_dir (str, optional): if given, also save the patches as PNG
+            images there (debug mode)
+        name (str, optional): PNG filename prefix; defaults to the .wav name
+
+    Returns:
+        torch.Tensor: normalized patches of shape [3, N, 224, 224] in
+            temporal order (the former PNG files were loaded in name order,
+            see LEGACY_PATCH_ORDER in ml/pipeline.py)
     """
     params = Params()
-    patches = load_and_extract_spectrogram_patches(audio_path, params)
-    filename = os.path.splitext(os.path.basename(audio_path))[0]
-    save_patches_as_images(patches, output_dir, filename)
+    with region("log_mel_spectrogram"):
+        if isinstance(audio, str):
+            patches = load_and_extract_spectrogram_patches(audio, params)
+            name = name or os.path.splitext(os.path.basename(audio))[0]
+        else:
+            patches = extract_spectrogram_patches(audio, params)
+    if output_dir is not None:
+        save_patches_as_images(patches, output_dir, name or "audio")
+    with region("patch_render"):
+        return patches_to_tensor(patches)
 
 
 """
@@ -146,8 +279,14 @@ def process_audio_file(audio_path, output_dir):
 
 from ml.utils.spectrogram import process_audio_file
 
+specs = process_audio_file("temp/audio/uploaded_video.wav")
+
+# From an in-memory waveform (see extract_audio.decode_audio)
+specs = process_audio_file(waveform)
+
+# Debug: also write the patches as PNG images
 process_audio_file(
-    audio_path="temp/audio/uploaded_video.wav",
+    "temp/audio/uploaded_video.wav",
     output_dir="temp/spectrogram_patches"
 )
 
@@ -0,0 +1,15 @@
+import time
+
+
+def timed_call(fn, *args, **kwargs):
+    """
+    Call ``fn(*args, **kwargs)`` and measure its wall-clock duration.
+
+    Module-level so it can be submitted to a process pool as well.
+
+    Returns:
+        tuple: (result, seconds)
+    """
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
@@ -1,9 +1,316 @@
 import os
-import whisper
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
 
-# Load the Whisper model once
-model = whisper.load_model("base")
+import numpy as np
+
+from ml.utils.extract_audio import SAMPLE_RATE, decode_audio
+from models.profiling import region
+from models.registry import registry
+
+# ─── Configuration ───
+# WHISPER_BACKEND: "whisper" (openai-whisper, default) or "faster-whisper"
+# (CTranslate2; int8 on CPU by default, see WHISPER_COMPUTE_TYPE; install
+# from requirements-optional.txt)
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "whisper").lower()
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+# Chunks decoded at once: batch size for openai-whisper, worker threads for
+# faster-whisper
+WHISPER_CHUNK_PARALLEL = int(os.getenv("WHISPER_CHUNK_PARALLEL", "4"))
+
+# Transcription profiles. The text model only sees a bag of words, so the
+# fast profiles trade punctuation and casing (stripped anyway) for speed:
+#   model          Whisper checkpoint ("tiny.en" / "base.en" skip language ID)
+#   language       pinned language code, None to auto-detect per file
+#   greedy         temperature 0 only: no beam search, no fallback retries
+#   vad            drop silence before decoding (see ``trim_silence``)
+#   chunk_seconds  split long audio into chunks of at most this many seconds
+#                  and decode them in parallel (0: one sequential pass)
+WHISPER_PROFILES = {
+    "default": dict(
+        model="base", language=None, greedy=False, vad=False, chunk_seconds=0
+    ),
+    "fast": dict(
+        model="base.en", language="en", greedy=True, vad=True, chunk_seconds=30
+    ),
+    "fastest": dict(
+        model="tiny.en", language="en", greedy=True, vad=True, chunk_seconds=30
+    ),
+}
+WHISPER_PROFILE = os.getenv("WHISPER_PROFILE", "default").lower()
+
+# Energy VAD: frames quieter than the loudest frame by more than this many
+# dB are silence; speech keeps VAD_PAD_SECONDS of context on each side
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "35"))
+VAD_PAD_SECONDS = float(os.getenv("VAD_PAD_SECONDS", "0.25"))
+VAD_FRAME_SECONDS = 0.03
+# Frames below this level are silence whatever the loudest frame (dBFS)
+VAD_FLOOR_DB = -60.0
+
+
+def profile_settings(name: Optional[str] = None) -> Dict:
+    """
+    Settings of profile ``name`` (default WHISPER_PROFILE). For the configured
+    profile, WHISPER_MODEL, WHISPER_LANGUAGE, WHISPER_GREEDY, WHISPER_VAD and
+    WHISPER_CHUNK_SECONDS override single fields.
+    """
+    name = (name or WHISPER_PROFILE).lower()
+    if name not in WHISPER_PROFILES:
+        raise ValueError(
+            f"Unknown Whisper profile '{name}', "
+            f"expected one of {sorted(WHISPER_PROFILES)}"
+        )
+    settings = dict(WHISPER_PROFILES[name])
+    if name != WHISPER_PROFILE:
+        return settings
+
+    env = os.environ
+    if env.get("WHISPER_MODEL"):
+        settings["model"] = env["WHISPER_MODEL"]
+    if "WHISPER_LANGUAGE" in env:
+        settings["language"] = env["WHISPER_LANGUAGE"] or None
+    if env.get("WHISPER_GREEDY"):
+        settings["greedy"] = env["WHISPER_GREEDY"] == "1"
+    if env.get("WHISPER_VAD"):
+        settings["vad"] = env["WHISPER_VAD"] == "1"
+    if env.get("WHISPER_CHUNK_SECONDS"):
+        settings["chunk_seconds"] = float(env["WHISPER_CHUNK_SECONDS"])
+    return settings
+
+
+def _frame_db(audio: np.ndarray, frame: int) -> np.ndarray:
+    frames = audio[: len(audio) // frame * frame].reshape(-1, frame)
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+    return 20 * np.log10(rms + 1e-10)
+
+
+def trim_silence(
+    audio: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    threshold_db: float = VAD_THRESHOLD_DB,
+    pad_seconds: float = VAD_PAD_SECONDS,
+) -> np.ndarray:
+    """
+    Drop silent stretches of a waveform (energy VAD, no extra model).
+
+    Frames of 30 ms more than ``threshold_db`` below the loudest frame (or
+    below -60 dBFS) are silence. Speech is padded by ``pad_seconds`` on each
+    side, so pauses shorter than twice that are kept and words are not
+    clipped.
+
+    Returns:
+        np.ndarray: the voiced samples concatenated (empty if none)
+    """
+    frame = int(sample_rate * VAD_FRAME_SECONDS)
+    if len(audio) < frame:
+        return audio
+    db = _frame_db(audio, frame)
+    voiced = db > max(db.max() - threshold_db, VAD_FLOOR_DB)
+    pad = int(round(pad_seconds / VAD_FRAME_SECONDS))
+    if pad:
+        voiced = np.convolve(voiced, np.ones(2 * pad + 1), mode="same") > 0
+    # Samples past the last whole frame follow the last frame's decision
+    mask = np.repeat(voiced, frame)
+    mask = np.concatenate([mask, np.full(len(audio) - len(mask), voiced[-1])])
+    return audio[mask]
+
+
+def split_chunks(
+    audio: np.ndarray, chunk_seconds: float, sample_rate: int = SAMPLE_RATE
+) -> List[np.ndarray]:
+    """
+    Split a waveform into chunks of at most ``chunk_seconds``, cutting at the
+    quietest 30 ms frame of the last fifth of each chunk so that words are
+    rarely split.
+    """
+    size = int(chunk_seconds * sample_rate)
+    frame = int(sample_rate * VAD_FRAME_SECONDS)
+    chunks, start = [], 0
+    while len(audio) - start > size:
+        window = audio[start : start + size]
+        tail = size - size // 5
+        cut = tail + frame * int(np.argmin(_frame_db(window[tail:], frame)))
+        chunks.append(window[:cut])
+        start += cut
+    chunks.append(audio[start:])
+    return chunks
+
+
+class Transcriber:
+    """
+    Backend interface: raw transcript text of a 16 kHz mono waveform.
+
+    ``transcribe`` applies the profile (VAD, chunking) around the backend's
+    ``_transcribe`` (one waveform) and ``_transcribe_chunks`` (several,
+    decoded in parallel). Backends whose model cannot run concurrent decodes
+    set ``thread_safe = False`` and are serialized with a lock.
+    """
+
+    name = "base"
+    thread_safe = True
+
+    def __init__(self, settings: Dict):
+        self.settings = settings
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio: Union[str, np.ndarray]) -> str:
+        """
+        Args:
+            audio (str or np.ndarray): Path to an audio/video file, or a
+                float32 16 kHz mono waveform (as from ``decode_audio``)
+
+        Returns:
+            str: raw transcript
+        """
+        if isinstance(audio, str):
+            audio = decode_audio(audio)
+        if self.settings["vad"]:
+            audio = trim_silence(audio)
+            if not len(audio):
+                return ""
+        chunk_seconds = self.settings["chunk_seconds"]
+        if chunk_seconds and len(audio) > chunk_seconds * SAMPLE_RATE:
+            run, audio = self._transcribe_chunks, split_chunks(audio, chunk_seconds)
+        else:
+            run = self._transcribe
+        if self.thread_safe:
+            with region("whisper_decode"):
+                return run(audio)
+        with self._lock, region("whisper_decode"):
+            return run(audio)
+
+    def warmup(self):
+        """Decode one second of silence (VAD would skip it) to load the model."""
+        with self._lock:
+            self._transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32))
+
+    def _transcribe(self, audio: np.ndarray) -> str:
+        raise NotImplementedError
+
+    def _transcribe_chunks(self, chunks: List[np.ndarray]) -> str:
+        return " ".join(self._transcribe(chunk).strip() for chunk in chunks)
+
+
+class OpenAIWhisperTranscriber(Transcriber):
+    """
+    openai-whisper. With greedy decoding, chunks of up to 30 s (one Whisper
+    window) are decoded as one batch per WHISPER_CHUNK_PARALLEL without
+    timestamps; otherwise each chunk goes through ``model.transcribe``, which
+    handles longer chunks and the temperature fallback. Decoding installs
+    kv-cache hooks on the shared model, so calls are serialized.
+    """
+
+    name = "whisper"
+    thread_safe = False
+
+    def __init__(self, settings: Dict):
+        super().__init__(settings)
+        import whisper
+
+        self.model = whisper.load_model(settings["model"])
+        self.fp16 = self.model.device.type == "cuda"
+
+    def _transcribe(self, audio):
+        options = {"language": self.settings["language"], "fp16": self.fp16}
+        if self.settings["greedy"]:
+            options.update(temperature=0.0, condition_on_previous_text=False)
+        return self.model.transcribe(audio, **options)["text"]
+
+    def _transcribe_chunks(self, chunks):
+        import torch
+        import whisper
+
+        # pad_or_trim below keeps only the first 30 s of each chunk, and
+        # whisper.decode has no temperature fallback
+        longest = max(len(chunk) for chunk in chunks)
+        if not self.settings["greedy"] or longest > whisper.audio.N_SAMPLES:
+            return super()._transcribe_chunks(chunks)
+
+        options = whisper.DecodingOptions(
+            language=self.settings["language"],
+            temperature=0.0,
+            without_timestamps=True,
+            fp16=self.fp16,
+        )
+        texts = []
+        for i in range(0, len(chunks), max(1, WHISPER_CHUNK_PARALLEL)):
+            mel = torch.stack(
+                [
+                    whisper.log_mel_spectrogram(
+                        whisper.pad_or_trim(torch.from_numpy(chunk)),
+                        n_mels=self.model.dims.n_mels,
+                    )
+                    for chunk in chunks[i : i + WHISPER_CHUNK_PARALLEL]
+                ]
+            ).to(self.model.device)
+            texts += [r.text.strip() for r in whisper.decode(self.model, mel, options)]
+        return " ".join(texts)
+
+
+class FasterWhisperTranscriber(Transcriber):
+    """faster-whisper (CTranslate2); concurrent decodes use its worker pool."""
+
+    name = "faster-whisper"
+
+    def __init__(self, settings: Dict):
+        super().__init__(settings)
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(
+            settings["model"],
+            compute_type=WHISPER_COMPUTE_TYPE,
+            num_workers=max(1, WHISPER_CHUNK_PARALLEL),
+        )
+
+    def _transcribe(self, audio):
+        options = {"language": self.settings["language"]}
+        if self.settings["greedy"]:
+            options.update(
+                beam_size=1, temperature=0.0, condition_on_previous_text=False
+            )
+        segments, _ = self.model.transcribe(audio, **options)
+        return "".join(segment.text for segment in segments)
+
+    def _transcribe_chunks(self, chunks):
+        with ThreadPoolExecutor(max_workers=max(1, WHISPER_CHUNK_PARALLEL)) as pool:
+            texts = pool.map(self._transcribe, chunks)
+        return " ".join(text.strip() for text in texts)
+
+
+TRANSCRIBER_BACKENDS = {
+    OpenAIWhisperTranscriber.name: OpenAIWhisperTranscriber,
+    FasterWhisperTranscriber.name: FasterWhisperTranscriber,
+}
+
+
+def build_transcriber(
+    backend: Optional[str] = None, profile: Optional[str] = None
+) -> Transcriber:
+    """New transcriber for ``backend`` and ``profile`` (defaults: configured)."""
+    backend = (backend or WHISPER_BACKEND).lower()
+    if backend not in TRANSCRIBER_BACKENDS:
+        raise ValueError(
+            f"Unknown Whisper backend '{backend}', "
+            f"expected one of {sorted(TRANSCRIBER_BACKENDS)}"
+        )
+    return TRANSCRIBER_BACKENDS[backend](profile_settings(profile))
+
+
+# Loaded once per process on first use (or during startup warm-up)
+registry.register("whisper", build_transcriber)
+
+
+def get_whisper_model() -> Transcriber:
+    return registry.get("whisper")
+
+
+def warmup_transcriber() -> Transcriber:
+    """Load the configured transcriber and run one decode."""
+    transcriber = get_whisper_model()
+    transcriber.warmup()
+    return transcriber
 
 
 def preprocess_text(text: str) -> str:
@@ -21,6 +328,22 @@ def preprocess_text(text: str) -> str:
     return text.strip()
 
 
+def transcribe(audio) -> str:
+    """
+    Transcribe audio with the configured backend and profile and clean the
+    text.
+
+    Args:
+        audio (str or np.ndarray): Path to an audio file, or a float32 16 kHz
+            mono waveform (decoded once by ``decode_audio``; Whisper then
+            skips spawning its own ffmpeg)
+
+    Returns:
+        str: Cleaned transcript
+    """
+    return preprocess_text(get_whisper_model().transcribe(audio))
+
+
 def transcribe_and_save(audio_path: str, save_dir: str) -> str:
     """
     Transcribe a given audio file using Whisper, clean it,
@@ -34,8 +357,7 @@ def transcribe_and_save(audio_path: str, save_dir: str) -> str:
         str: Path to saved .txt transcript file
     """
     try:
-        result = model.transcribe(audio_path)
-        cleaned_text = preprocess_text(result["text"])
+        cleaned_text = transcribe(audio_path)
 
         os.makedirs(save_dir, exist_ok=True)
         base_name = os.path.splitext(os.path.basename(audio_path))[0]
@@ -49,7 +371,10 @@ def transcribe_and_save(audio_path: str, save_dir: str) -> str:
     except Exception as e:
         msg = str(e).lower()
         if isinstance(e, FileNotFoundError) or "ffmpeg" in msg or "ffprobe" in msg:
-            print("FFmpeg not found – please install FFmpeg and ensure it’s on your PATH.")
+            print(
+                "FFmpeg not found – please install FFmpeg and ensure it’s on "
+                "your PATH."
+            )
         print(f"Error transcribing {audio_path}: {e}")
         raise
 
@@ -68,5 +393,11 @@ transcript_path = transcribe_and_save(
 with open(transcript_path, "r", encoding="utf-8") as f:
     transcript = f.read()
 
-    
+# Faster profile for long interviews (or set WHISPER_PROFILE=fast)
+from ml.utils.transcribe import build_transcriber, preprocess_text
+
+transcriber = build_transcriber("faster-whisper", "fast")
+text = preprocess_text(transcriber.transcribe("temp/audio/uploaded_video.wav"))
+
+
 """
@@ -0,0 +1,43 @@
+from typing import List
+
+import numpy as np
+import torch
+
+# ImageNet statistics used by ``img_tf`` in models/predictor.py
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+def frames_to_clip(frames: np.ndarray) -> torch.Tensor:
+    """
+    Convert a stack of RGB frames into a normalized model input clip.
+
+    Vectorized equivalent of applying ``ToTensor`` + ``Normalize`` from
+    ``img_tf`` to every frame and stacking along the time axis.
+
+    Args:
+        frames (np.ndarray): uint8 array of shape [T, H, W, 3] (RGB) or a
+            float array already scaled to [0, 1]
+
+    Returns:
+        torch.Tensor: float32 tensor of shape [3, T, H, W]
+    """
+    clip = torch.from_numpy(np.ascontiguousarray(frames))
+    if clip.dtype == torch.uint8:
+        clip = clip.float().div_(255.0)
+    else:
+        clip = clip.float()
+    clip = clip.permute(3, 0, 1, 2)  # [3, T, H, W]
+    mean = torch.tensor(IMAGENET_MEAN, dtype=clip.dtype).view(3, 1, 1, 1)
+    std = torch.tensor(IMAGENET_STD, dtype=clip.dtype).view(3, 1, 1, 1)
+    return clip.sub(mean).div_(std).contiguous()
+
+
+def legacy_file_order(count: int) -> List[int]:
+    """
+    Indices 0..count-1 in the order ``sorted()`` listed the numbered files
+    (``frame_{i}.jpg``, ``{name}_patch_{i}.png``) the models were fed from
+    before the in-memory pipeline: 0, 1, 10, 11, ..., 19, 2, 20, ...
+    Identical to temporal order below 11 items.
+    """
+    return sorted(range(count), key=str)
@@ -0,0 +1,211 @@
+import json
+import os
+from typing import Dict, Optional
+
+import torch
+
+# ─── Confidence-gated cascade (FUSION_CASCADE=1): text and video first, the
+# audio branch only when its output could change the fused prediction ───
+FUSION_CASCADE = os.getenv("FUSION_CASCADE", "0") == "1"
+# Range of the audio logits measured offline (python -m models.cascade)
+CASCADE_BOUNDS = os.getenv("CASCADE_BOUNDS", "checkpoints/cascade_bounds.json")
+# Grid points per audio logit when bounding the head over the range
+CASCADE_GRID = int(os.getenv("CASCADE_GRID", "9"))
+# Fraction of the measured range added on each side of it
+CASCADE_MARGIN = float(os.getenv("CASCADE_MARGIN", "0.1"))
+
+
+class AudioGate:
+    """
+    Decides per row whether the audio logits can change the fused argmax.
+
+    ``FusionHead`` computes ``fc(LayerNorm([wv*v, wt*t, wa*a]))``. Given the
+    video and text logits and audio logits ``a`` confined to the box
+    [audio_min, audio_max], the margin of the winning class over every other
+    one is evaluated on a grid over the box. Between grid points LayerNorm
+    moves its output by at most ``|wa| r / (sigma - |wa| r / sqrt(n))``
+    (``r`` the cell half-diagonal, ``sigma`` the LayerNorm scale at the grid
+    point), which is subtracted from each margin. If every margin stays
+    positive, no audio output in the box can flip the prediction and the
+    audio branch is skipped; the reported logits then use the box centre.
+    """
+
+    def __init__(
+        self,
+        head,
+        audio_min,
+        audio_max,
+        grid: int = CASCADE_GRID,
+        margin: float = CASCADE_MARGIN,
+    ):
+        with torch.no_grad():
+            self.wv, self.wt, self.wa = (
+                float(w) for w in (head.wv, head.wt, head.wa)
+            )
+            self.gamma = head.norm.weight.detach().float().clone()
+            self.beta = head.norm.bias.detach().float().clone()
+            self.eps = head.norm.eps
+            self.weight = head.fc.weight.detach().float().clone()  # (nc, 3nc)
+            self.bias = head.fc.bias.detach().float().clone()
+
+        lo = torch.as_tensor(audio_min, dtype=torch.float32)
+        hi = torch.as_tensor(audio_max, dtype=torch.float32)
+        pad = (hi - lo) * margin
+        lo, hi = lo - pad, hi + pad
+        self.center = (lo + hi) / 2
+        axes = [torch.linspace(l, h, grid) for l, h in zip(lo.tolist(), hi.tolist())]
+        self.points = torch.cartesian_prod(*axes).view(-1, len(axes))  # (G, nc)
+        step = (hi - lo) / max(grid - 1, 1)
+        self.radius = float(torch.linalg.vector_norm(step / 2))
+
+        # ||(W_c - W_k) * gamma|| for every class pair: margin change per unit
+        # of LayerNorm output
+        diff = self.weight[:, None, :] - self.weight[None, :, :]  # (nc, nc, 3nc)
+        self.pair_norms = torch.linalg.vector_norm(diff * self.gamma, dim=-1)
+
+    @classmethod
+    def load(cls, head, path: str = CASCADE_BOUNDS, versions: Optional[str] = None):
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"Cascade bounds not found: {path} (measure them with "
+                "python -m models.cascade)"
+            )
+        with open(path) as f:
+            bounds = json.load(f)
+        if versions is not None and bounds.get("versions") not in (None, versions):
+            raise RuntimeError(
+                f"Cascade bounds in {path} were measured with other "
+                "checkpoints; re-run python -m models.cascade"
+            )
+        return cls(head, bounds["audio_min"], bounds["audio_max"])
+
+    def _logits(self, z: torch.Tensor):
+        """Head logits and LayerNorm scale for fused inputs z (..., 3nc)."""
+        mean = z.mean(dim=-1, keepdim=True)
+        sigma = torch.sqrt(z.var(dim=-1, unbiased=False, keepdim=True) + self.eps)
+        y = (z - mean) / sigma * self.gamma + self.beta
+        return y @ self.weight.T + self.bias, sigma.squeeze(-1)
+
+    def needs_audio(self, v: torch.Tensor, t: torch.Tensor) -> torch.Tensor:
+        """(B,) bool: True where some audio output in the box flips the argmax."""
+        B, G = v.shape[0], len(self.points)
+        known = torch.cat([self.wv * v, self.wt * t], dim=1).float().cpu()
+        z = torch.cat(
+            [
+                known[:, None, :].expand(B, G, -1),
+                (self.wa * self.points)[None].expand(B, G, -1),
+            ],
+            dim=-1,
+        )
+        logits, sigma = self._logits(z)  # (B, G, nc), (B, G)
+
+        winner = self._logits(
+            torch.cat([known, (self.wa * self.center).expand(B, -1)], dim=1)
+        )[0].argmax(dim=1)
+        margins = logits.gather(2, winner[:, None, None].expand(B, G, 1)) - logits
+        drift = abs(self.wa) * self.radius
+        sigma_low = sigma - drift / z.shape[-1] ** 0.5
+        slack = self.pair_norms[winner][:, None, :] * drift / sigma_low[..., None]
+        safe = (margins - slack > 0) | (
+            torch.arange(logits.shape[-1]) == winner[:, None, None]
+        )
+        certain = (sigma_low > 0).all(dim=1) & safe.all(dim=2).all(dim=1)
+        return ~certain.to(v.device)
+
+
+def cascade_forward(model, gate: AudioGate, vids, auds, text_feat) -> Dict:
+    """
+    ``model(vids, auds, text_feat, return_modalities=True)`` for a
+    ``LateFusion`` or ``OnnxFusionModel``, running the audio branch only on
+    the rows ``gate`` cannot decide without it. Adds "audio_skipped", a (B,)
+    bool tensor; skipped rows carry the box centre as their "audio" vector.
+    """
+    v, video_features = model.video(vids)
+    skipped = ~gate.needs_audio(v, text_feat)
+    a = gate.center.to(v.device, v.dtype).expand(len(v), -1).clone()
+    if not skipped.all():
+        a[~skipped] = model.audio(auds[~skipped])
+    return {
+        "video": v,
+        "audio": a,
+        "text": text_feat,
+        "video_features": video_features,
+        "logits": model.head(v, text_feat, a),
+        "audio_skipped": skipped,
+    }
+
+
+def measure_bounds(audio_logits: torch.Tensor, versions: str, path=CASCADE_BOUNDS):
+    """Save the per-class min/max of (N, nc) audio logits as the gate's box."""
+    bounds = {
+        "audio_min": audio_logits.min(dim=0).values.tolist(),
+        "audio_max": audio_logits.max(dim=0).values.tolist(),
+        "samples": len(audio_logits),
+        "versions": versions,
+    }
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(bounds, f, indent=2)
+    return bounds
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import numpy as np
+
+    from .predictor import checkpoint_versions, load_fusion_model, pad_sequence
+
+    parser = argparse.ArgumentParser(
+        description="Measure the audio logit range used by FUSION_CASCADE"
+    )
+    parser.add_argument(
+        "videos",
+        nargs="*",
+        help="sample videos (default: audio vectors in the feature store)",
+    )
+    parser.add_argument("--out", default=CASCADE_BOUNDS)
+    args = parser.parse_args()
+
+    versions = checkpoint_versions()
+    if args.videos:
+        from ml.utils.extract_audio import decode_audio
+        from ml.utils.spectrogram import process_audio_file
+
+        fusion = load_fusion_model()
+        rows = []
+        with torch.no_grad():
+            for path in args.videos:
+                spectrograms = process_audio_file(decode_audio(path))
+                rows.append(fusion.audio(pad_sequence(spectrograms)[None])[0])
+        audio_logits = torch.stack(rows)
+    else:
+        from feature_store import get_feature_store
+
+        from ml.pipeline import result_versions
+
+        store = get_feature_store()
+        records = (
+            list(store.records(result_versions())) if store is not None else []
+        )
+        if not records:
+            raise SystemExit(
+                "No feature store records for the current checkpoints and settings; "
+                "pass sample videos instead"
+            )
+        audio_logits = torch.from_numpy(
+            np.stack(
+                [
+                    r["arrays"]["audio"]
+                    for r in records
+                    if not r["arrays"].get("audio_skipped", False)
+                ]
+            )
+        )
+
+    bounds = measure_bounds(audio_logits, versions, args.out)
+    print(
+        f"Audio logits over {bounds['samples']} samples: min {bounds['audio_min']}, "
+        f"max {bounds['audio_max']} -> {args.out}"
+    )
@@ -1,6 +1,46 @@
+import os
+
 import torch
 import torch.nn as nn
 
+from .profiling import region
+
+# ─── Audio branch micro-batching: EfficientNetV2-L sees at most this many
+# patches per call, bounding peak activation memory (0 = all at once) ───
+AUDIO_MICRO_BATCH = int(os.getenv("AUDIO_MICRO_BATCH", "16"))
+
+
+def dedup_index(seq: torch.Tensor):
+    """
+    Find consecutive repeats along the time axis of a (B, C, T, H, W) input.
+
+    Sequences shorter than SEQ_LEN are padded by repeating the last step, so a
+    short clip carries many identical patches. Returns ``keep``, a (B*T,) mask
+    of the first step in each run of equal steps, and ``src``, a (B*T,) index
+    mapping every step to its row among the kept ones. ``f(x[keep])[src]``
+    equals ``f(x)`` for any per-sample ``f``, so the padded mean is unchanged.
+    """
+    B, C, T, H, W = seq.shape
+    keep = torch.ones(B, T, dtype=torch.bool, device=seq.device)
+    if T > 1:
+        same = (seq[:, :, 1:] == seq[:, :, :-1]).flatten(3).all(dim=3).all(dim=1)
+        keep[:, 1:] = ~same  # (B, T-1)
+    keep = keep.flatten()
+    src = keep.long().cumsum(0) - 1
+    return keep, src
+
+
+def run_micro_batches(fn, x: torch.Tensor, micro_batch: int) -> torch.Tensor:
+    """
+    ``fn(x)`` for a per-row ``fn``, evaluated ``micro_batch`` rows at a time
+    (in one call when ``micro_batch`` <= 0 or covers ``x``). Only one
+    micro-batch's activations are alive at once; the outputs are
+    concatenated in order, so any reduction over them is unchanged.
+    """
+    if micro_batch <= 0 or len(x) <= micro_batch:
+        return fn(x)
+    return torch.cat([fn(chunk) for chunk in x.split(micro_batch)])
+
 
 class PTSDVideoTransformer(nn.Module):
     """
@@ -47,10 +87,11 @@ class FusionHead(nn.Module):
 
     def forward(self, v, t, a):
         # v, t, a: (B, nc)
-        fused = torch.cat([self.wv * v, self.wt * t, self.wa * a], dim=1)  # (B, nc*3)
-        fused = self.norm(fused)
-        fused = self.dp(fused)
-        return self.fc(fused)  # (B, nc)
+        with region("fusion_head"):
+            fused = torch.cat([self.wv * v, self.wt * t, self.wa * a], dim=1)
+            fused = self.norm(fused)  # (B, nc*3)
+            fused = self.dp(fused)
+            return self.fc(fused)  # (B, nc)
 
 
 class LateFusion(nn.Module):
@@ -58,25 +99,56 @@ class LateFusion(nn.Module):
     Full model combining video, text, and audio modalities.
     """
 
-    def __init__(self, vm, tm, am, nc=2):
+    def __init__(self, vm, tm, am, nc=2, audio_micro_batch=AUDIO_MICRO_BATCH):
         super().__init__()
         self.vm = vm  # PTSDVideoTransformer
         self.tm = tm  # text model
         self.am = am  # EfficientNetV2-L
         self.head = FusionHead(nc)
-
-    def forward(self, vids, auds, text_feat):
-        # === Video ===
-        v = self.vm(vids)  # (B, nc)
-
-        # === Audio ===
+        self.audio_micro_batch = audio_micro_batch
+
+    def video(self, vids):
+        """
+        Video logits (B, nc) and the 256-d tubelet features (None when the
+        branch was replaced by an optimized module without
+        ``extract_feature``).
+        """
+        with region("tubelet_conv3d"):
+            if hasattr(self.vm, "extract_feature"):
+                video_features = self.vm.extract_feature(vids)  # (B, 256)
+                return self.vm.proj(video_features), video_features  # (B, nc)
+            return self.vm(vids), None
+
+    def audio(self, auds):
+        """
+        Audio logits (B, nc): per-patch logits averaged over time. Distinct
+        patches go through ``am`` ``audio_micro_batch`` at a time.
+        """
         B, C, T, H, W = auds.shape
         x = auds.permute(0, 2, 1, 3, 4).reshape(B * T, C, H, W)  # (B*T, C, H, W)
-        fl = self.am(x)  # (B*T, nc)
-        a = fl.view(B, T, -1).mean(dim=1)  # (B, nc)
-
-        # === Text ===
+        keep, src = dedup_index(auds)
+        with region("efficientnet_v2_l"):
+            fl = run_micro_batches(self.am, x[keep], self.audio_micro_batch)
+        fl = fl[src]  # (B*T, nc), repeated patches run once
+        return fl.view(B, T, -1).mean(dim=1)  # (B, nc)
+
+    def modalities(self, vids, auds, text_feat):
+        """
+        Per-modality outputs that the head fuses: ``video``, ``audio`` and
+        ``text`` logits (B, nc), plus the 256-d tubelet ``video_features``
+        (see ``video``).
+        """
+        v, video_features = self.video(vids)
+        a = self.audio(auds)
         t = text_feat  # (B, nc)
+        return {"video": v, "audio": a, "text": t, "video_features": video_features}
+
+    def forward(self, vids, auds, text_feat, return_modalities=False):
+        out = self.modalities(vids, auds, text_feat)
 
         # === Fusion ===
-        return self.head(v, t, a)  # (B, nc)
+        logits = self.head(out["video"], out["text"], out["audio"])  # (B, nc)
+        if not return_modalities:
+            return logits
+        out["logits"] = logits
+        return out
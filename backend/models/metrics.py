@@ -0,0 +1,252 @@
+import bisect
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# ─── Prometheus-style metrics served at /metrics (METRICS=0 turns every
+# update into a no-op; the endpoint then only reports what is registered) ───
+METRICS_ENABLED = os.getenv("METRICS", "1") == "1"
+
+# Upper bounds in seconds: millisecond-scale scheduler waits up to
+# multi-minute transcriptions of long sessions
+DURATION_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    25,
+    60,
+    120,
+    300,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    """
+    One metric family: a value per combination of label values.
+
+    Updates take the family's lock for a dict lookup and an add (a few
+    microseconds); label values are passed as keyword arguments and must
+    cover ``labels`` exactly.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {labels}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _selector(self, key, extra: Sequence[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labels, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def _samples(self, key, value) -> List[str]:
+        return [f"{self.name}{self._selector(key)} {_number(value)}"]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(
+                (key, list(v) if isinstance(v, list) else v)
+                for key, v in self._values.items()
+            )
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in items:
+            lines += self._samples(key, value)
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing total (requests, bytes, items)."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Value that goes up and down (in-flight requests, load times)."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the enclosed block as in flight while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values in cumulative ``le`` buckets, with their
+    sum and count (Prometheus histogram semantics).
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts (+Inf last), sum
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def _samples(self, key, state) -> List[str]:
+        lines, total = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+            total += count
+            le = (("le", _number(bound)),)
+            lines.append(f"{self.name}_bucket{self._selector(key, le)} {total}")
+        lines.append(f"{self.name}_sum{self._selector(key)} {_number(state[-1])}")
+        lines.append(f"{self.name}_count{self._selector(key)} {total}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide set of metric families rendered in the Prometheus text
+    exposition format (version 0.0.4).
+
+    Families are created once at import time by the module they instrument.
+    ``collect`` registers callbacks run at every scrape, for values that are
+    cheaper to read on demand (memory, model load state) than to maintain.
+    Each uvicorn worker keeps its own numbers; scrape every worker (or run
+    one per port) when serving with ``--workers N``.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} already registered")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def collect(self, callback: Callable[[], None]):
+        with self._lock:
+            self._collectors.append(callback)
+
+    def render(self) -> str:
+        for callback in list(self._collectors):
+            try:
+                callback()
+            except Exception as e:  # a broken collector must not break scrapes
+                print(f"Metrics collector {callback.__name__} failed: {e}")
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return "\n".join(line for m in metrics for line in m.render()) + "\n"
+
+
+metrics = MetricsRegistry()
+
+# Wall-clock duration of each request stage, shared by the HTTP layer
+# ("upload", "cleanup"), ml/pipeline.py ("audio", "faces", "spectrogram",
+# "transcription", "fusion", "total") and the predictor ("fusion_inputs",
+# "fusion_forward", parts of "fusion")
+STAGE_SECONDS = metrics.histogram(
+    "ptsd_stage_seconds", "Duration of request processing stages", ["stage"]
+)
+# Prediction requests by entry point ("predict", "jobs")
+REQUESTS_IN_FLIGHT = metrics.gauge(
+    "ptsd_requests_in_flight", "Prediction requests being processed", ["endpoint"]
+)
+PREDICTIONS = metrics.counter(
+    "ptsd_predictions_total",
+    "Finished prediction requests by outcome (ok, cache_hit, error)",
+    ["endpoint", "outcome"],
+)
+# "upload" (request body) and "audio" (decoded float32 waveform)
+PROCESSED_BYTES = metrics.counter(
+    "ptsd_processed_bytes_total", "Bytes processed per kind of input", ["kind"]
+)
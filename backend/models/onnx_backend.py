@@ -0,0 +1,211 @@
+import os
+from typing import Optional
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from .fusion_model import AUDIO_MICRO_BATCH, dedup_index, run_micro_batches
+from .profiling import region
+
+# ─── ONNX Runtime execution of the fusion model (FUSION_BACKEND=onnxruntime) ───
+# Needs onnx (export) and onnxruntime: pip install -r requirements-optional.txt
+ONNX_DIR = os.getenv("ONNX_DIR", "checkpoints/onnx")
+ONNX_OPSET = 17
+# 0 lets onnxruntime pick (one intra-op thread per physical core)
+ORT_INTRA_OP_THREADS = int(os.getenv("ORT_INTRA_OP_THREADS", "0"))
+ORT_INTER_OP_THREADS = int(os.getenv("ORT_INTER_OP_THREADS", "0"))
+# "disable", "basic", "extended" or "all"
+ORT_GRAPH_OPTIMIZATION = os.getenv("ORT_GRAPH_OPTIMIZATION", "all").lower()
+
+# One graph per trainable part (file, inputs, outputs); the text ensemble
+# stays in Python
+GRAPHS = {
+    "video": ("video.onnx", ["vids"], ["logits", "features"]),
+    "audio": ("audio.onnx", ["patches"], ["logits"]),
+    "head": ("head.onnx", ["v", "t", "a"], ["logits"]),
+}
+VERSIONS_FILE = "checkpoint_versions.txt"
+
+
+class VideoLogitsAndFeatures(nn.Module):
+    """Export wrapper: video logits plus the 256-d tubelet features."""
+
+    def __init__(self, vm):
+        super().__init__()
+        self.vm = vm
+
+    def forward(self, vids):
+        features = self.vm.extract_feature(vids)
+        return self.vm.proj(features), features
+
+
+def export_onnx(vm, am, head, out_dir=ONNX_DIR, seq_len=50, versions=None):
+    """
+    Export the fp32 video branch, audio branch and ``FusionHead`` of a loaded
+    ``LateFusion`` to ``out_dir`` (batch and patch counts are dynamic).
+
+    Args:
+        vm, am, head (nn.Module): eager modules in eval mode
+        out_dir (str): destination directory
+        seq_len (int): time steps of the example video input
+        versions (str, optional): ``checkpoint_versions()`` of the weights,
+            recorded so that stale exports are refused at load time
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    nc = head.fc.out_features
+    examples = {
+        "video": (
+            VideoLogitsAndFeatures(vm),
+            (torch.zeros(1, 3, seq_len, 224, 224),),
+        ),
+        "audio": (am, (torch.zeros(1, 3, 224, 224),)),
+        "head": (head, tuple(torch.zeros(1, nc) for _ in range(3))),
+    }
+    for name, (module, inputs) in examples.items():
+        filename, input_names, output_names = GRAPHS[name]
+        torch.onnx.export(
+            module.eval(),
+            inputs,
+            os.path.join(out_dir, filename),
+            input_names=input_names,
+            output_names=output_names,
+            dynamic_axes={n: {0: "batch"} for n in input_names + output_names},
+            opset_version=ONNX_OPSET,
+            dynamo=False,
+        )
+    if versions is not None:
+        with open(os.path.join(out_dir, VERSIONS_FILE), "w") as f:
+            f.write(versions)
+
+
+def session_options():
+    import onnxruntime as ort
+
+    levels = {
+        "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }
+    if ORT_GRAPH_OPTIMIZATION not in levels:
+        raise ValueError(
+            f"ORT_GRAPH_OPTIMIZATION must be one of {sorted(levels)}, "
+            f"got '{ORT_GRAPH_OPTIMIZATION}'"
+        )
+    opts = ort.SessionOptions()
+    opts.graph_optimization_level = levels[ORT_GRAPH_OPTIMIZATION]
+    opts.intra_op_num_threads = ORT_INTRA_OP_THREADS
+    opts.inter_op_num_threads = ORT_INTER_OP_THREADS
+    return opts
+
+
+class OnnxFusionModel:
+    """
+    ``LateFusion`` forward on onnxruntime (CPU): same inputs and output as
+    the eager model, including running the audio graph only on distinct
+    patches.
+    """
+
+    def __init__(
+        self,
+        onnx_dir: str = ONNX_DIR,
+        versions: Optional[str] = None,
+        audio_micro_batch: int = AUDIO_MICRO_BATCH,
+    ):
+        import onnxruntime as ort
+
+        self.audio_micro_batch = audio_micro_batch
+
+        versions_path = os.path.join(onnx_dir, VERSIONS_FILE)
+        if versions is not None and os.path.exists(versions_path):
+            with open(versions_path) as f:
+                if f.read() != versions:
+                    raise RuntimeError(
+                        f"ONNX graphs in {onnx_dir} were exported from other "
+                        "checkpoints; re-run python -m models.onnx_backend"
+                    )
+
+        opts = session_options()
+        self.sessions = {}
+        for name, (filename, _, _) in GRAPHS.items():
+            path = os.path.join(onnx_dir, filename)
+            if not os.path.exists(path):
+                raise FileNotFoundError(
+                    f"ONNX graph not found: {path} (export with "
+                    "python -m models.onnx_backend)"
+                )
+            self.sessions[name] = ort.InferenceSession(
+                path, opts, providers=["CPUExecutionProvider"]
+            )
+
+    def _run(self, name, *inputs):
+        _, input_names, _ = GRAPHS[name]
+        feeds = {
+            n: np.ascontiguousarray(x.detach().cpu().numpy(), dtype=np.float32)
+            for n, x in zip(input_names, inputs)
+        }
+        return [torch.from_numpy(y) for y in self.sessions[name].run(None, feeds)]
+
+    def video(self, vids):
+        """Same outputs as ``LateFusion.video``."""
+        with region("tubelet_conv3d"):
+            video = self._run("video", vids)
+        return video[0], video[1] if len(video) > 1 else None  # older exports
+
+    def audio(self, auds):
+        """Same output as ``LateFusion.audio``."""
+        B, C, T, H, W = auds.shape
+        x = auds.permute(0, 2, 1, 3, 4).reshape(B * T, C, H, W)
+        keep, src = dedup_index(auds)
+        with region("efficientnet_v2_l"):
+            fl = run_micro_batches(
+                lambda patches: self._run("audio", patches)[0],
+                x[keep],
+                self.audio_micro_batch,
+            )
+        return fl[src].view(B, T, -1).mean(dim=1)
+
+    def head(self, v, t, a):
+        with region("fusion_head"):
+            return self._run("head", v, t, a)[0]
+
+    def modalities(self, vids, auds, text_feat):
+        """Same outputs as ``LateFusion.modalities``."""
+        v, video_features = self.video(vids)
+        return {
+            "video": v,
+            "audio": self.audio(auds),
+            "text": text_feat,
+            "video_features": video_features,
+        }
+
+    def __call__(self, vids, auds, text_feat, return_modalities=False):
+        out = self.modalities(vids, auds, text_feat)
+        logits = self.head(out["video"], out["text"], out["audio"])
+        if not return_modalities:
+            return logits
+        out["logits"] = logits
+        return out
+
+
+if __name__ == "__main__":
+    from .predictor import (
+        SEQ_LEN,
+        checkpoint_versions,
+        load_audio_model,
+        load_fusion_model,
+        load_video_model,
+    )
+
+    # The registry's video/audio branches are the fp32 modules the fusion
+    # checkpoint was loaded into (optimized copies are not exported)
+    fusion = load_fusion_model()
+    export_onnx(
+        load_video_model(),
+        load_audio_model(),
+        fusion.head,
+        seq_len=SEQ_LEN,
+        versions=checkpoint_versions(),
+    )
+    print(f"Exported {', '.join(g[0] for g in GRAPHS.values())} to {ONNX_DIR}")
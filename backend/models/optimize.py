@@ -0,0 +1,181 @@
+import copy
+import os
+import random
+from typing import Dict, Optional
+
+import torch
+import torch.nn as nn
+
+# ─── Optimized CPU inference for the video and audio branches (opt-in) ───
+# INFERENCE_CHANNELS_LAST=1: channels-last (NHWC / NDHWC) weights and inputs
+INFERENCE_CHANNELS_LAST = os.getenv("INFERENCE_CHANNELS_LAST", "0") == "1"
+# INFERENCE_QUANTIZE: "" (fp32), "dynamic" (int8 Linear layers) or "static"
+# (int8 convolutions too, calibrated on the tensors in INFERENCE_CALIBRATION)
+INFERENCE_QUANTIZE = os.getenv("INFERENCE_QUANTIZE", "").lower()
+INFERENCE_CALIBRATION = os.getenv(
+    "INFERENCE_CALIBRATION", "checkpoints/calibration.pt"
+)
+# INFERENCE_COMPILE: "" (eager), "torchscript" (trace + freeze) or "compile"
+INFERENCE_COMPILE = os.getenv("INFERENCE_COMPILE", "").lower()
+
+QUANTIZE_MODES = ("", "dynamic", "static")
+COMPILE_MODES = ("", "torchscript", "compile")
+
+
+class ChannelsLastInput(nn.Module):
+    """Convert inputs to channels-last before a channels-last module."""
+
+    def __init__(self, module: nn.Module, memory_format: torch.memory_format):
+        super().__init__()
+        self.module = module
+        self.memory_format = memory_format
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.module(x.contiguous(memory_format=self.memory_format))
+
+
+def _memory_format(example: torch.Tensor) -> torch.memory_format:
+    return torch.channels_last_3d if example.dim() == 5 else torch.channels_last
+
+
+def load_calibration(path: str = INFERENCE_CALIBRATION) -> Optional[Dict]:
+    """
+    Returns:
+        dict: {"video": [N, 3, T, 224, 224], "audio": [M, 3, 224, 224]} float
+            tensors saved by ``build_calibration_set``, or None if missing
+    """
+    if not os.path.exists(path):
+        return None
+    return torch.load(path, map_location="cpu")
+
+
+def quantize_static(
+    model: nn.Module, example: torch.Tensor, calibration: torch.Tensor, batch_size=8
+) -> nn.Module:
+    """
+    Post-training static int8 quantization (FX graph mode, x86 backend).
+    Observers record activation ranges over ``calibration`` before the
+    convolutions and linear layers are converted to int8 kernels.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    torch.backends.quantized.engine = "x86"
+    prepared = prepare_fx(model, get_default_qconfig_mapping("x86"), (example,))
+    fmt = _memory_format(example)
+    with torch.no_grad():
+        for batch in calibration.split(batch_size):
+            prepared(batch.contiguous(memory_format=fmt))
+    return convert_fx(prepared)
+
+
+def optimize_branch(
+    model: nn.Module,
+    example: torch.Tensor,
+    calibration: Optional[torch.Tensor] = None,
+    channels_last: bool = INFERENCE_CHANNELS_LAST,
+    quantize: str = INFERENCE_QUANTIZE,
+    compiler: str = INFERENCE_COMPILE,
+) -> nn.Module:
+    """
+    Return an inference-only copy of a CPU branch (video or audio) with the
+    requested optimizations; the input module is left untouched, and with
+    everything disabled it is returned as is.
+
+    Args:
+        model (nn.Module): fp32 branch in eval mode, weights already loaded
+        example (torch.Tensor): input of the branch's shape, used for
+            tracing (e.g. [1, 3, 224, 224] for the audio branch)
+        calibration (torch.Tensor, optional): representative inputs, required
+            for ``quantize="static"``
+        channels_last (bool): use channels-last weights and inputs
+        quantize (str): "", "dynamic" or "static"
+        compiler (str): "", "torchscript" or "compile"
+    """
+    if quantize not in QUANTIZE_MODES:
+        raise ValueError(f"INFERENCE_QUANTIZE must be one of {QUANTIZE_MODES}")
+    if compiler not in COMPILE_MODES:
+        raise ValueError(f"INFERENCE_COMPILE must be one of {COMPILE_MODES}")
+    if not (channels_last or quantize or compiler):
+        return model
+
+    model = copy.deepcopy(model).eval()
+    fmt = _memory_format(example)
+    if channels_last:
+        model = model.to(memory_format=fmt)
+
+    if quantize == "static" and calibration is None:
+        print("No calibration set for static quantization; using dynamic")
+        quantize = "dynamic"
+    if quantize == "static":
+        model = quantize_static(model, example, calibration)
+    elif quantize == "dynamic":
+        model = torch.ao.quantization.quantize_dynamic(
+            model, {nn.Linear}, dtype=torch.qint8
+        )
+
+    if channels_last:
+        model = ChannelsLastInput(model, fmt)
+
+    if compiler == "torchscript":
+        with torch.no_grad():
+            model = torch.jit.freeze(torch.jit.trace(model, example).eval())
+    elif compiler == "compile":
+        # Batch size varies (deduplicated audio patches, batched requests)
+        model = torch.compile(model, dynamic=True)
+    return model
+
+
+def build_calibration_set(
+    video_paths, out_path=INFERENCE_CALIBRATION, max_clips=4, max_patches=32
+):
+    """
+    Run the preprocessing stages on a few local videos and save the branch
+    inputs used to calibrate static quantization (and by the parity report).
+    """
+    from ml.utils.extract_audio import decode_audio
+    from ml.utils.extract_frames import extract_faces_to_tensor
+    from ml.utils.spectrogram import process_audio_file
+    from models.predictor import SEQ_LEN, pad_sequence
+
+    clips, patches = [], []
+    for path in video_paths:
+        if len(clips) < max_clips:
+            frames = extract_faces_to_tensor(path, seq_len=SEQ_LEN)
+            if frames.shape[1] > 0:
+                clips.append(pad_sequence(frames))
+        spectrograms = process_audio_file(decode_audio(path))  # [3, N, 224, 224]
+        patches.extend(spectrograms.unbind(1))
+    if not clips or not patches:
+        raise RuntimeError("No faces or audio patches in the calibration videos")
+
+    random.Random(0).shuffle(patches)
+    calibration = {
+        "video": torch.stack(clips),
+        "audio": torch.stack(patches[:max_patches]),
+    }
+    if os.path.dirname(out_path):
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    torch.save(calibration, out_path)
+    return calibration
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Build the calibration set for INFERENCE_QUANTIZE=static"
+    )
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--out", default=INFERENCE_CALIBRATION)
+    parser.add_argument("--max-clips", type=int, default=4)
+    parser.add_argument("--max-patches", type=int, default=32)
+    args = parser.parse_args()
+
+    cal = build_calibration_set(
+        args.videos, args.out, max_clips=args.max_clips, max_patches=args.max_patches
+    )
+    print(
+        f"Saved {len(cal['video'])} clips and {len(cal['audio'])} patches "
+        f"to {args.out}"
+    )
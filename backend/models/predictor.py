@@ -1,11 +1,20 @@
 import os
+import time
 import torch
 import torch.nn as nn
 from torchvision import transforms, models
 from PIL import Image
 import joblib
 
+from .cascade import FUSION_CASCADE, AudioGate, cascade_forward
 from .fusion_model import PTSDVideoTransformer, FusionHead, LateFusion
+from .metrics import STAGE_SECONDS
+from .profiling import is_profiling, region
+from .onnx_backend import OnnxFusionModel
+from .optimize import INFERENCE_QUANTIZE, load_calibration, optimize_branch
+from .registry import registry
+from .scheduler import InferenceScheduler
+from .text_fast import TEXT_FAST_PATH, SparseTextScorer
 
 import warnings
 
@@ -23,15 +32,66 @@ CKPT_AUDIO = "checkpoints/best_effnet_vit_ensemble.pth"
 CKPT_TEXT = "checkpoints/ensemble_model.pth"
 CKPT_FUSION = "checkpoints/best_fusion_model.pth"
 
+
+def checkpoint_versions():
+    """
+    Cheap fingerprint of the checkpoints in use (path, size, mtime), so that
+    cached results are invalidated when any checkpoint file is replaced.
+    """
+    parts = []
+    for path in (CKPT_VIDEO, CKPT_AUDIO, CKPT_TEXT, CKPT_FUSION):
+        try:
+            st = os.stat(path)
+            parts.append(f"{path}:{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{path}:missing")
+    return "|".join(parts)
+
+
+# ─── Weight sharing across worker processes ───
+# WEIGHTS_MMAP=1 memory-maps checkpoint tensors instead of copying them into
+# each process: parameters stay backed by the checkpoint files, so the page
+# cache holds one copy shared read-only by every uvicorn worker. Do not
+# overwrite checkpoint files in place while workers are running.
+WEIGHTS_MMAP = os.getenv("WEIGHTS_MMAP", "0") == "1" and DEVICE.type == "cpu"
+
+
+def load_checkpoint(path):
+    """
+    Load a state dict from ``path``; with WEIGHTS_MMAP the tensors are
+    memory-mapped from the file (zip-format checkpoints only, legacy files
+    fall back to a regular load).
+    """
+    if WEIGHTS_MMAP:
+        try:
+            return torch.load(path, map_location="cpu", weights_only=False, mmap=True)
+        except RuntimeError as e:
+            print(f"Cannot memory-map {path} ({e}); loading a private copy")
+    return torch.load(path, map_location=DEVICE, weights_only=False)
+
+
+def load_weights(model, path):
+    """
+    Load checkpoint weights into ``model`` (non-strict, like the training
+    notebooks). With WEIGHTS_MMAP the module keeps the mapped tensors
+    (``assign=True``) rather than copying them into its own parameters.
+    """
+    model.load_state_dict(load_checkpoint(path), strict=False, assign=WEIGHTS_MMAP)
+    return model
+
+
+# ─── Fusion execution backend: "torch" (eager) or "onnxruntime" (CPU graphs
+# exported by ``python -m models.onnx_backend``; see ORT_* settings there) ───
+FUSION_BACKEND = os.getenv("FUSION_BACKEND", "torch").lower()
+
+# ─── Cross-request dynamic batching (INFERENCE_BATCHING=0 disables) ───
+INFERENCE_BATCHING = os.getenv("INFERENCE_BATCHING", "1") == "1"
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "4"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+
 # ─── Class names ───
 CLASS_NAMES = ["NO PTSD", "PTSD"]
 
-# ─── Global caches for models ───
-_VIDEO_MODEL = None
-_AUDIO_MODEL = None
-_TEXT_MODEL = None
-_FUSION_MODEL = None
-
 # ─── Image transforms ───
 img_tf = transforms.Compose(
     [
@@ -48,18 +108,37 @@ class TorchTextEnsembleModel(nn.Module):
         super().__init__()
         self.device = device
         # This joblib file contains: vectorizer, lr_model, xgb_meta
-        self.ensemble = joblib.load(joblib_path)
+        # Uncompressed dumps keep their NumPy arrays memory-mapped (shared
+        # between workers) under WEIGHTS_MMAP; compressed ones load normally
+        self.ensemble = joblib.load(
+            joblib_path, mmap_mode="r" if WEIGHTS_MMAP else None
+        )
         self.vectorizer = self.ensemble["vectorizer"]
         self.lr_model = self.ensemble["lr_model"]
         self.xgb_meta = self.ensemble["xgb_meta"]
         self.text_proj = nn.Linear(1, out_dim)
+        # Sparse dot product + meta model table (models/text_fast.py)
+        self.fast = None
+        if TEXT_FAST_PATH:
+            try:
+                self.fast = SparseTextScorer(
+                    self.vectorizer, self.lr_model, self.xgb_meta
+                )
+            except ValueError as e:
+                print(f"Text fast path disabled, using the stored ensemble: {e}")
+
+    def meta_probs(self, texts):
+        """Meta model probability of PTSD per transcript, as a NumPy array."""
+        if self.fast is not None:
+            return self.fast(texts)
+        X_tfidf = self.vectorizer.transform(texts)
+        lr_probs = self.lr_model.predict_proba(X_tfidf)[:, 1]
+        meta_X = np.stack([lr_probs, lr_probs], axis=1)
+        return self.xgb_meta.predict_proba(meta_X)[:, 1]
 
     def forward(self, texts):
-        with torch.no_grad():
-            X_tfidf = self.vectorizer.transform(texts)
-            lr_probs = self.lr_model.predict_proba(X_tfidf)[:, 1]
-            meta_X = np.stack([lr_probs, lr_probs], axis=1)
-            meta_probs = self.xgb_meta.predict_proba(meta_X)[:, 1]
+        with torch.no_grad(), region("text_ensemble"):
+            meta_probs = self.meta_probs(texts)
             out = torch.tensor(
                 meta_probs, dtype=torch.float32, device=self.device
             ).unsqueeze(1)
@@ -70,52 +149,112 @@ class TorchTextEnsembleModel(nn.Module):
 import numpy as np
 
 
+def _build_video_model():
+    model = PTSDVideoTransformer(num_classes=NUM_CLASSES)
+    load_weights(model, CKPT_VIDEO)
+    return model.to(DEVICE).eval()
+
+
+def _build_audio_model():
+    model = models.efficientnet_v2_l(weights=None)
+    model.classifier[-1] = nn.Linear(model.classifier[-1].in_features, NUM_CLASSES)
+    load_weights(model, CKPT_AUDIO)
+    return model.to(DEVICE).eval()
+
+
+def _build_text_model():
+    # NOTE: This path should point to your joblib file (ensemble with TFIDF, LR, XGB)
+    # The text model outputs a feature vector that will be fused with the
+    # video and audio branches. We only need a vector of size
+    # ``NUM_CLASSES`` for the fusion head, so set ``out_dim`` accordingly.
+    model = TorchTextEnsembleModel(
+        joblib_path=CKPT_TEXT, device=DEVICE, out_dim=NUM_CLASSES
+    )
+    return model.to(DEVICE).eval()
+
+
+def _build_fusion_model():
+    vm = load_video_model()
+    am = load_audio_model()
+    tm = load_text_model()
+    model = LateFusion(vm, tm, am, NUM_CLASSES)
+    load_weights(model, CKPT_FUSION)
+    model = model.to(DEVICE).eval()
+    if DEVICE.type == "cpu":
+        # Opt-in channels-last / int8 / compiled branches (INFERENCE_* in
+        # models/optimize.py); the registry's fp32 branches stay untouched
+        calibration = (INFERENCE_QUANTIZE == "static" and load_calibration()) or {}
+        model.vm = optimize_branch(
+            model.vm, torch.zeros(1, 3, SEQ_LEN, 224, 224), calibration.get("video")
+        )
+        model.am = optimize_branch(
+            model.am, torch.zeros(1, 3, 224, 224), calibration.get("audio")
+        )
+    return model
+
+
+# Models are loaded lazily on first use (or by ``warmup_models`` at startup)
+registry.register("video", _build_video_model)
+registry.register("audio", _build_audio_model)
+registry.register("text", _build_text_model)
+registry.register("fusion", _build_fusion_model)
+registry.register(
+    "fusion_onnx", lambda: OnnxFusionModel(versions=checkpoint_versions())
+)
+registry.register(
+    "audio_gate",
+    lambda: AudioGate.load(
+        load_fusion_model().head
+        if FUSION_BACKEND == "torch"
+        else load_fusion_head(CKPT_FUSION),
+        versions=checkpoint_versions(),
+    ),
+)
+
+
 def load_video_model():
-    global _VIDEO_MODEL
-    if _VIDEO_MODEL is None:
-        model = PTSDVideoTransformer(num_classes=NUM_CLASSES)
-        ckpt = torch.load(CKPT_VIDEO, map_location=DEVICE, weights_only=False)
-        model.load_state_dict(ckpt, strict=False)
-        _VIDEO_MODEL = model.to(DEVICE).eval()
-    return _VIDEO_MODEL
+    return registry.get("video")
 
 
 def load_audio_model():
-    global _AUDIO_MODEL
-    if _AUDIO_MODEL is None:
-        model = models.efficientnet_v2_l(weights=None)
-        model.classifier[-1] = nn.Linear(model.classifier[-1].in_features, NUM_CLASSES)
-        ckpt = torch.load(CKPT_AUDIO, map_location=DEVICE, weights_only=False)
-        model.load_state_dict(ckpt, strict=False)
-        _AUDIO_MODEL = model.to(DEVICE).eval()
-    return _AUDIO_MODEL
+    return registry.get("audio")
 
 
 def load_text_model():
-    global _TEXT_MODEL
-    if _TEXT_MODEL is None:
-        # NOTE: This path should point to your joblib file (ensemble with TFIDF, LR, XGB)
-        # The text model outputs a feature vector that will be fused with the
-        # video and audio branches. We only need a vector of size
-        # ``NUM_CLASSES`` for the fusion head, so set ``out_dim`` accordingly.
-        model = TorchTextEnsembleModel(
-            joblib_path=CKPT_TEXT, device=DEVICE, out_dim=NUM_CLASSES
-        )
-        _TEXT_MODEL = model.to(DEVICE).eval()
-    return _TEXT_MODEL
+    return registry.get("text")
 
 
 def load_fusion_model():
-    global _FUSION_MODEL
-    if _FUSION_MODEL is None:
-        vm = load_video_model()
-        am = load_audio_model()
-        tm = load_text_model()
-        model = LateFusion(vm, tm, am, NUM_CLASSES)
-        fusion_ckpt = torch.load(CKPT_FUSION, map_location=DEVICE, weights_only=False)
-        model.load_state_dict(fusion_ckpt, strict=False)
-        _FUSION_MODEL = model.to(DEVICE).eval()
-    return _FUSION_MODEL
+    return registry.get("fusion")
+
+
+def load_fusion_runner():
+    """The fusion model for FUSION_BACKEND: eager ``LateFusion`` or its ONNX twin."""
+    if FUSION_BACKEND == "onnxruntime":
+        return registry.get("fusion_onnx")
+    if FUSION_BACKEND != "torch":
+        raise ValueError(
+            f"FUSION_BACKEND must be 'torch' or 'onnxruntime', got '{FUSION_BACKEND}'"
+        )
+    return load_fusion_model()
+
+
+def load_audio_gate():
+    return registry.get("audio_gate")
+
+
+def warmup_models():
+    """
+    Load every branch and run one dummy forward so allocator pools and
+    kernel selection are settled before the first real request.
+    """
+    model = load_fusion_runner()
+    vid = torch.zeros(1, 3, SEQ_LEN, 224, 224, device=DEVICE)
+    # All-equal patches: the deduplicated audio branch runs a single patch
+    aud = torch.zeros(1, 3, SEQ_LEN, 224, 224, device=DEVICE)
+    with torch.no_grad():
+        text_feat = load_text_model()([""])
+        model(vid, aud, text_feat)
 
 
 def load_video_frames(frame_folder):
@@ -133,6 +272,19 @@ def load_video_frames(frame_folder):
     return torch.stack(frames, dim=1)  # [3, SEQ_LEN, 224, 224]
 
 
+def pad_sequence(clip):
+    """
+    Pad a [3, T, H, W] clip to SEQ_LEN by repeating its last step, then
+    truncate to SEQ_LEN (same policy as the folder loaders).
+    """
+    if clip.shape[1] == 0:
+        raise RuntimeError("Cannot pad an empty sequence")
+    if clip.shape[1] < SEQ_LEN:
+        last = clip[:, -1:].expand(-1, SEQ_LEN - clip.shape[1], -1, -1)
+        clip = torch.cat([clip, last], dim=1)
+    return clip[:, :SEQ_LEN]
+
+
 def load_spectrograms(spec_folder, prefix):
     spec_paths = sorted(
         [
@@ -152,27 +304,194 @@ def load_spectrograms(spec_folder, prefix):
     return torch.stack(specs, dim=1)  # [3, SEQ_LEN, 224, 224]
 
 
-def predict_fusion_model(spectrogram_folder, frame_folder, transcript_text, base_name):
-    model = load_fusion_model()
-
+def prepare_inputs(
+    spectrogram_folder=None,
+    frame_folder=None,
+    transcript_text="",
+    base_name=None,
+    spectrograms=None,
+    frames=None,
+):
+    """
+    Build the batch-1 ``(vid, aud, text_feat)`` inputs of ``LateFusion``.
+
+    Video comes either from ``frames``, an in-memory [3, T, 224, 224] tensor
+    from ``extract_faces_to_tensor``, or from face crops in ``frame_folder``.
+    Audio comes either from ``spectrograms``, an in-memory [3, T, 224, 224]
+    tensor from ``process_audio_file``, or from PNG patches in
+    ``spectrogram_folder`` whose names start with ``base_name``.
+    """
     # === VIDEO ===
-    vid = load_video_frames(frame_folder).unsqueeze(0).to(DEVICE)
+    if frames is not None:
+        vid = pad_sequence(frames).unsqueeze(0).to(DEVICE)
+    else:
+        vid = load_video_frames(frame_folder).unsqueeze(0).to(DEVICE)
 
     # === AUDIO ===
-    aud = (
-        load_spectrograms(spectrogram_folder, prefix=base_name).unsqueeze(0).to(DEVICE)
-    )
+    if spectrograms is not None:
+        aud = pad_sequence(spectrograms).unsqueeze(0).to(DEVICE)
+    else:
+        aud = (
+            load_spectrograms(spectrogram_folder, prefix=base_name)
+            .unsqueeze(0)
+            .to(DEVICE)
+        )
 
     # === TEXT ===
     text_model = load_text_model()
-    text_feat = text_model([transcript_text])  # Pass as a list
+    with torch.no_grad():
+        text_feat = text_model([transcript_text])  # Pass as a list
+
+    return vid, aud, text_feat
+
+
+def _fusion_forward(vids, auds, text_feat):
+    if FUSION_CASCADE:
+        return cascade_forward(
+            load_fusion_runner(), load_audio_gate(), vids, auds, text_feat
+        )
+    return load_fusion_runner()(vids, auds, text_feat, return_modalities=True)
 
-    # === Predict ===
+
+_SCHEDULER = InferenceScheduler(
+    _fusion_forward,
+    max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=INFERENCE_MAX_WAIT_MS,
+)
+
+
+def run_fusion(vid, aud, text_feat):
+    """
+    Fusion outputs for one request: ``logits`` (1, NUM_CLASSES) and the
+    per-modality tensors of ``LateFusion.modalities``. With
+    INFERENCE_BATCHING, concurrent requests are merged into one forward by
+    the scheduler (except for profiled requests, which stay on their thread).
+    """
+    if INFERENCE_BATCHING and not is_profiling():
+        return _SCHEDULER.submit(vid, aud, text_feat).result()
     with torch.no_grad():
-        logits = model(vid, aud, text_feat)
-        pred = torch.argmax(logits, dim=1).item()
+        return _fusion_forward(vid, aud, text_feat)
+
+
+def predict_fusion_model(
+    spectrogram_folder=None,
+    frame_folder=None,
+    transcript_text="",
+    base_name=None,
+    spectrograms=None,
+    frames=None,
+    modalities=None,
+):
+    """
+    Run the late-fusion model on one video; see ``prepare_inputs`` for the
+    accepted input sources.
+
+    If ``modalities`` is a dict it is filled with 1-D float32 arrays:
+    "logits", the "video", "audio" and "text" vectors fed to the fusion head
+    and, when available, the 256-d tubelet "video_features". Under
+    FUSION_CASCADE it also holds "audio_skipped" (0-d bool).
+    """
+    start = time.perf_counter()
+    vid, aud, text_feat = prepare_inputs(
+        spectrogram_folder=spectrogram_folder,
+        frame_folder=frame_folder,
+        transcript_text=transcript_text,
+        base_name=base_name,
+        spectrograms=spectrograms,
+        frames=frames,
+    )
+
+    # === Predict === (the forward includes any wait in the batching queue)
+    inputs_done = time.perf_counter()
+    STAGE_SECONDS.observe(inputs_done - start, stage="fusion_inputs")
+    out = run_fusion(vid, aud, text_feat)
+    STAGE_SECONDS.observe(time.perf_counter() - inputs_done, stage="fusion_forward")
+    if modalities is not None:
+        for name, value in out.items():
+            if value is not None:
+                modalities[name] = value[0].detach().cpu().numpy()
+    pred = torch.argmax(out["logits"], dim=1).item()
     return CLASS_NAMES[pred]
 
 
-# Initialize models on module import (optional, for warm start)
-load_fusion_model()
+def predict_fusion_batch(transcripts, spectrograms, frames):
+    """
+    Fuse several videos in one batched forward (offline batch runs; the
+    server batches through the scheduler instead).
+
+    Args:
+        transcripts (list of str): cleaned transcripts
+        spectrograms (list of torch.Tensor): [3, N, 224, 224] per video
+        frames (list of torch.Tensor): [3, T, 224, 224] per video
+
+    Returns:
+        list: (prediction, modalities) per video, modalities as in
+            ``predict_fusion_model``
+    """
+    vids = torch.stack([pad_sequence(f) for f in frames]).to(DEVICE)
+    auds = torch.stack([pad_sequence(s) for s in spectrograms]).to(DEVICE)
+    with torch.no_grad():
+        text_feat = load_text_model()(list(transcripts))
+        out = load_fusion_runner()(vids, auds, text_feat, return_modalities=True)
+
+    results = []
+    for i in range(len(vids)):
+        modalities = {
+            name: value[i].detach().cpu().numpy()
+            for name, value in out.items()
+            if value is not None
+        }
+        pred = int(torch.argmax(out["logits"][i]).item())
+        results.append((CLASS_NAMES[pred], modalities))
+    return results
+
+
+def predict_fusion_segments(transcript_text, segments, modalities=None):
+    """
+    Score a session from several time windows in one batched forward; the
+    session probabilities are the mean of the per-segment softmaxes.
+
+    Args:
+        transcript_text (str): cleaned transcript of the whole session (the
+            text branch is session-level and shared by every segment)
+        segments (list): (start s, end s, frames [3, T, 224, 224],
+            spectrograms [3, N, 224, 224]) per window
+        modalities (dict, optional): filled with float32 arrays "probs"
+            [NUM_CLASSES] (session), "segment_logits" [W, NUM_CLASSES] and
+            "segment_spans" [W, 2] (start and end seconds)
+
+    Returns:
+        str: session-level prediction
+    """
+    vids = torch.stack([pad_sequence(f) for _, _, f, _ in segments]).to(DEVICE)
+    auds = torch.stack([pad_sequence(s) for _, _, _, s in segments]).to(DEVICE)
+    with torch.no_grad():
+        text_feat = load_text_model()([transcript_text]).repeat(len(segments), 1)
+        logits = load_fusion_runner()(vids, auds, text_feat)
+    probs = torch.softmax(logits, dim=1).mean(dim=0)
+
+    if modalities is not None:
+        modalities.update(
+            probs=probs.cpu().numpy(),
+            segment_logits=logits.cpu().numpy(),
+            segment_spans=np.array(
+                [(start, end) for start, end, _, _ in segments], dtype=np.float32
+            ),
+        )
+    return CLASS_NAMES[int(probs.argmax())]
+
+
+def load_fusion_head(path):
+    """
+    Load a ``FusionHead`` from a head-only state dict or a full ``LateFusion``
+    checkpoint (keys prefixed with ``head.``), for re-fusing stored modality
+    vectors without running the branches.
+    """
+    state = torch.load(path, map_location="cpu", weights_only=False)
+    if any(k.startswith("head.") for k in state):
+        state = {
+            k[len("head.") :]: v for k, v in state.items() if k.startswith("head.")
+        }
+    head = FusionHead(NUM_CLASSES)
+    head.load_state_dict(state)
+    return head.eval()
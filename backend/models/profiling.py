@@ -0,0 +1,243 @@
+import collections
+import contextlib
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+import torch
+
+# ─── On-demand request profiling: /predict with the admin token in the
+# X-Profile header runs under torch.profiler and a sampling Python profiler
+# (PROFILE_TOKEN unset disables it and the header is ignored) ───
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "diagnostics/profiles")
+# Interval of the Python stack sampler
+PROFILE_SAMPLE_MS = float(os.getenv("PROFILE_SAMPLE_MS", "5"))
+
+# Code regions annotated with ``region``; the summary breaks operator time
+# down per region
+REGIONS = (
+    "face_detection",
+    "log_mel_spectrogram",
+    "patch_render",
+    "whisper_decode",
+    "text_ensemble",
+    "tubelet_conv3d",
+    "efficientnet_v2_l",
+    "fusion_head",
+)
+
+_ACTIVE = False  # any session running; checked before touching the profiler
+_LOCK = threading.Lock()  # torch.profiler allows one session per process
+_local = threading.local()
+_NULL = contextlib.nullcontext()
+
+
+class ProfilerBusy(RuntimeError):
+    """Another request is being profiled in this process."""
+
+
+def region(name: str):
+    """
+    Context manager labelling the enclosed code as ``name`` in profiles; a
+    shared no-op unless a ``ProfileSession`` is running.
+    """
+    if not _ACTIVE:
+        return _NULL
+    return torch.profiler.record_function(name)
+
+
+def is_profiling() -> bool:
+    """True on the thread running a ``ProfileSession``."""
+    return _ACTIVE and getattr(_local, "session", None) is not None
+
+
+def _frame_name(code) -> str:
+    path = code.co_filename.replace(os.sep, "/").split("/")
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples the Python stack of one thread every ``interval`` seconds."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="profile-sampler", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+
+class ProfileSession:
+    """
+    Profile whatever runs on the calling thread inside ``with session:``.
+
+    ``torch.profiler`` records CPU operators (thread-local, so the pipeline
+    runs its stages inline on this thread and skips the batching scheduler
+    while ``is_profiling``) and a ``StackSampler`` records the thread's
+    Python stacks every PROFILE_SAMPLE_MS. On exit, also after an error,
+    ``PROFILE_DIR/<trace_id>/`` receives:
+
+    - ``torch_trace.json.gz``: Chrome trace (Perfetto, chrome://tracing)
+    - ``python_stacks.txt``: collapsed stacks (flamegraph.pl, speedscope)
+    - ``summary.txt``: stage timings, operator time per ``REGIONS`` entry,
+      the top operators overall and the hottest Python functions
+
+    Non-torch work (MTCNN on TensorFlow, faster-whisper, ONNX Runtime, numpy
+    spectrograms) shows up as its region's wall time and in the Python
+    samples. Only one session runs per process; a second raises
+    ProfilerBusy.
+    """
+
+    def __init__(
+        self,
+        label: str = "",
+        timings: Optional[Dict[str, float]] = None,
+        directory: str = PROFILE_DIR,
+        sample_ms: float = PROFILE_SAMPLE_MS,
+    ):
+        self.trace_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.label = label
+        self.timings = timings
+        self.path = os.path.join(directory, self.trace_id)
+        self.sample_ms = sample_ms
+        self.seconds = None
+
+    def run(self, fn, *args, **kwargs):
+        """``fn(*args, **kwargs)`` under this session."""
+        with self:
+            return fn(*args, **kwargs)
+
+    def __enter__(self):
+        global _ACTIVE
+        if not _LOCK.acquire(blocking=False):
+            raise ProfilerBusy("Another request is being profiled, retry later")
+        try:
+            self._profiler = torch.profiler.profile(
+                activities=[torch.profiler.ProfilerActivity.CPU], record_shapes=True
+            )
+            self._profiler.start()
+            self._sampler = StackSampler(threading.get_ident(), self.sample_ms / 1000)
+            self._sampler.start()
+        except Exception:
+            _LOCK.release()
+            raise
+        _local.session = self
+        _ACTIVE = True
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _ACTIVE
+        self.seconds = time.perf_counter() - self._start
+        _ACTIVE = False
+        _local.session = None
+        try:
+            self._sampler.stop()
+            self._profiler.stop()
+            self._save(exc)
+        except Exception as e:  # never mask the request's own outcome
+            print(f"Could not save profile {self.trace_id}: {e}")
+        finally:
+            _LOCK.release()
+        return False
+
+    def _save(self, error):
+        os.makedirs(self.path, exist_ok=True)
+        # gzipped: a Whisper decode alone is ~100 MB of JSON
+        trace = os.path.join(self.path, "torch_trace.json.gz")
+        self._profiler.export_chrome_trace(trace)
+        stacks = self._sampler.stacks
+        with open(os.path.join(self.path, "python_stacks.txt"), "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+        lines = [
+            f"trace {self.trace_id} {self.label}".rstrip(),
+            f"wall {self.seconds:.3f} s, "
+            + (f"failed: {error}" if error is not None else "ok"),
+        ]
+        if self.timings:
+            lines.append(
+                "stages: " + ", ".join(f"{k}={v:.3f}s" for k, v in self.timings.items())
+            )
+        events = self._profiler.events()
+        lines += ["", *region_breakdown(events)]
+        lines += [
+            "",
+            "== Operators (top 30 by self CPU time) ==",
+            events.key_averages().table(sort_by="self_cpu_time_total", row_limit=30),
+        ]
+        lines += ["", *python_summary(stacks, self.sample_ms)]
+        with open(os.path.join(self.path, "summary.txt"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def region_breakdown(events, top: int = 8):
+    """Summary lines: wall time per region and its heaviest operators."""
+    calls = collections.Counter()
+    totals = collections.Counter()
+    ops = collections.defaultdict(collections.Counter)
+    for event in events:
+        if event.name in REGIONS:
+            calls[event.name] += 1
+            totals[event.name] += event.cpu_time_total
+            continue
+        parent = event.cpu_parent
+        while parent is not None and parent.name not in REGIONS:
+            parent = parent.cpu_parent
+        if parent is not None:
+            ops[parent.name][event.name] += event.self_cpu_time_total
+
+    lines = ["== Regions (CPU time; operators by self time) =="]
+    if not calls:
+        lines.append("(no annotated region ran)")
+    for name in sorted(calls, key=totals.get, reverse=True):
+        lines.append(
+            f"{name:<24}{calls[name]:>6} calls {totals[name] / 1000:>30.1f} ms"
+        )
+        for op, us in ops[name].most_common(top):
+            share = us / totals[name] if totals[name] else 0.0
+            lines.append(f"    {op[:52]:<52}{us / 1000:>12.1f} ms {share:>7.1%}")
+    return lines
+
+
+def python_summary(stacks: collections.Counter, sample_ms: float, top: int = 30):
+    """Summary lines: the functions most often on (self) or in (total) the stack."""
+    samples = sum(stacks.values())
+    lines = [f"== Python ({samples} samples every {sample_ms:g} ms) =="]
+    if not samples:
+        return lines
+    own, inclusive = collections.Counter(), collections.Counter()
+    for stack, count in stacks.items():
+        own[stack[-1]] += count
+        for name in set(stack):
+            inclusive[name] += count
+    lines.append(f"{'self':>7}{'total':>8}  function")
+    for name, count in own.most_common(top):
+        lines.append(
+            f"{count / samples:>7.1%}{inclusive[name] / samples:>8.1%}  {name}"
+        )
+    return lines
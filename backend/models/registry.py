@@ -0,0 +1,69 @@
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from .metrics import metrics
+
+MODEL_LOAD_SECONDS = metrics.gauge(
+    "ptsd_model_load_seconds", "Time taken to load each model", ["model"]
+)
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of lazily loaded models.
+
+    Modules register a loader under a name; the model is built on the first
+    ``get`` (one thread loads, concurrent callers wait) and cached. Load state
+    and load time per model are exposed through ``status`` for readiness
+    reporting.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._status: Dict[str, dict] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+            self._status.setdefault(
+                name, {"state": "not_loaded", "load_seconds": None, "error": None}
+            )
+
+    def get(self, name: str):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self._loaders:
+            raise KeyError(f"No model registered under '{name}'")
+
+        with self._locks[name]:
+            if name in self._models:
+                return self._models[name]
+            self._status[name].update(state="loading", error=None)
+            start = time.perf_counter()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                self._status[name].update(state="failed", error=str(e))
+                raise
+            seconds = time.perf_counter() - start
+            self._status[name].update(state="loaded", load_seconds=round(seconds, 3))
+            MODEL_LOAD_SECONDS.set(seconds, model=name)
+            self._models[name] = model
+            return model
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def status(self) -> Dict[str, dict]:
+        with self._lock:
+            return {name: dict(s) for name, s in self._status.items()}
+
+
+# Shared by models/predictor.py, ml/utils/transcribe.py and the face detector
+registry = ModelRegistry()
@@ -0,0 +1,111 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Sequence
+
+import torch
+
+from .metrics import metrics
+
+QUEUE_WAIT_SECONDS = metrics.histogram(
+    "ptsd_inference_queue_wait_seconds",
+    "Time requests wait in the dynamic batching queue before their forward",
+)
+BATCH_SIZE = metrics.histogram(
+    "ptsd_inference_batch_size",
+    "Requests merged into one batched forward",
+    buckets=(1, 2, 4, 8, 16, 32),
+)
+
+
+class InferenceScheduler:
+    """
+    Dynamic batching in front of a model forward.
+
+    Request threads ``submit`` batch-1 input tensors and wait on the returned
+    future. A single worker thread takes the first queued request, collects
+    more for up to ``max_wait_ms`` (or until ``max_batch_size``), runs one
+    batched forward on the concatenated inputs and hands row ``i`` of the
+    output back to the ``i``-th request. Outputs may be a tensor or a dict
+    of tensors (None values pass through).
+    """
+
+    def __init__(
+        self,
+        forward: Callable[..., Any],
+        max_batch_size: int = 4,
+        max_wait_ms: float = 5.0,
+    ):
+        self.forward = forward
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, *inputs: torch.Tensor) -> Future:
+        """
+        Queue one request.
+
+        Args:
+            *inputs (torch.Tensor): model inputs, each with batch dimension 1
+
+        Returns:
+            Future: resolves to the request's output row, shape (1, ...), or
+                a dict of such rows
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((inputs, future, time.monotonic()))
+        return future
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._worker, name="inference-scheduler", daemon=True
+                )
+                self._thread.start()
+
+    def _worker(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: Sequence):
+        # Drop requests whose caller already cancelled
+        now = time.monotonic()
+        batch = [(x, f, t) for x, f, t in batch if f.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        for _, _, queued in batch:
+            QUEUE_WAIT_SECONDS.observe(now - queued)
+        BATCH_SIZE.observe(len(batch))
+        try:
+            with torch.no_grad():
+                stacked = [
+                    torch.cat(parts, dim=0) for parts in zip(*(b[0] for b in batch))
+                ]
+                out = self.forward(*stacked)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for i, (_, future, _) in enumerate(batch):
+            future.set_result(_row(out, i))
+
+
+def _row(out, i):
+    if isinstance(out, dict):
+        return {k: None if v is None else v[i : i + 1] for k, v in out.items()}
+    return out[i : i + 1]
@@ -0,0 +1,148 @@
+import os
+from typing import Sequence
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.special import expit
+
+# ─── Precomputed text branch (TEXT_FAST_PATH=0 runs the joblib ensemble as
+# stored: vectorizer.transform -> lr_model.predict_proba -> xgb_meta) ───
+TEXT_FAST_PATH = os.getenv("TEXT_FAST_PATH", "1") == "1"
+# Largest accepted |meta probability| error of the lookup table
+TEXT_TABLE_TOLERANCE = float(os.getenv("TEXT_TABLE_TOLERANCE", "1e-4"))
+
+
+class MetaTable:
+    """
+    Piecewise-linear table of ``p -> meta_model.predict_proba([[p, p]])[:, 1]``.
+
+    The meta model of the text ensemble is fed the LR probability twice, so
+    it is a function of one variable on [0, 1]. Starting from a uniform grid,
+    intervals whose end values differ by more than ``tolerance`` are bisected
+    until they are narrower than ``min_width``; the steps of a tree ensemble
+    are thus located to float32 resolution. The table is then checked against
+    the model on random probes (uniform and logit-uniform) and rejected with
+    ValueError if any probe is off by more than ``tolerance``.
+    """
+
+    def __init__(
+        self,
+        meta_model,
+        tolerance: float = TEXT_TABLE_TOLERANCE,
+        initial_points: int = 1025,
+        min_width: float = 1e-7,
+        probes: int = 20000,
+    ):
+        def meta(p):
+            return meta_model.predict_proba(np.stack([p, p], axis=1))[:, 1]
+
+        xs = np.linspace(0.0, 1.0, initial_points)
+        ys = meta(xs)
+        while True:
+            split = (np.abs(np.diff(ys)) > tolerance) & (np.diff(xs) > min_width)
+            if not split.any():
+                break
+            mids = (xs[:-1][split] + xs[1:][split]) / 2
+            order = np.argsort(np.concatenate([xs, mids]), kind="stable")
+            xs = np.concatenate([xs, mids])[order]
+            ys = np.concatenate([ys, meta(mids)])[order]
+        self.xs, self.ys = xs, ys
+
+        rng = np.random.default_rng(0)
+        p = np.concatenate(
+            [rng.random(probes // 2), expit(rng.uniform(-12, 12, probes // 2))]
+        )
+        self.max_error = float(np.abs(self(p) - meta(p)).max())
+        if self.max_error > tolerance:
+            raise ValueError(
+                f"Meta model table error {self.max_error:.2e} exceeds "
+                f"tolerance {tolerance:.0e}"
+            )
+
+    def __len__(self):
+        return len(self.xs)
+
+    def __call__(self, p: np.ndarray) -> np.ndarray:
+        return np.interp(p, self.xs, self.ys)
+
+
+class SparseTextScorer:
+    """
+    The TF-IDF -> logistic regression -> meta model ensemble, precomputed.
+
+    On an L2-normalised TF-IDF row the LR decision is
+    ``(tf . coef*idf) / sqrt(tf^2 . idf^2) + intercept``: both terms are
+    products of the sparse raw term counts with vectors fixed at load time,
+    so no TF-IDF matrix is built. The meta model is replaced by a
+    ``MetaTable``. Any number of transcripts is scored in one pass.
+
+    Raises ValueError for ensembles it cannot reproduce (non-binary LR, a
+    TF-IDF ``norm`` other than "l2", "l1" or None, or a meta model the table
+    cannot follow within tolerance).
+    """
+
+    def __init__(
+        self, vectorizer, lr_model, meta_model, tolerance=TEXT_TABLE_TOLERANCE
+    ):
+        coef = np.asarray(lr_model.coef_, dtype=np.float64)
+        if coef.shape[0] != 1:
+            raise ValueError(f"Expected a binary LR model, got coef_ {coef.shape}")
+        if vectorizer.norm not in ("l2", "l1", None):
+            raise ValueError(f"Unsupported TF-IDF norm '{vectorizer.norm}'")
+
+        self.analyzer = vectorizer.build_analyzer()
+        self.vocabulary = vectorizer.vocabulary_
+        self.binary = vectorizer.binary
+        self.sublinear_tf = vectorizer.sublinear_tf
+        self.norm = vectorizer.norm
+        idf = (
+            np.asarray(vectorizer.idf_, dtype=np.float64)
+            if vectorizer.use_idf
+            else np.ones(coef.shape[1])
+        )
+        # Binary multinomial LR: softmax([-d, d]) == sigmoid(2d)
+        multinomial = getattr(lr_model, "multi_class", None) == "multinomial"
+        scale = 2.0 if multinomial else 1.0
+        self.weights = coef[0] * idf * scale
+        self.intercept = float(lr_model.intercept_[0]) * scale
+        self.idf = idf
+        self.idf_squared = idf**2
+        self.table = MetaTable(meta_model, tolerance)
+
+    def counts(self, texts: Sequence[str]) -> sp.csr_matrix:
+        """Term frequencies as the vectorizer weighs them, [len(texts), vocab]."""
+        indices, indptr = [], [0]
+        vocabulary = self.vocabulary
+        for text in texts:
+            indices.extend(
+                j
+                for j in map(vocabulary.get, self.analyzer(text))
+                if j is not None
+            )
+            indptr.append(len(indices))
+        tf = sp.csr_matrix(
+            (np.ones(len(indices)), indices, indptr),
+            shape=(len(texts), len(self.weights)),
+        )
+        tf.sum_duplicates()
+        if self.binary:
+            tf.data[:] = 1.0
+        elif self.sublinear_tf:
+            tf.data = 1.0 + np.log(tf.data)
+        return tf
+
+    def lr_probs(self, texts: Sequence[str]) -> np.ndarray:
+        """``lr_model.predict_proba(vectorizer.transform(texts))[:, 1]``"""
+        tf = self.counts(texts)
+        decision = tf @ self.weights
+        if self.norm is not None:
+            if self.norm == "l2":
+                norms = np.sqrt(tf.multiply(tf) @ self.idf_squared)
+            else:
+                norms = tf @ self.idf
+            decision /= np.where(norms > 0, norms, 1.0)  # empty rows stay zero
+        return expit(decision + self.intercept)
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        """Meta model probabilities, one per transcript."""
+        return self.table(self.lr_probs(texts))
@@ -0,0 +1,157 @@
+import io
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+
+# ─── Configuration (RESULT_CACHE=0 disables the cache) ───
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE", "1") == "1"
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "cache/results.sqlite3")
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1000"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 << 20)))
+RESULT_CACHE_TTL_SECONDS = float(
+    os.getenv("RESULT_CACHE_TTL_SECONDS", str(7 * 24 * 3600))
+)
+
+
+def pack_arrays(arrays: Optional[Dict[str, np.ndarray]]) -> Optional[bytes]:
+    if not arrays:
+        return None
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+
+def unpack_arrays(blob: Optional[bytes]) -> Optional[Dict[str, np.ndarray]]:
+    if blob is None:
+        return None
+    with np.load(io.BytesIO(blob)) as data:
+        return {k: data[k] for k in data.files}
+
+
+class ResultCache:
+    """
+    Content-addressed prediction cache backed by a local SQLite file.
+
+    Keys are built by the caller from a hash of the uploaded bytes and the
+    model checkpoint versions. Each entry keeps the prediction and, optionally,
+    per-modality embeddings (stored as an NPZ blob). Entries expire after
+    ``ttl_seconds``; beyond ``max_entries`` or ``max_bytes`` the least recently
+    used ones are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str = RESULT_CACHE_PATH,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+        ttl_seconds: float = RESULT_CACHE_TTL_SECONDS,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    prediction TEXT NOT NULL,
+                    embeddings BLOB,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Returns:
+            dict: {"prediction": str, "embeddings": dict or None}, or None on a
+                miss or an expired entry
+        """
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT prediction, embeddings, created FROM results WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            prediction, blob, created = row
+            if now - created > self.ttl_seconds:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+        return {"prediction": prediction, "embeddings": unpack_arrays(blob)}
+
+    def put(
+        self,
+        key: str,
+        prediction: str,
+        embeddings: Optional[Dict[str, np.ndarray]] = None,
+    ):
+        blob = pack_arrays(embeddings)
+        size = len(prediction) + (len(blob) if blob else 0)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (key, prediction, blob, size, now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute(
+            "DELETE FROM results WHERE created < ?", (now - self.ttl_seconds,)
+        )
+        count, total = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Walk entries from least to most recently used until within bounds
+        doomed = []
+        for key, size in conn.execute(
+            "SELECT key, size FROM results ORDER BY accessed ASC"
+        ):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM results WHERE key = ?", doomed)
+
+
+_RESULT_CACHE = None
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Shared cache instance, or None when RESULT_CACHE=0."""
+    global _RESULT_CACHE
+    if not RESULT_CACHE_ENABLED:
+        return None
+    if _RESULT_CACHE is None:
+        _RESULT_CACHE = ResultCache()
+    return _RESULT_CACHE
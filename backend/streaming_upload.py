@@ -0,0 +1,300 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from typing import List, Optional
+
+import numpy as np
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from ml.utils.extract_audio import SAMPLE_RATE, pcm16_to_float
+
+# ─── Configuration ───
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(2 << 30)))  # 2 GiB
+# Start decoding audio from the upload stream through an ffmpeg pipe
+STREAM_AUDIO = os.getenv("STREAM_AUDIO", "1") == "1"
+# Received bytes buffered on the event loop before they are hashed, written
+# and piped to ffmpeg in one worker-thread hop (network reads are ~64 KiB)
+UPLOAD_FLUSH_BYTES = int(os.getenv("UPLOAD_FLUSH_BYTES", str(1 << 20)))  # 1 MiB
+# Bytes needed before the container is sniffed
+PROBE_BYTES = 12
+
+
+def sniff_container(head: bytes) -> Optional[str]:
+    """
+    Identify the container from its first bytes.
+
+    Returns:
+        str: "mp4" (ISO BMFF: mp4/mov/m4v), "matroska" (mkv/webm) or "avi",
+            or None if unrecognized
+    """
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "matroska"
+    if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+        return "avi"
+    return None
+
+
+class StreamingUpload:
+    """
+    Receive the video part of a multipart/form-data request as it arrives.
+
+    Received data is buffered up to ``flush_bytes``, then hashed, appended
+    to ``<base_path><ext>`` and, once the container is recognized, piped
+    into an ffmpeg process that decodes the audio track to 16 kHz mono PCM
+    in memory, so audio decoding overlaps the upload. The first bytes are
+    flushed at once, so ffmpeg starts without waiting for a full buffer.
+    Other containers (QuickTime files without ``ftyp``, MPEG-TS, FLV, ASF,
+    ...) are only saved; the pipeline decodes them from the file. Oversized
+    bodies are rejected with 413.
+    """
+
+    def __init__(
+        self,
+        base_path: str,
+        field: str = "video",
+        max_bytes: int = MAX_UPLOAD_BYTES,
+        stream_audio: bool = STREAM_AUDIO,
+        flush_bytes: int = UPLOAD_FLUSH_BYTES,
+    ):
+        self.base_path = base_path
+        self.field = field.encode()
+        self.max_bytes = max_bytes
+        self.flush_bytes = flush_bytes
+        self.stream_audio = stream_audio and shutil.which("ffmpeg") is not None
+
+        self.video_path: Optional[str] = None
+        self.container: Optional[str] = None
+        self.size = 0
+        self._hasher = hashlib.sha256()
+        self._file = None
+        self._ffmpeg: Optional[subprocess.Popen] = None
+        self._ffmpeg_log = None
+        self._pcm: List[bytes] = []
+        self._reader: Optional[threading.Thread] = None
+        self._head = b""
+        self._probed = False
+
+        # multipart parser state
+        self._header_field = b""
+        self._header_value = b""
+        self._headers = {}
+        self._in_field = False
+        self._done = False
+        self._pending: List[bytes] = []
+        self._pending_bytes = 0
+
+    @property
+    def sha256(self) -> str:
+        return self._hasher.hexdigest()
+
+    # ─── multipart callbacks (synchronous, called from parser.write) ───
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        disposition = self._headers.get(b"content-disposition")
+        _, options = parse_options_header(disposition)
+        self._in_field = options.get(b"name") == self.field and not self._done
+        if self._in_field:
+            filename = options.get(b"filename", b"").decode("latin-1")
+            ext = os.path.splitext(os.path.basename(filename))[1]
+            self.video_path = f"{self.base_path}{ext}"
+
+    def _on_part_data(self, data, start, end):
+        if self._in_field:
+            self._pending.append(data[start:end])
+            self._pending_bytes += end - start
+
+    def _on_part_end(self):
+        if self._in_field:
+            self._in_field = False
+            self._done = True
+
+    # ─── chunk handling (runs in a worker thread) ───
+    def _consume(self, chunks: List[bytes]):
+        if self._file is None:
+            self._file = open(self.video_path, "wb")
+        for chunk in chunks:
+            self.size += len(chunk)
+            if self.size > self.max_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Upload exceeds the {self.max_bytes} byte limit",
+                )
+            self._hasher.update(chunk)
+            self._file.write(chunk)
+
+            if not self._probed:
+                self._head += chunk
+                if len(self._head) < PROBE_BYTES:
+                    continue
+                self._probed = True
+                self.container = sniff_container(self._head)
+                if self.container is not None and self.stream_audio:
+                    self._start_ffmpeg()
+                chunk, self._head = self._head, b""
+            self._feed(chunk)
+
+    def _start_ffmpeg(self):
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-loglevel",
+            "error",
+            "-i",
+            "pipe:0",
+            "-vn",
+            "-f",
+            "s16le",
+            "-acodec",
+            "pcm_s16le",
+            "-ac",
+            "1",
+            "-ar",
+            str(SAMPLE_RATE),
+            "pipe:1",
+        ]
+        self._ffmpeg_log = tempfile.TemporaryFile()
+        self._ffmpeg = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self._ffmpeg_log,
+        )
+        # Drain decoded PCM concurrently so ffmpeg never blocks on stdout
+        self._reader = threading.Thread(
+            target=self._read_pcm, args=(self._ffmpeg.stdout,), daemon=True
+        )
+        self._reader.start()
+
+    def _read_pcm(self, stdout):
+        for block in iter(lambda: stdout.read(1 << 16), b""):
+            self._pcm.append(block)
+
+    def _feed(self, chunk: bytes):
+        if self._ffmpeg is None:
+            return
+        try:
+            self._ffmpeg.stdin.write(chunk)
+        except (BrokenPipeError, OSError):
+            # ffmpeg gave up (e.g. MP4 with its index at the end); the
+            # pipeline falls back to decoding the saved file
+            self._stop_ffmpeg()
+
+    async def receive(self, request: Request):
+        """
+        Consume the request body. Raises HTTPException (400/413) on
+        malformed or oversized uploads.
+        """
+        content_type, params = parse_options_header(
+            request.headers.get("content-type", "")
+        )
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise HTTPException(
+                status_code=400, detail="Expected multipart/form-data"
+            )
+
+        length = request.headers.get("content-length")
+        if length and length.isdigit() and int(length) > self.max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload exceeds the {self.max_bytes} byte limit",
+            )
+
+        parser = MultipartParser(
+            params[b"boundary"],
+            {
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+            },
+        )
+        async for chunk in request.stream():
+            parser.write(chunk)
+            threshold = self.flush_bytes if self._probed else PROBE_BYTES
+            if self._pending_bytes >= threshold:
+                await self._flush()
+        parser.finalize()
+        if self._pending:
+            await self._flush()
+
+        if not self._done or self.video_path is None:
+            raise HTTPException(
+                status_code=400, detail=f"Missing '{self.field.decode()}' file field"
+            )
+        if self._file is None:
+            raise HTTPException(
+                status_code=400, detail=f"Empty '{self.field.decode()}' file field"
+            )
+        self._file.close()
+        self._file = None
+
+    async def _flush(self):
+        chunks, self._pending, self._pending_bytes = self._pending, [], 0
+        await asyncio.to_thread(self._consume, chunks)
+
+    def finish_audio(self) -> Optional[np.ndarray]:
+        """
+        Close ffmpeg's input and wait for the decode to finish (blocking).
+
+        Returns:
+            np.ndarray: float32 16 kHz mono waveform, or None if streaming
+                decode was not possible and the pipeline should decode the
+                saved file itself
+        """
+        proc = self._ffmpeg
+        if proc is None:
+            return None
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        proc.wait()
+        self._reader.join()
+        self._ffmpeg = None
+        if proc.returncode != 0 or not self._pcm:
+            self._ffmpeg_log.seek(0)
+            err = self._ffmpeg_log.read().decode(errors="ignore")
+            print(f"Streaming audio decode failed: {err}")
+            return None
+        return pcm16_to_float(b"".join(self._pcm))
+
+    def _stop_ffmpeg(self):
+        if self._ffmpeg is not None:
+            self._ffmpeg.kill()
+            self._ffmpeg.wait()
+            self._ffmpeg = None
+        if self._reader is not None:
+            self._reader.join()
+
+    def close(self):
+        """Release file handles and stop ffmpeg (safe to call twice)."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._stop_ffmpeg()
+        if self._ffmpeg_log is not None:
+            self._ffmpeg_log.close()
+            self._ffmpeg_log = None
@@ -0,0 +1,41 @@
+"""
+Regenerate tests/reference/spectrogram_tf.npz with the TensorFlow log-mel
+frontend the NumPy port replaced (kept in
+benchmarks/bench_spectrogram_frontend.py).
+
+Run from the backend directory (needs TensorFlow):
+
+    python -m tests.make_references
+"""
+import numpy as np
+
+from benchmarks.bench_spectrogram_frontend import tf_log_mel_patches, tf_pad_waveform
+from tests.test_spectrogram import (
+    CASES,
+    PARAMS,
+    REFERENCE,
+    TIME_STRIDE,
+    reference_waveform,
+)
+
+
+def main():
+    import tensorflow as tf
+
+    arrays = {}
+    for name, num_samples in CASES.items():
+        padded = tf_pad_waveform(
+            tf, tf.constant(reference_waveform(num_samples)), PARAMS
+        )
+        _, patches = tf_log_mel_patches(tf, padded, PARAMS)
+        patches = patches.numpy()
+        arrays[f"{name}/padded_length"] = np.int64(padded.shape[0])
+        arrays[f"{name}/shape"] = np.array(patches.shape)
+        arrays[f"{name}/patches"] = patches[:, ::TIME_STRIDE]
+        print(f"{name:<24}{num_samples:>9} samples -> {patches.shape}")
+    np.savez_compressed(REFERENCE, **arrays)
+    print(f"wrote {REFERENCE} with TensorFlow {tf.__version__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import itertools
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from models.cascade import AudioGate  # noqa: E402
+from models.fusion_model import FusionHead  # noqa: E402
+
+NC = 2
+
+
+def random_head(seed):
+    torch.manual_seed(seed)
+    head = FusionHead(NC).eval()
+    with torch.no_grad():
+        for p in head.parameters():
+            p.copy_(torch.randn_like(p))
+    return head
+
+
+def box_points(lo, hi, steps=41):
+    """A dense grid over the box, finer than the gate's own grid."""
+    axes = [torch.linspace(l, h, steps) for l, h in zip(lo.tolist(), hi.tolist())]
+    return torch.cartesian_prod(*axes)
+
+
+def test_skipped_rows_cannot_flip_anywhere_in_the_box():
+    skipped_total = 0
+    for seed in range(5):
+        head = random_head(seed)
+        audio_min, audio_max = torch.tensor([-2.0, -1.0]), torch.tensor([1.0, 2.5])
+        # A coarse gate grid: the bound between its points has to do the work
+        gate = AudioGate(head, audio_min, audio_max, grid=3, margin=0.0)
+        torch.manual_seed(100 + seed)
+        v, t = torch.randn(400, NC), torch.randn(400, NC)
+        skipped = ~gate.needs_audio(v, t)
+        skipped_total += int(skipped.sum())
+
+        points = box_points(audio_min, audio_max)
+        corners = torch.tensor(list(itertools.product(*zip(audio_min, audio_max))))
+        points = torch.cat([points, corners])
+        with torch.no_grad():
+            for i in torch.nonzero(skipped).flatten().tolist():
+                n = len(points)
+                logits = head(v[i].expand(n, -1), t[i].expand(n, -1), points)
+                centre = head(v[i : i + 1], t[i : i + 1], gate.center[None])
+                assert (logits.argmax(1) == centre.argmax(1)).all(), (seed, i)
+    assert skipped_total > 0  # the bound is not vacuous
+
+
+def test_margin_widens_the_box():
+    head = random_head(0)
+    lo, hi = torch.tensor([0.0, 0.0]), torch.tensor([1.0, 1.0])
+    gate = AudioGate(head, lo, hi, margin=0.1)
+    assert torch.allclose(gate.points[0], torch.tensor([-0.1, -0.1]))
+    assert torch.allclose(gate.points[-1], torch.tensor([1.1, 1.1]))
+    assert torch.allclose(gate.center, torch.tensor([0.5, 0.5]))
+
+
+def test_uncertain_rows_need_audio():
+    head = random_head(1)
+    # A huge audio box lets the audio logits dominate any video / text input
+    gate = AudioGate(head, torch.full((NC,), -1e3), torch.full((NC,), 1e3))
+    v, t = torch.randn(8, NC), torch.randn(8, NC)
+    assert gate.needs_audio(v, t).all()
@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("cv2")
+
+from ml.utils.extract_frames import window_starts  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "samples, expected",
+    [
+        (10, [0]),  # shorter than one window
+        (50, [0]),
+        (51, [0, 50]),
+        (120, [0, 50, 100]),
+        (400, [0, 50, 100, 150, 200, 250, 300, 350]),  # exactly max_windows
+        (None, [0, 50, 100, 150, 200, 250, 300, 350]),  # unknown length
+    ],
+)
+def test_back_to_back_windows(samples, expected):
+    assert window_starts(samples, seq_len=50, max_windows=8) == expected
+
+
+def test_long_recordings_spread_windows_evenly():
+    starts = window_starts(10_000, seq_len=50, max_windows=8)
+    assert len(starts) == 8
+    assert starts[0] == 0 and starts[-1] == 10_000 - 50
+    gaps = {b - a for a, b in zip(starts, starts[1:])}
+    assert max(gaps) - min(gaps) <= 1
+    assert min(gaps) >= 50  # windows never overlap
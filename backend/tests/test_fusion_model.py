@@ -0,0 +1,57 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from models.fusion_model import dedup_index, run_micro_batches  # noqa: E402
+
+
+def padded_batch():
+    """Two clips of 6 steps: the first padded after 3 steps, one inner repeat."""
+    torch.manual_seed(0)
+    steps = torch.randn(2, 3, 6, 4, 4)
+    steps[0, :, 3:] = steps[0, :, 2:3]  # padding repeats the last step
+    steps[1, :, 2] = steps[1, :, 1]  # a repeat inside the clip
+    return steps
+
+
+def test_dedup_index_keeps_first_step_of_each_run():
+    keep, src = dedup_index(padded_batch())
+    assert keep.tolist() == [
+        *[True, True, True, False, False, False],
+        *[True, True, False, True, True, True],
+    ]
+    assert src.tolist() == [0, 1, 2, 2, 2, 2, 3, 4, 4, 5, 6, 7]
+
+
+def test_dedup_index_reconstructs_per_step_outputs():
+    x = padded_batch()
+    B, C, T, H, W = x.shape
+    rows = x.permute(0, 2, 1, 3, 4).reshape(B * T, C, H, W)
+    f = torch.nn.Conv2d(C, 5, 3)
+    keep, src = dedup_index(x)
+    with torch.no_grad():
+        torch.testing.assert_close(f(rows[keep])[src], f(rows))
+
+
+def test_dedup_index_does_not_merge_across_clips():
+    x = torch.zeros(2, 1, 3, 2, 2)  # both clips identical and constant
+    keep, src = dedup_index(x)
+    assert keep.tolist() == [True, False, False, True, False, False]
+    assert src.tolist() == [0, 0, 0, 1, 1, 1]
+
+
+def test_run_micro_batches_matches_single_call():
+    x = torch.randn(10, 3)
+    f = torch.nn.Linear(3, 2)
+    calls = []
+
+    def fn(chunk):
+        calls.append(len(chunk))
+        return f(chunk)
+
+    with torch.no_grad():
+        torch.testing.assert_close(run_micro_batches(fn, x, 4), f(x))
+    assert calls == [4, 4, 2]
+    calls.clear()
+    run_micro_batches(fn, x, 0)
+    assert calls == [10]
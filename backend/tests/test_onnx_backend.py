@@ -0,0 +1,60 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+from models.fusion_model import LateFusion, PTSDVideoTransformer  # noqa: E402
+from models.onnx_backend import OnnxFusionModel, export_onnx  # noqa: E402
+
+SEQ_LEN = 4
+ATOL = 1e-4  # fp32 kernel rounding between eager PyTorch and onnxruntime
+
+
+def small_audio_model(nc=2):
+    """Stand-in for EfficientNetV2-L: [N, 3, 224, 224] patches to logits."""
+    return torch.nn.Sequential(
+        torch.nn.Conv2d(3, 8, kernel_size=16, stride=16),
+        torch.nn.ReLU(),
+        torch.nn.AdaptiveAvgPool2d(1),
+        torch.nn.Flatten(),
+        torch.nn.Linear(8, nc),
+    )
+
+
+@pytest.fixture(scope="module")
+def backends(tmp_path_factory):
+    torch.manual_seed(0)
+    eager = LateFusion(PTSDVideoTransformer(), None, small_audio_model()).eval()
+    out_dir = str(tmp_path_factory.mktemp("onnx"))
+    export_onnx(eager.vm, eager.am, eager.head, out_dir, seq_len=SEQ_LEN, versions="v1")
+    return eager, OnnxFusionModel(out_dir, versions="v1")
+
+
+def make_inputs(batch, patches):
+    gen = torch.Generator().manual_seed(1)
+    vids = torch.randn(batch, 3, SEQ_LEN, 224, 224, generator=gen)
+    auds = torch.randn(batch, 3, SEQ_LEN, 224, 224, generator=gen)
+    auds[:, :, patches:] = auds[:, :, patches - 1 : patches]  # padded tail
+    text_feat = torch.randn(batch, 2, generator=gen)
+    return vids, auds, text_feat
+
+
+@pytest.mark.parametrize("batch", [1, 3])
+def test_onnxruntime_matches_eager(backends, batch):
+    eager, ort = backends
+    inputs = make_inputs(batch, patches=2)
+    with torch.no_grad():
+        expected = eager(*inputs, return_modalities=True)
+    actual = ort(*inputs, return_modalities=True)
+    for name in ("video", "audio", "video_features", "logits"):
+        torch.testing.assert_close(actual[name], expected[name], atol=ATOL, rtol=0)
+    assert torch.equal(actual["logits"].argmax(1), expected["logits"].argmax(1))
+
+
+def test_refuses_graphs_from_other_checkpoints(tmp_path):
+    torch.manual_seed(0)
+    eager = LateFusion(PTSDVideoTransformer(), None, small_audio_model()).eval()
+    export_onnx(eager.vm, eager.am, eager.head, str(tmp_path), SEQ_LEN, versions="v1")
+    with pytest.raises(RuntimeError, match="other checkpoints"):
+        OnnxFusionModel(str(tmp_path), versions="v2")
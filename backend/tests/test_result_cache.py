@@ -0,0 +1,58 @@
+import time
+
+import numpy as np
+import pytest
+
+from result_cache import ResultCache, pack_arrays
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    def make(**kwargs):
+        return ResultCache(path=str(tmp_path / "results.sqlite3"), **kwargs)
+
+    return make
+
+
+def test_round_trip_with_embeddings(make_cache):
+    cache = make_cache()
+    logits = np.array([0.1, 0.9], dtype=np.float32)
+    cache.put("a", "PTSD", {"logits": logits})
+    hit = cache.get("a")
+    assert hit["prediction"] == "PTSD"
+    np.testing.assert_array_equal(hit["embeddings"]["logits"], logits)
+    assert cache.get("missing") is None
+
+
+def test_evicts_least_recently_used_beyond_max_entries(make_cache):
+    cache = make_cache(max_entries=2)
+    cache.put("a", "PTSD")
+    time.sleep(0.01)
+    cache.put("b", "NO PTSD")
+    time.sleep(0.01)
+    assert cache.get("a") is not None  # "b" is now the least recently used
+    time.sleep(0.01)
+    cache.put("c", "PTSD")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_evicts_beyond_max_bytes(make_cache):
+    embeddings = {"video_features": np.zeros(256, dtype=np.float32)}
+    size = len("PTSD") + len(pack_arrays(embeddings))
+    cache = make_cache(max_bytes=int(2.5 * size))  # room for two entries
+    for key in ("a", "b", "c"):
+        cache.put(key, "PTSD", embeddings)
+        time.sleep(0.01)
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.get("c") is not None
+
+
+def test_expired_entries_are_misses(make_cache):
+    cache = make_cache(ttl_seconds=0.05)
+    cache.put("a", "PTSD")
+    assert cache.get("a") is not None
+    time.sleep(0.1)
+    assert cache.get("a") is None
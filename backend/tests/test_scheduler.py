@@ -0,0 +1,81 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from models.scheduler import InferenceScheduler  # noqa: E402
+
+
+class RecordingForward:
+    """Doubles its input and records the batch size of every call."""
+
+    def __init__(self, delay=None):
+        self.sizes = []
+        self.delay = delay
+
+    def __call__(self, x):
+        if self.delay is not None:
+            self.delay.wait()
+        self.sizes.append(len(x))
+        return x * 2
+
+
+def test_concurrent_requests_share_one_forward():
+    forward = RecordingForward()
+    scheduler = InferenceScheduler(forward, max_batch_size=4, max_wait_ms=500)
+    inputs = [torch.full((1, 3), float(i)) for i in range(4)]
+    futures = [scheduler.submit(x) for x in inputs]
+    for x, future in zip(inputs, futures):
+        assert torch.equal(future.result(timeout=5), x * 2)
+    assert forward.sizes == [4]
+
+
+def test_batches_are_capped_at_max_batch_size():
+    release = threading.Event()
+    forward = RecordingForward(delay=release)
+    scheduler = InferenceScheduler(forward, max_batch_size=2, max_wait_ms=200)
+    futures = [scheduler.submit(torch.zeros(1, 3)) for _ in range(5)]
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    assert sum(forward.sizes) == 5
+    assert max(forward.sizes) <= 2
+
+
+def test_single_request_runs_after_max_wait():
+    forward = RecordingForward()
+    scheduler = InferenceScheduler(forward, max_batch_size=8, max_wait_ms=1)
+    out = scheduler.submit(torch.ones(1, 2)).result(timeout=5)
+    assert torch.equal(out, torch.full((1, 2), 2.0))
+    assert forward.sizes == [1]
+
+
+def test_dict_outputs_are_split_per_request():
+    def forward(x, y):
+        return {"sum": x + y, "missing": None}
+
+    scheduler = InferenceScheduler(forward, max_batch_size=2, max_wait_ms=500)
+    with ThreadPoolExecutor(2) as pool:
+        results = list(
+            pool.map(
+                lambda i: scheduler.submit(
+                    torch.full((1, 1), float(i)), torch.ones(1, 1)
+                ).result(timeout=5),
+                range(2),
+            )
+        )
+    assert [float(r["sum"]) for r in results] == [1.0, 2.0]
+    assert all(r["missing"] is None for r in results)
+
+
+def test_forward_errors_reach_every_request():
+    def forward(x):
+        raise RuntimeError("boom")
+
+    scheduler = InferenceScheduler(forward, max_batch_size=2, max_wait_ms=200)
+    futures = [scheduler.submit(torch.zeros(1, 1)) for _ in range(2)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="boom"):
+            future.result(timeout=5)
@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+from ml.utils.spectrogram import (  # noqa: E402
+    Params,
+    extract_spectrogram_patches,
+    pad_waveform,
+    patch_indices,
+    patches_to_tensor,
+)
+from ml.utils.transforms import legacy_file_order  # noqa: E402
+
+REFERENCE = os.path.join(os.path.dirname(__file__), "reference", "spectrogram_tf.npz")
+# Patches are stored every TIME_STRIDE-th frame to keep the file small
+TIME_STRIDE = 20
+
+PARAMS = Params()
+# Samples of one full patch (27.975 s) and of one patch hop (15 s)
+MIN_SAMPLES = 447600
+HOP_SAMPLES = 240000
+
+# name -> waveform length in samples
+CASES = {
+    "short": 10 * 16000,
+    "one_patch": MIN_SAMPLES,
+    "hop_boundary": MIN_SAMPLES + HOP_SAMPLES,
+    "hop_boundary_plus_one": MIN_SAMPLES + HOP_SAMPLES + 1,
+    "multi_patch": 70 * 16000,
+}
+
+
+def reference_waveform(num_samples):
+    """Deterministic test signal: 10 s chirps, a modulated tone and noise."""
+    t = np.arange(num_samples) / PARAMS.sample_rate
+    chirp = 0.2 * np.sin(2 * np.pi * (150 * t + 140 * (t % 10) ** 2))
+    tone = 0.1 * np.sin(2 * np.pi * 440 * t) * (1 + np.sin(2 * np.pi * 0.3 * t))
+    # RandomState streams are frozen across NumPy releases
+    noise = 0.02 * np.random.RandomState(num_samples % 2**32).standard_normal(
+        num_samples
+    )
+    return (chirp + tone + noise).astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def reference():
+    with np.load(REFERENCE) as data:
+        return {k: data[k] for k in data.files}
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_padding_matches_tensorflow(name, reference):
+    padded = pad_waveform(reference_waveform(CASES[name]), PARAMS)
+    assert len(padded) == reference[f"{name}/padded_length"]
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_patches_match_tensorflow(name, reference):
+    patches = extract_spectrogram_patches(reference_waveform(CASES[name]), PARAMS)
+    expected = reference[f"{name}/patches"]
+    assert patches.shape == tuple(reference[f"{name}/shape"])
+    # Documented tolerance of the NumPy port: float32 FFT rounding after the log
+    np.testing.assert_allclose(patches[:, ::TIME_STRIDE], expected, atol=1e-3)
+
+
+def test_patch_counts():
+    counts = {
+        name: len(extract_spectrogram_patches(np.zeros(n, np.float32), PARAMS))
+        for name, n in CASES.items()
+    }
+    assert counts == {
+        "short": 1,
+        "one_patch": 1,
+        "hop_boundary": 2,
+        "hop_boundary_plus_one": 3,
+        "multi_patch": 4,
+    }
+
+
+def test_patches_to_tensor_shape():
+    patches = extract_spectrogram_patches(reference_waveform(CASES["short"]), PARAMS)
+    clip = patches_to_tensor(patches)
+    assert tuple(clip.shape) == (3, 1, 224, 224)
+
+
+@pytest.mark.parametrize(
+    "start, end, num_patches, expected",
+    [
+        (0, 25, 4, [0, 1]),  # patches start every 15 s and last 27.96 s
+        (25, 50, 4, [0, 1, 2, 3]),
+        (30, 44.9, 4, [1, 2]),
+        (45, 70, 4, [2, 3]),
+        (100, 125, 4, [3]),  # past the end: the last patch
+        (0, 10, 1, [0]),
+    ],
+)
+def test_patch_indices(start, end, num_patches, expected):
+    assert patch_indices(start, end, num_patches) == expected
+
+
+def test_legacy_file_order_matches_sorted_file_names():
+    for count in range(1, 121):
+        names = sorted(f"frame_{i}.jpg" for i in range(count))
+        assert [int(n[6:-4]) for n in names] == legacy_file_order(count)
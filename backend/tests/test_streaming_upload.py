@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from streaming_upload import StreamingUpload, sniff_container
+
+BOUNDARY = "testboundary"
+
+
+class FakeRequest:
+    """Just what ``StreamingUpload.receive`` reads from a Starlette request."""
+
+    def __init__(self, body: bytes, chunk_size: int = 7):
+        self.headers = {
+            "content-type": f"multipart/form-data; boundary={BOUNDARY}",
+            "content-length": str(len(body)),
+        }
+        self._body = body
+        self._chunk_size = chunk_size
+
+    async def stream(self):
+        for i in range(0, len(self._body), self._chunk_size):
+            yield self._body[i : i + self._chunk_size]
+
+
+def multipart(data: bytes, filename: str = "session.mp4") -> bytes:
+    return (
+        (
+            f"--{BOUNDARY}\r\n"
+            f'Content-Disposition: form-data; name="video"; filename="{filename}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+        + data
+        + f"\r\n--{BOUNDARY}--\r\n".encode()
+    )
+
+
+def receive(tmp_path, data, filename="session.mp4", **kwargs):
+    upload = StreamingUpload(
+        base_path=str(tmp_path / "upload"), stream_audio=False, **kwargs
+    )
+    try:
+        asyncio.run(upload.receive(FakeRequest(multipart(data, filename))))
+    finally:
+        upload.close()
+    return upload
+
+
+@pytest.mark.parametrize(
+    "head, container",
+    [
+        (b"\x00\x00\x00\x20ftypisom\x00\x00", "mp4"),
+        (b"\x1a\x45\xdf\xa3\x01\x00\x00\x00\x00\x00\x00\x1f", "matroska"),
+        (b"RIFF\x00\x10\x00\x00AVI LIST", "avi"),
+        (b"\x00\x00\x00\x08wide\x00\x00\x00\x00", None),  # QuickTime
+        (b"\x47\x40\x00\x10" + bytes(8), None),  # MPEG-TS
+        (b"FLV\x01\x05\x00\x00\x00\x09\x00\x00\x00", None),
+    ],
+)
+def test_sniff_container(head, container):
+    assert sniff_container(head) == container
+
+
+def test_saves_and_hashes_recognized_container(tmp_path):
+    data = b"\x00\x00\x00\x20ftypisom" + bytes(range(256)) * 50
+    upload = receive(tmp_path, data, flush_bytes=1024)
+    assert upload.container == "mp4"
+    assert upload.video_path == str(tmp_path / "upload.mp4")
+    with open(upload.video_path, "rb") as f:
+        assert f.read() == data
+    assert upload.size == len(data)
+
+
+def test_unrecognized_container_is_saved_for_the_pipeline(tmp_path):
+    data = b"\x47\x40\x00\x10" + bytes(188 * 20)  # MPEG-TS packets
+    upload = receive(tmp_path, data, filename="session.ts")
+    assert upload.container is None
+    assert upload.finish_audio() is None  # pipeline decodes the saved file
+    with open(upload.video_path, "rb") as f:
+        assert f.read() == data
+
+
+def test_rejects_oversized_upload(tmp_path):
+    with pytest.raises(HTTPException) as e:
+        receive(tmp_path, b"\x00\x00\x00\x20ftypisom" + bytes(4096), max_bytes=1000)
+    assert e.value.status_code == 413
+
+
+def test_rejects_empty_file_field(tmp_path):
+    with pytest.raises(HTTPException) as e:
+        receive(tmp_path, b"")
+    assert e.value.status_code == 400
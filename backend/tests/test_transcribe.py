@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+from ml.utils.transcribe import (  # noqa: E402
+    SAMPLE_RATE,
+    split_chunks,
+    trim_silence,
+)
+
+
+def speech_with_pauses(seconds, pause_every=7.0, pause=0.5):
+    """Noise bursts separated by silent pauses."""
+    rng = np.random.RandomState(0)
+    audio = 0.3 * rng.standard_normal(int(seconds * SAMPLE_RATE)).astype(np.float32)
+    t = np.arange(len(audio)) / SAMPLE_RATE
+    audio[(t % pause_every) > pause_every - pause] = 0.0
+    return audio
+
+
+def test_short_audio_is_one_chunk():
+    audio = speech_with_pauses(20)
+    chunks = split_chunks(audio, 30)
+    assert len(chunks) == 1
+    np.testing.assert_array_equal(chunks[0], audio)
+
+
+@pytest.mark.parametrize("seconds, chunk_seconds", [(95, 30), (61, 10), (30.5, 30)])
+def test_chunks_cover_audio_within_limit(seconds, chunk_seconds):
+    audio = speech_with_pauses(seconds)
+    chunks = split_chunks(audio, chunk_seconds)
+    limit = int(chunk_seconds * SAMPLE_RATE)
+    assert all(0 < len(c) <= limit for c in chunks)
+    # No sample is lost or duplicated
+    np.testing.assert_array_equal(np.concatenate(chunks), audio)
+    # Cuts fall in the last fifth of a chunk
+    assert all(len(c) >= limit - limit // 5 for c in chunks[:-1])
+
+
+def test_chunks_are_cut_in_pauses():
+    audio = speech_with_pauses(95)
+    chunks = split_chunks(audio, 30)
+    frame = int(0.03 * SAMPLE_RATE)
+    assert len(chunks) == 4
+    # Each cut is placed at the start of the quietest frame
+    for chunk in chunks[1:]:
+        assert np.abs(chunk[:frame]).max() == 0.0
+
+
+def test_trim_silence_drops_long_silence_only():
+    tone = 0.3 * np.sin(2 * np.pi * 200 * np.arange(SAMPLE_RATE) / SAMPLE_RATE)
+    silence = np.zeros(3 * SAMPLE_RATE)
+    audio = np.concatenate([tone, silence, tone]).astype(np.float32)
+    trimmed = trim_silence(audio, pad_seconds=0.25)
+    # Both tones are kept with ~0.25 s of padding on each side of the gap
+    assert 2.4 * SAMPLE_RATE < len(trimmed) < 2.6 * SAMPLE_RATE